@@ -0,0 +1,286 @@
+"""
+Local stand-in for the parts of the Notion API that NotionClient uses.
+
+Pages live in memory and are served over real HTTP, so benchmarks exercise
+the client's sessions, pagination, retries and rate limiting end to end.
+Latency and 429/5xx faults can be injected per request.
+
+    with FakeNotion() as server:
+        server.add_page("page-1", blocks=500, nested_every=10, nested_children=5)
+        os.environ["NOTION_BASE_URL"] = server.base_url
+"""
+
+import json
+import random
+import threading
+import time
+import uuid
+from datetime import datetime, timedelta, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, List, Optional, Tuple
+from urllib.parse import parse_qs, urlparse
+
+EPOCH = datetime(2024, 1, 1, tzinfo=timezone.utc)
+
+
+def _timestamp(minutes: int) -> str:
+    return (EPOCH + timedelta(minutes=minutes)).strftime("%Y-%m-%dT%H:%M:%S.000Z")
+
+
+def _rich_text(text: str) -> List[Dict[str, Any]]:
+    return [{"type": "text", "text": {"content": text}, "plain_text": text}]
+
+
+class FakeNotion:
+    """
+    In-memory pages and blocks behind a ThreadingHTTPServer on localhost.
+
+    latency: seconds added to every response.
+    page_size: most children returned per listing, whatever the client asks for.
+    throttle_rate / error_rate: share of requests answered with 429 (with
+    Retry-After: retry_after) or 503, drawn from a seeded generator.
+    """
+
+    def __init__(
+        self,
+        latency: float = 0.0,
+        page_size: int = 100,
+        throttle_rate: float = 0.0,
+        error_rate: float = 0.0,
+        retry_after: int = 0,
+        seed: int = 0,
+    ) -> None:
+        self.latency = latency
+        self.page_size = page_size
+        self.throttle_rate = throttle_rate
+        self.error_rate = error_rate
+        self.retry_after = retry_after
+        self.stats: Dict[str, int] = {"requests": 0, "throttled": 0, "errors": 0}
+        self._random = random.Random(seed)
+        self._clock = 0
+        self._blocks: Dict[str, Dict[str, Any]] = {}
+        self._children: Dict[str, List[str]] = {}
+        self._pages: Dict[str, Dict[str, Any]] = {}
+        self._databases: Dict[str, List[str]] = {}
+        self._lock = threading.Lock()
+        self._server = ThreadingHTTPServer(("127.0.0.1", 0), _handler_for(self))
+        self._server.daemon_threads = True
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def base_url(self) -> str:
+        port = self._server.server_address[1]
+        return f"http://127.0.0.1:{port}/v1"
+
+    def __enter__(self) -> "FakeNotion":
+        self.start()
+        return self
+
+    def __exit__(self, *exc: Any) -> None:
+        self.stop()
+
+    def start(self) -> None:
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._server.shutdown()
+        self._server.server_close()
+
+    def reset_stats(self) -> None:
+        with self._lock:
+            self.stats = dict.fromkeys(self.stats, 0)
+
+    # -- content ---------------------------------------------------------------
+
+    def add_page(
+        self,
+        page_id: str,
+        blocks: int = 50,
+        nested_every: int = 0,
+        nested_children: int = 3,
+        database_id: Optional[str] = None,
+    ) -> None:
+        """
+        Create a page of `blocks` paragraphs. With nested_every=N every Nth
+        top-level block is a toggle holding `nested_children` paragraphs.
+        """
+        with self._lock:
+            self._pages[page_id] = {"id": page_id, "last_edited_time": self._tick()}
+            self._children[page_id] = []
+            for i in range(blocks):
+                nested = nested_every > 0 and i % nested_every == nested_every - 1
+                block_type = "toggle" if nested else "paragraph"
+                block = self._new_block(page_id, block_type, f"Block {i} of {page_id}")
+                self._children[page_id].append(block["id"])
+                if nested:
+                    block["has_children"] = True
+                    for j in range(nested_children):
+                        child = self._new_block(block["id"], "paragraph", f"Child {j} of {i}")
+                        self._children[block["id"]].append(child["id"])
+            if database_id is not None:
+                self._databases.setdefault(database_id, []).append(page_id)
+
+    def page_blocks(self, page_id: str) -> List[Dict[str, Any]]:
+        """Raw top-level blocks of a page, for assertions"""
+        with self._lock:
+            return [self._blocks[i] for i in self._children.get(page_id, [])]
+
+    def _tick(self) -> str:
+        self._clock += 1
+        return _timestamp(self._clock)
+
+    def _new_block(self, parent_id: str, block_type: str, text: str) -> Dict[str, Any]:
+        block: Dict[str, Any] = {
+            "object": "block",
+            "id": str(uuid.uuid4()),
+            "type": block_type,
+            "has_children": False,
+            "archived": False,
+            "parent": {"block_id": parent_id},
+            "last_edited_time": _timestamp(self._clock),
+            block_type: {"rich_text": _rich_text(text)},
+        }
+        self._blocks[block["id"]] = block
+        self._children[block["id"]] = []
+        return block
+
+    def _touch(self, block_id: str) -> None:
+        """Bump last_edited_time of the page containing block_id"""
+        now = self._tick()
+        parent = block_id
+        while parent in self._blocks:
+            self._blocks[parent]["last_edited_time"] = now
+            parent = self._blocks[parent]["parent"]["block_id"]
+        if parent in self._pages:
+            self._pages[parent]["last_edited_time"] = now
+
+    # -- request handling ------------------------------------------------------
+
+    def handle(
+        self, method: str, path: str, query: Dict[str, List[str]], body: Dict[str, Any]
+    ) -> Tuple[int, Dict[str, str], Dict[str, Any]]:
+        """Status, headers and JSON body for one request"""
+        if self.latency > 0:
+            time.sleep(self.latency)
+
+        with self._lock:
+            self.stats["requests"] += 1
+            roll = self._random.random()
+            if roll < self.throttle_rate:
+                self.stats["throttled"] += 1
+                return 429, {"Retry-After": str(self.retry_after)}, {"code": "rate_limited"}
+            if roll < self.throttle_rate + self.error_rate:
+                self.stats["errors"] += 1
+                return 503, {}, {"code": "service_unavailable"}
+
+            parts = path.strip("/").split("/")[1:]  # drop the "v1" prefix
+            try:
+                return 200, {}, self._route(method, parts, query, body)
+            except KeyError as e:
+                return 404, {}, {"code": "object_not_found", "message": str(e)}
+
+    def _route(
+        self, method: str, parts: List[str], query: Dict[str, List[str]], body: Dict[str, Any]
+    ) -> Dict[str, Any]:
+        if parts[0] == "pages" and method == "GET":
+            return dict(self._pages[parts[1]])
+        if parts[0] == "databases" and method == "POST":
+            return self._query_database(parts[1], body)
+        if parts[0] == "blocks" and len(parts) == 3 and method == "GET":
+            return self._list_children(parts[1], query)
+        if parts[0] == "blocks" and len(parts) == 3 and method == "PATCH":
+            return self._append_children(parts[1], body)
+        if parts[0] == "blocks" and method == "GET":
+            return dict(self._blocks[parts[1]])
+        if parts[0] == "blocks" and method == "PATCH":
+            return self._update_block(parts[1], body)
+        if parts[0] == "blocks" and method == "DELETE":
+            return self._delete_block(parts[1])
+        raise KeyError(f"{method} /{'/'.join(parts)}")
+
+    def _list_children(self, block_id: str, query: Dict[str, List[str]]) -> Dict[str, Any]:
+        ids = self._children[block_id]
+        start = int(query.get("start_cursor", ["0"])[0])
+        size = min(int(query.get("page_size", ["100"])[0]), self.page_size)
+        end = start + size
+        return {
+            "object": "list",
+            "results": [dict(self._blocks[i]) for i in ids[start:end]],
+            "has_more": end < len(ids),
+            "next_cursor": str(end) if end < len(ids) else None,
+        }
+
+    def _append_children(self, parent_id: str, body: Dict[str, Any]) -> Dict[str, Any]:
+        siblings = self._children[parent_id]
+        after = body.get("after")
+        position = siblings.index(after) + 1 if after else len(siblings)
+        created = []
+        for child in body.get("children", []):
+            block_type = child["type"]
+            text = "".join(t["text"]["content"] for t in child[block_type]["rich_text"])
+            created.append(self._new_block(parent_id, block_type, text))
+        siblings[position:position] = [block["id"] for block in created]
+        if parent_id in self._blocks:
+            self._blocks[parent_id]["has_children"] = True
+        self._touch(parent_id)
+        return {"object": "list", "results": [dict(block) for block in created]}
+
+    def _update_block(self, block_id: str, body: Dict[str, Any]) -> Dict[str, Any]:
+        block = self._blocks[block_id]
+        for block_type, value in body.items():
+            text = "".join(t["text"]["content"] for t in value["rich_text"])
+            block.pop(block["type"], None)
+            block["type"] = block_type
+            block[block_type] = {"rich_text": _rich_text(text)}
+        self._touch(block_id)
+        return dict(block)
+
+    def _delete_block(self, block_id: str) -> Dict[str, Any]:
+        block = self._blocks[block_id]
+        parent_id = block["parent"]["block_id"]
+        self._children[parent_id].remove(block_id)
+        block["archived"] = True
+        self._touch(parent_id)
+        return dict(block)
+
+    def _query_database(self, database_id: str, body: Dict[str, Any]) -> Dict[str, Any]:
+        ids = self._databases[database_id]
+        start = int(body.get("start_cursor") or 0)
+        end = start + min(int(body.get("page_size", 100)), self.page_size)
+        return {
+            "object": "list",
+            "results": [{"object": "page", "id": i} for i in ids[start:end]],
+            "has_more": end < len(ids),
+            "next_cursor": str(end) if end < len(ids) else None,
+        }
+
+
+def _handler_for(server: FakeNotion) -> type:
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+        # Headers and body go out in separate writes; don't let them wait for ACKs
+        disable_nagle_algorithm = True
+
+        def _serve(self) -> None:
+            length = int(self.headers.get("Content-Length") or 0)
+            raw = self.rfile.read(length) if length else b""
+            url = urlparse(self.path)
+            status, headers, payload = server.handle(
+                self.command, url.path, parse_qs(url.query), json.loads(raw) if raw else {}
+            )
+            data = json.dumps(payload).encode("utf-8")
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(data)))
+            for name, value in headers.items():
+                self.send_header(name, value)
+            self.end_headers()
+            self.wfile.write(data)
+
+        do_GET = do_POST = do_PATCH = do_DELETE = _serve  # noqa: N815
+
+        def log_message(self, format: str, *args: Any) -> None:
+            pass
+
+    return Handler
@@ -0,0 +1,84 @@
+"""
+Cold-start benchmark for the CLI.
+
+Measures the wall time of `python -m src.agent --help` over several fresh
+interpreters and, using `python -X importtime`, the cumulative import cost
+of `src.agent` broken down by top-level package.
+
+    python benchmarks/startup.py
+    python benchmarks/startup.py --runs 20 --top 15 --module src.gemini_agent
+"""
+
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import time
+from pathlib import Path
+from typing import Dict, List, Tuple
+
+ROOT = Path(__file__).resolve().parent.parent
+
+
+def _run(args: List[str]) -> subprocess.CompletedProcess:
+    env = {**os.environ, "PYTHONDONTWRITEBYTECODE": "1"}
+    return subprocess.run(
+        [sys.executable, *args], cwd=ROOT, env=env, capture_output=True, text=True, check=True
+    )
+
+
+def cli_startup(runs: int) -> List[float]:
+    """Wall time in seconds of `--help` in a fresh interpreter, once per run"""
+    times = []
+    for _ in range(runs):
+        started = time.perf_counter()
+        _run(["-m", "src.agent", "--help"])
+        times.append(time.perf_counter() - started)
+    return times
+
+
+def import_costs(module: str) -> Tuple[float, Dict[str, float]]:
+    """
+    Total import time of `module` and the self time of every top-level
+    package it pulled in, both in milliseconds.
+    """
+    result = _run(["-X", "importtime", "-c", f"import {module}"])
+    total = 0.0
+    per_package: Dict[str, float] = {}
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, cumulative_us, name = (part.strip() for part in line[12:].split("|"))
+        package = name.split(".")[0]
+        per_package[package] = per_package.get(package, 0.0) + int(self_us) / 1000
+        if name == module:
+            total = int(cumulative_us) / 1000
+    return total, per_package
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--runs", type=int, default=10, help="CLI launches to time")
+    parser.add_argument("--top", type=int, default=10, help="Packages to list")
+    parser.add_argument("--module", default="src.agent", help="Module to profile imports of")
+    args = parser.parse_args()
+
+    times = sorted(cli_startup(args.runs))
+    print(f"`src.agent --help` over {args.runs} runs:")
+    print(
+        f"  median {statistics.median(times) * 1000:.0f} ms, "
+        f"min {times[0] * 1000:.0f} ms, max {times[-1] * 1000:.0f} ms"
+    )
+
+    total, per_package = import_costs(args.module)
+    print(f"\nimport {args.module}: {total:.1f} ms")
+    print(f"  {'package':<28}{'self ms':>10}{'share':>8}")
+    ranked = sorted(per_package.items(), key=lambda item: item[1], reverse=True)
+    for package, ms in ranked[: args.top]:
+        share = ms / total * 100 if total else 0.0
+        print(f"  {package:<28}{ms:>10.1f}{share:>7.0f}%")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,65 @@
+"""
+Deterministic stand-in for the Gemini model used by GeminiAgent.
+
+It answers every prompt with a fixed-shape plan derived from the prompt
+text, so runs are repeatable and cost nothing. Attach it to a real agent:
+
+    agent = GeminiAgent()
+    agent.model = StubModel(think_time=0.05)
+"""
+
+import hashlib
+import json
+import re
+import time
+from typing import Any, Dict, Iterator, List, Union
+
+BLOCK_LINE = re.compile(r"\[BLOCK_(\d+)\]")
+
+
+class StubResponse:
+    def __init__(self, text: str) -> None:
+        self.text = text
+
+
+class StubModel:
+    """
+    Mimics GenerativeModel.generate_content. Each plan updates one block of
+    the page (picked from a hash of the prompt) and appends a paragraph;
+    `think_time` simulates model latency.
+    """
+
+    def __init__(self, think_time: float = 0.0, stream_chunk: int = 40) -> None:
+        self.think_time = think_time
+        self.stream_chunk = stream_chunk
+        self.calls = 0
+
+    def plan(self, prompt: str) -> Dict[str, Any]:
+        digest = int(hashlib.sha256(prompt.encode("utf-8")).hexdigest()[:8], 16)
+        indexes = [int(i) for i in BLOCK_LINE.findall(prompt)]
+        actions: List[Dict[str, Any]] = []
+        if indexes:
+            actions.append(
+                {
+                    "action": "UPDATE",
+                    "target_block_index": indexes[digest % len(indexes)],
+                    "block_type": "paragraph",
+                    "text": f"Rewritten paragraph {digest % 1000}",
+                }
+            )
+        actions.append({"action": "APPEND", "block_type": "paragraph", "text": "Stub note"})
+        return {"actions": actions}
+
+    def generate_content(
+        self, prompt: str, stream: bool = False
+    ) -> Union[StubResponse, Iterator[StubResponse]]:
+        self.calls += 1
+        if self.think_time > 0:
+            time.sleep(self.think_time)
+        text = json.dumps(self.plan(prompt))
+        if not stream:
+            return StubResponse(text)
+        return iter(
+            StubResponse(text[i : i + self.stream_chunk])
+            for i in range(0, len(text), self.stream_chunk)
+        )
@@ -0,0 +1,242 @@
+"""
+Offline benchmark suite.
+
+Runs the real NotionClient against a local FakeNotion server and the real
+GeminiAgent with a StubModel, then compares the results with the stored
+baseline and exits non-zero on regressions.
+
+    python -m benchmarks.suite                     # run and compare with baseline.json
+    python -m benchmarks.suite --only fetch retry  # a subset of the scenarios
+    python -m benchmarks.suite --update-baseline   # accept the current numbers
+"""
+
+import argparse
+import json
+import os
+import statistics
+import sys
+import time
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional
+
+from benchmarks.fake_notion import FakeNotion
+from benchmarks.stub_model import StubModel
+
+BASELINE = Path(__file__).resolve().parent / "baseline.json"
+PAGE_ID = "bench-page"
+
+# Applied before anything from src is imported, so log levels pick it up too
+BENCH_ENV = {
+    "NOTION_TOKEN": "bench-token",
+    "PAGE_ID": PAGE_ID,
+    "GEMINI_API_KEY": "bench-key",
+    "NOTION_RATE_LIMIT": "0",
+    "NOTION_BREAKER_THRESHOLD": "0",
+    "NOTION_MAX_ATTEMPTS": "5",
+    "NOTION_BACKOFF_BASE": "0.01",
+    "NOTION_BACKOFF_MAX": "0.05",
+    "NOTION_DEEP_FETCH": "true",
+    "PAGE_RECONCILE_DELAY": "3600",
+    "DECISION_CACHE_PATH": "",
+    "LOG_LEVEL": "CRITICAL",
+}
+
+
+@dataclass
+class Metric:
+    """How a metric is judged: `better` is "higher" or "lower"; tolerance is relative"""
+
+    better: str
+    tolerance: float
+
+    def regressed(self, value: float, baseline: float) -> bool:
+        if self.better == "higher":
+            return value < baseline * (1 - self.tolerance)
+        return value > baseline * (1 + self.tolerance)
+
+
+METRICS: Dict[str, Metric] = {
+    "fetch.blocks_per_second": Metric("higher", 0.5),
+    "fetch.requests_per_read": Metric("lower", 0.0),
+    "fetch.cached_read_ms": Metric("lower", 1.0),
+    "command.p50_ms": Metric("lower", 0.5),
+    "command.p95_ms": Metric("lower", 1.0),
+    "command.p99_ms": Metric("lower", 1.5),
+    "command.requests_per_command": Metric("lower", 0.1),
+    "retry.success_rate": Metric("higher", 0.0),
+    "retry.retries_per_fault": Metric("lower", 0.0),
+    "retry.extra_ms_per_fault": Metric("lower", 1.0),
+}
+
+
+def percentile(values: List[float], share: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * share))]
+
+
+def _client(server: FakeNotion) -> Any:
+    from src.notion_client import NotionClient
+
+    os.environ["NOTION_BASE_URL"] = server.base_url
+    return NotionClient()
+
+
+def bench_fetch(latency: float) -> Dict[str, float]:
+    """Full deep reads of a 1,500-block page, then reads of the unchanged page"""
+    reads = 5
+    with FakeNotion(latency=latency) as server:
+        server.add_page(PAGE_ID, blocks=1000, nested_every=10, nested_children=5)
+        notion = _client(server)
+
+        started = time.perf_counter()
+        count = 0
+        for _ in range(reads):
+            count += len(notion.get_page_blocks(PAGE_ID, force_refresh=True))
+        elapsed = time.perf_counter() - started
+        requests = server.stats["requests"] / reads
+
+        cached = []
+        for _ in range(20):
+            mark = time.perf_counter()
+            notion.get_page_blocks(PAGE_ID)
+            cached.append(time.perf_counter() - mark)
+
+    return {
+        "fetch.blocks_per_second": count / elapsed,
+        "fetch.requests_per_read": requests,
+        "fetch.cached_read_ms": statistics.median(cached) * 1000,
+    }
+
+
+def bench_commands(latency: float, commands: int = 40) -> Dict[str, float]:
+    """Read, plan and apply commands one after another, as the REPL does"""
+    from src.agent import execute_actions
+    from src.gemini_agent import GeminiAgent
+    from src.page_model import PageModel
+
+    with FakeNotion(latency=latency) as server:
+        server.add_page(PAGE_ID, blocks=200)
+        notion = _client(server)
+        agent = GeminiAgent()
+        agent.model = StubModel()  # type: ignore[assignment]
+        page = PageModel(notion, PAGE_ID)
+
+        latencies = []
+        for i in range(commands):
+            mark = time.perf_counter()
+            blocks = page.blocks()
+            plan = agent.analyze_and_act(f"Benchmark command {i}", blocks)
+            outcomes = execute_actions(
+                notion, plan, blocks, PAGE_ID, stale=page.stale_indexes(blocks)
+            )
+            latencies.append(time.perf_counter() - mark)
+            if not all(o["success"] for o in outcomes):
+                raise RuntimeError(f"Command {i} failed: {outcomes}")
+        page.close()
+
+    return {
+        "command.p50_ms": percentile(latencies, 0.50) * 1000,
+        "command.p95_ms": percentile(latencies, 0.95) * 1000,
+        "command.p99_ms": percentile(latencies, 0.99) * 1000,
+        "command.requests_per_command": server.stats["requests"] / commands,
+    }
+
+
+def bench_retry(latency: float, error_rate: float, throttle_rate: float) -> Dict[str, float]:
+    """Time the same reads with and without injected 5xx/429 responses"""
+    reads = 3
+    with FakeNotion(latency=latency, seed=7) as server:
+        server.add_page(PAGE_ID, blocks=300, nested_every=5, nested_children=2)
+        notion = _client(server)
+        expected = len(notion.get_page_blocks(PAGE_ID, force_refresh=True))
+
+        started = time.perf_counter()
+        for _ in range(reads):
+            notion.get_page_blocks(PAGE_ID, force_refresh=True)
+        clean = time.perf_counter() - started
+
+        server.error_rate = error_rate
+        server.throttle_rate = throttle_rate
+        server.reset_stats()
+        retries = notion.request_stats["retries"]
+        complete = 0
+        started = time.perf_counter()
+        for _ in range(reads):
+            complete += len(notion.get_page_blocks(PAGE_ID, force_refresh=True)) == expected
+        faulty = time.perf_counter() - started
+
+    faults = max(1, server.stats["errors"] + server.stats["throttled"])
+    return {
+        "retry.success_rate": complete / reads,
+        "retry.retries_per_fault": (notion.request_stats["retries"] - retries) / faults,
+        "retry.extra_ms_per_fault": max(0.0, faulty - clean) / faults * 1000,
+    }
+
+
+def compare(
+    results: Dict[str, float], baseline: Dict[str, float], tolerance: Optional[float]
+) -> List[str]:
+    """Print a results table; returns the names of regressed metrics"""
+    regressions = []
+    print(f"{'metric':<32}{'value':>12}{'baseline':>12}  status")
+    for name, value in results.items():
+        metric = METRICS[name]
+        if tolerance is not None and metric.tolerance > 0:
+            metric = Metric(metric.better, tolerance)
+        base = baseline.get(name)
+        if base is None:
+            status = "new"
+        elif metric.regressed(value, base):
+            status = f"REGRESSED ({metric.better} is better)"
+            regressions.append(name)
+        else:
+            status = "ok"
+        shown = "-" if base is None else f"{base:.2f}"
+        print(f"{name:<32}{value:>12.2f}{shown:>12}  {status}")
+    return regressions
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Offline Notion Sidecar benchmarks")
+    parser.add_argument(
+        "--only", nargs="+", choices=["fetch", "command", "retry"], help="Scenarios to run"
+    )
+    parser.add_argument("--latency", type=float, default=0.002, help="Server latency (s)")
+    parser.add_argument("--error-rate", type=float, default=0.1, help="Share of 503s in retry")
+    parser.add_argument("--throttle-rate", type=float, default=0.0, help="Share of 429s in retry")
+    parser.add_argument("--tolerance", type=float, help="Override relative tolerance")
+    parser.add_argument("--baseline", type=Path, default=BASELINE)
+    parser.add_argument("--update-baseline", action="store_true")
+    args = parser.parse_args(argv)
+
+    os.environ.update(BENCH_ENV)
+    scenarios: Dict[str, Callable[[], Dict[str, float]]] = {
+        "fetch": lambda: bench_fetch(args.latency),
+        "command": lambda: bench_commands(args.latency),
+        "retry": lambda: bench_retry(args.latency, args.error_rate, args.throttle_rate),
+    }
+
+    results: Dict[str, float] = {}
+    for name in args.only or scenarios:
+        results.update(scenarios[name]())
+
+    baseline: Dict[str, float] = {}
+    if args.baseline.exists():
+        baseline = json.loads(args.baseline.read_text(encoding="utf-8"))
+
+    if args.update_baseline:
+        baseline.update({name: round(value, 3) for name, value in results.items()})
+        args.baseline.write_text(json.dumps(baseline, indent=2) + "\n", encoding="utf-8")
+        print(f"Baseline written to {args.baseline}")
+        return 0
+
+    regressions = compare(results, baseline, args.tolerance)
+    if regressions:
+        print(f"\n{len(regressions)} metrics regressed: {', '.join(regressions)}")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
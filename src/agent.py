@@ -1,26 +1,556 @@
 import argparse
+import atexit
+import json
 import sys
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import TYPE_CHECKING, Any, Dict, List, Optional, Set, Tuple, Union
 
 from src.config import config
 from src.gemini_agent import GeminiAgent
+from src.metrics import MetricsExporter, metrics
 from src.notion_client import NotionClient
-from src.utils import print_colored, setup_logger
+from src.page_model import PageModel
+from src.utils import print_colored, redirect_logging, setup_logger
+
+if TYPE_CHECKING:
+    from src.write_behind import WriteBehindQueue
 
 # Set up logging first
 logger = setup_logger("Main")
 
+# Actions whose adjacent occurrences are sent to Notion as one batched call
+BATCHED_ACTIONS = ("APPEND", "INSERT", "DELETE")
+
+
+def _outcome(action: str, success: bool, message: str, index: Any = None) -> Dict[str, Any]:
+    return {"action": action, "index": index, "success": success, "message": message}
+
+
+def _group_actions(actions: List[Dict[str, Any]]) -> List[Tuple[str, List[Dict[str, Any]]]]:
+    """
+    Group adjacent actions that can share one Notion request: consecutive
+    APPENDs, consecutive DELETEs, and consecutive INSERTs after the same block.
+    """
+    groups: List[Tuple[str, List[Dict[str, Any]]]] = []
+    for action in actions:
+        kind = str(action.get("action", "")).upper()
+        if groups and kind in BATCHED_ACTIONS and groups[-1][0] == kind:
+            previous = groups[-1][1][-1]
+            if kind != "INSERT" or previous.get("target_block_index") == action.get(
+                "target_block_index"
+            ):
+                groups[-1][1].append(action)
+                continue
+        groups.append((kind, [action]))
+    return groups
+
+
+def _rewrite_items(action: Dict[str, Any]) -> List[Tuple[str, str]]:
+    """New (text, block_type) pairs of a REWRITE; a plain `text` is split into paragraphs"""
+    new_blocks = action.get("blocks")
+    if isinstance(new_blocks, list) and new_blocks:
+        return [
+            (str(b.get("text", "")), str(b.get("block_type", "paragraph")))
+            for b in new_blocks
+            if isinstance(b, dict)
+        ]
+    text = str(action.get("text", ""))
+    return [(part.strip(), "paragraph") for part in text.split("\n\n") if part.strip()]
+
+
+def _previous_sibling(blocks: List[Dict[str, Any]], idx: int) -> Optional[int]:
+    """Index of the block before blocks[idx] under the same parent, if any"""
+    depth = blocks[idx].get("depth", 0)
+    for prev in range(idx - 1, -1, -1):
+        prev_depth = blocks[prev].get("depth", 0)
+        if prev_depth < depth:
+            return None
+        if prev_depth == depth:
+            return prev
+    return None
+
+
+def rewrite_range(
+    notion: Any,
+    blocks: List[Dict[str, Any]],
+    start: int,
+    end: int,
+    items: List[Tuple[str, str]],
+    page_id: str,
+    anchor: Optional[int] = None,
+) -> Tuple[bool, str, Set[int]]:
+    """
+    Replace blocks[start..end] (siblings) with `items`, writing only the diff:
+    changed blocks are updated in place, runs of new blocks are inserted with
+    one batched call per position, and removed blocks are deleted together.
+    `anchor` is the sibling just before the range, if there is one.
+    Returns success, a summary and the indexes of the deleted blocks.
+    """
+    from src.block_diff import DELETE, INSERT, KEEP, UPDATE, diff_blocks, summarize
+
+    section = blocks[start : end + 1]
+    edits = diff_blocks(section, items, anchored=anchor is not None)
+    nested = blocks[start].get("depth", 0) > 0
+    parent_id = blocks[start]["parent_id"] if nested else page_id
+
+    results: List[bool] = []
+    inserts: List[Tuple[Optional[int], List[Tuple[str, str]]]] = []
+    deletes: List[int] = []
+    for edit in edits:
+        if edit.op == UPDATE and edit.old_index is not None:
+            block = section[edit.old_index]
+            results.append(notion.update_block(block["id"], edit.text, block_type=edit.block_type))
+        elif edit.op == INSERT:
+            if inserts and inserts[-1][0] == edit.old_index:
+                inserts[-1][1].append((edit.text, edit.block_type))
+            else:
+                inserts.append((edit.old_index, [(edit.text, edit.block_type)]))
+        elif edit.op == DELETE and edit.old_index is not None:
+            deletes.append(start + edit.old_index)
+
+    for position, new_items in inserts:
+        after = anchor if position is None else start + position
+        if after is None:
+            results.extend(False for _ in new_items)
+            continue
+        after_id = blocks[after]["id"]
+        if len(new_items) == 1:
+            text, block_type = new_items[0]
+            results.append(
+                notion.insert_block_after(
+                    after_id, text, block_type=block_type, parent_id=parent_id
+                )
+            )
+        else:
+            results.extend(notion.insert_blocks_after(after_id, new_items, parent_id=parent_id))
+
+    if len(deletes) == 1:
+        results.append(notion.delete_block(blocks[deletes[0]]["id"]))
+    elif deletes:
+        results.extend(notion.delete_blocks([blocks[idx]["id"] for idx in deletes]))
+
+    metrics.incr("rewrite_writes", len(results))
+    metrics.incr("rewrite_unchanged_blocks", sum(edit.op == KEEP for edit in edits))
+    return all(results), summarize(edits), set(deletes)
+
+
+@metrics.timed("execute")
+def execute_actions(
+    notion: Any,
+    plan: Union[List[Dict[str, Any]], Dict[str, Any]],
+    blocks: List[Dict[str, Any]],
+    page_id: str,
+    stale: Optional[Set[int]] = None,
+) -> List[Dict[str, Any]]:
+    """
+    Apply an ordered action plan in a single pass.
+
+    Every target_block_index is resolved against `blocks`, the snapshot the
+    plan was made from, so earlier actions never shift later targets. Adjacent
+    appends, inserts and deletes are sent as batched requests. A REWRITE
+    replaces blocks target_block_index..end_block_index and only writes the
+    blocks that actually differ. Actions aimed
+    at indexes in `stale` (blocks known to have changed on the server) are
+    skipped. Returns one outcome per action with its success and a message
+    for the user.
+    """
+    actions = [plan] if isinstance(plan, dict) else plan
+    outcomes: List[Dict[str, Any]] = []
+    deleted: Set[int] = set()
+    stale = stale or set()
+
+    def _resolve(action: Dict[str, Any]) -> Optional[int]:
+        idx = action.get("target_block_index")
+        if (
+            isinstance(idx, int)
+            and 0 <= idx < len(blocks)
+            and idx not in deleted
+            and idx not in stale
+        ):
+            return idx
+        return None
+
+    def _rejection(kind: str, action: Dict[str, Any]) -> str:
+        idx = action.get("target_block_index")
+        if idx in stale:
+            return (
+                f"Block [{idx}] changed on the server since it was read; "
+                "run 'refresh' and try again."
+            )
+        suffix = "" if kind == "UPDATE" else f" for {kind}"
+        return f"Invalid block index{suffix}: {idx}"
+
+    for kind, group in _group_actions(actions):
+        if kind == "UPDATE":
+            for action in group:
+                idx = _resolve(action)
+                if idx is None:
+                    idx = action.get("target_block_index")
+                    outcomes.append(_outcome(kind, False, _rejection(kind, action), index=idx))
+                    continue
+                target_block = blocks[idx]
+                target_type = action.get("block_type", target_block["type"])
+                success = notion.update_block(
+                    target_block["id"], action.get("text", ""), block_type=target_type
+                )
+                message = f"Updated block [{idx}]." if success else f"Update of [{idx}] failed."
+                outcomes.append(_outcome(kind, success, message, index=idx))
+
+        elif kind == "APPEND":
+            items = [(a.get("text", ""), a.get("block_type", "paragraph")) for a in group]
+            if len(items) == 1:
+                text, block_type = items[0]
+                results = [notion.append_block(page_id, text, block_type=block_type)]
+            else:
+                results = notion.append_blocks(page_id, items)
+            for success in results:
+                message = "Appended block." if success else "Append failed."
+                outcomes.append(_outcome(kind, success, message))
+
+        elif kind == "DELETE":
+            targets = []
+            for action in group:
+                idx = _resolve(action)
+                if idx is None:
+                    idx = action.get("target_block_index")
+                    outcomes.append(_outcome(kind, False, _rejection(kind, action), idx))
+                    continue
+                targets.append(idx)
+                deleted.add(idx)
+            if len(targets) == 1:
+                results = [notion.delete_block(blocks[targets[0]]["id"])]
+            elif targets:
+                results = notion.delete_blocks([blocks[idx]["id"] for idx in targets])
+            else:
+                results = []
+            for idx, success in zip(targets, results, strict=True):
+                message = f"Deleted block [{idx}]." if success else f"Delete of [{idx}] failed."
+                outcomes.append(_outcome(kind, success, message, index=idx))
+
+        elif kind == "INSERT":
+            idx = _resolve(group[0])
+            if idx is None:
+                idx = group[0].get("target_block_index")
+                for action in group:
+                    outcomes.append(_outcome(kind, False, _rejection(kind, action), idx))
+                continue
+            target_block = blocks[idx]
+            items = [(a.get("text", ""), a.get("block_type", "paragraph")) for a in group]
+            # Nested anchors must be inserted under their own parent
+            nested = target_block.get("depth", 0) > 0
+            parent_id = target_block["parent_id"] if nested else page_id
+            if len(items) == 1:
+                text, block_type = items[0]
+                success = notion.insert_block_after(
+                    target_block["id"], text, block_type=block_type, parent_id=parent_id
+                )
+                results = [success]
+            else:
+                results = notion.insert_blocks_after(target_block["id"], items, parent_id=parent_id)
+            for success in results:
+                message = (
+                    f"Inserted block after [{idx}]." if success else f"Insert after [{idx}] failed."
+                )
+                outcomes.append(_outcome(kind, success, message, index=idx))
+
+        elif kind == "REWRITE":
+            for action in group:
+                start = _resolve(action)
+                end = action.get("end_block_index", start)
+                if start is None:
+                    idx = action.get("target_block_index")
+                    outcomes.append(_outcome(kind, False, _rejection(kind, action), idx))
+                    continue
+                if not isinstance(end, int) or not start <= end < len(blocks):
+                    message = f"Invalid end block index for REWRITE: {end}"
+                    outcomes.append(_outcome(kind, False, message, start))
+                    continue
+                span = range(start, end + 1)
+                depth = blocks[start].get("depth", 0)
+                if any(blocks[idx].get("depth", 0) != depth for idx in span):
+                    message = f"REWRITE range [{start}-{end}] must not contain nested blocks."
+                    outcomes.append(_outcome(kind, False, message, start))
+                    continue
+                if any(idx in stale or idx in deleted for idx in span):
+                    message = (
+                        f"Blocks [{start}-{end}] changed since they were read; "
+                        "run 'refresh' and try again."
+                    )
+                    outcomes.append(_outcome(kind, False, message, start))
+                    continue
+
+                items = _rewrite_items(action)
+                if not items:
+                    message = (
+                        "REWRITE needs a non-empty 'blocks' list or 'text'; "
+                        "use DELETE to remove blocks."
+                    )
+                    outcomes.append(_outcome(kind, False, message, start))
+                    continue
+
+                anchor = _previous_sibling(blocks, start)
+                if anchor in deleted:
+                    anchor = None
+                success, summary, removed = rewrite_range(
+                    notion, blocks, start, end, items, page_id, anchor
+                )
+                deleted.update(removed)
+                message = (
+                    f"Rewrote blocks [{start}-{end}]: {summary}."
+                    if success
+                    else f"Rewrite of [{start}-{end}] partly failed ({summary})."
+                )
+                outcomes.append(_outcome(kind, success, message, index=start))
+
+        elif kind == "CHAT":
+            for action in group:
+                outcomes.append(_outcome(kind, True, action.get("text", "")))
+
+        else:
+            outcomes.append(_outcome(kind, False, f"Unknown action: {kind}"))
+
+    return outcomes
+
+
+class TargetPrefetcher:
+    """
+    Receives streamed actions from GeminiAgent. Prints progress and starts
+    reading each target block in the background while the model is still
+    writing the new text, so that changed or deleted targets can be caught
+    before we write to them.
+    """
+
+    def __init__(self, notion: Any, blocks: List[Dict[str, Any]]) -> None:
+        self.notion = notion
+        self.blocks = blocks
+        self._pool = ThreadPoolExecutor(max_workers=config.fetch_concurrency)
+        self._pending: Dict[int, Future] = {}
+
+    def __call__(self, event: Dict[str, Any]) -> None:
+        action = event["action"]
+        if event.get("error"):
+            print_colored(f"[WARNING] Model planned {action}: {event['error']}", "yellow")
+            return
+
+        idx = event.get("target_block_index")
+        if idx is None:
+            print_colored(f"[INFO] Planning {action}...", "cyan")
+            return
+
+        print_colored(f"[INFO] Planning {action} on block [{idx}]...", "cyan")
+        if idx not in self._pending:
+            self._pending[idx] = self._pool.submit(self.notion.get_block, self.blocks[idx]["id"])
+
+    def stale_indexes(self) -> Set[int]:
+        """Indexes whose block was archived or edited since the snapshot was read"""
+        stale: Set[int] = set()
+        for idx, future in self._pending.items():
+            try:
+                current = future.result()
+            except Exception as e:
+                logger.warning(f"Prefetch of block [{idx}] failed: {e}")
+                continue
+            if current is None:
+                continue
+            if current.get("archived") or current.get("content") != self.blocks[idx]["content"]:
+                stale.add(idx)
+        self._pool.shutdown(wait=False)
+        return stale
+
+
+def report_outcomes(outcomes: List[Dict[str, Any]]) -> None:
+    """Print the result of each executed action, then a summary for multi-step plans"""
+    for outcome in outcomes:
+        if outcome["action"] == "CHAT":
+            print_colored(f"\n[AGENT] {outcome['message']}", "white")
+        elif outcome["message"].startswith("Unknown action"):
+            print_colored(f"[WARNING] {outcome['message']}", "yellow")
+        elif outcome["success"]:
+            print_colored(f"[SUCCESS] {outcome['message']}", "green")
+        else:
+            print_colored(f"[ERROR] {outcome['message']}", "red")
+
+    edits = [o for o in outcomes if o["action"] != "CHAT"]
+    if len(edits) > 1:
+        applied = sum(1 for o in edits if o["success"])
+        color = "green" if applied == len(edits) else "yellow"
+        print_colored(f"[INFO] Applied {applied}/{len(edits)} actions.", color)
+
+
+def report_stats() -> None:
+    """Rolling p50/p95 of every timed phase, and the counters so far"""
+    phases = metrics.phases()
+    if not phases:
+        print_colored("[INFO] No timings recorded yet.", "blue")
+        return
+    print_colored(f"[INFO] Phase timings (last {metrics.window} of each):", "blue")
+    for name, stats in phases.items():
+        print_colored(
+            f"  {name:<28}{stats['count']:>6}x   p50 {stats['p50'] * 1000:>8.1f} ms"
+            f"   p95 {stats['p95'] * 1000:>8.1f} ms",
+            "blue",
+        )
+    counts = metrics.counters()
+    counters = ", ".join(f"{name} {value:g}" for name, value in counts.items())
+    if counters:
+        print_colored(f"[INFO] Counters: {counters}", "blue")
+    hedged = counts.get("gemini_hedge_requests", 0)
+    if hedged:
+        rate = counts.get("gemini_hedged", 0) / hedged
+        wins = counts.get("gemini_hedge_backup_wins", 0) / hedged
+        print_colored(f"[INFO] Hedged {rate:.0%} of Gemini requests, backup won {wins:.0%}", "blue")
+    requests = counts.get("gemini_requests", 0)
+    if requests:
+        repaired = counts.get("gemini_json_repaired", 0) / requests
+        failed = counts.get("gemini_parse_failures", 0) / requests
+        print_colored(
+            f"[INFO] Gemini JSON repaired locally {repaired:.0%}, unparseable {failed:.0%}", "blue"
+        )
+
+
+def start_agent() -> "Future[GeminiAgent]":
+    """
+    Build the Gemini agent on a thread. Importing the SDK is the slowest part
+    of startup, so it runs while the first page is being read.
+    """
+    executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="startup")
+    future = executor.submit(GeminiAgent)
+    executor.shutdown(wait=False)
+    return future
+
+
+def await_agent(future: "Future[GeminiAgent]") -> GeminiAgent:
+    """The agent from start_agent; exits if it could not be initialized"""
+    try:
+        return future.result()
+    except Exception as e:
+        logger.critical(f"Initialization failed: {e}")
+        sys.exit(1)
+
+
+def run_batch_mode(args: argparse.Namespace) -> None:
+    """Run the commands in args.batch and write one JSON result per line to args.output"""
+    from src.batch import run_batch
+
+    if args.output == "-":
+        # stdout carries the results; keep logs out of it
+        redirect_logging(sys.stderr)
+    try:
+        default_page_id = config.page_id
+    except ValueError:
+        default_page_id = ""
+
+    notion = NotionClient()
+    agent = start_agent()
+    source = sys.stdin if args.batch == "-" else open(args.batch, encoding="utf-8")
+    out = sys.stdout if args.output == "-" else open(args.output, "w", encoding="utf-8")
+    try:
+        summary = run_batch(notion, agent, source, out, default_page_id)
+    finally:
+        if source is not sys.stdin:
+            source.close()
+        if out is not sys.stdout:
+            out.close()
+
+    print(
+        f"[INFO] {summary['commands']} commands, {summary['failed']} failed, "
+        f"{summary['seconds']:.1f}s",
+        file=sys.stderr,
+    )
+    if summary["failed"]:
+        sys.exit(1)
+
+
+def run_fanout(args: argparse.Namespace) -> None:
+    """Run args.instruction on every selected page and print an aggregate report"""
+    from src.fanout import FanOut, report_fanout, report_page, resolve_pages
+
+    try:
+        db_filter = json.loads(args.filter) if args.filter else None
+    except ValueError as e:
+        print_colored(f"[ERROR] --filter is not valid JSON: {e}", "red")
+        sys.exit(1)
+
+    notion = NotionClient()
+    page_ids = resolve_pages(notion, args.pages, args.database, db_filter, args.limit)
+    print_colored(f"[INFO] Processing {len(page_ids)} pages...", "cyan")
+
+    started = time.perf_counter()
+    results = FanOut(notion, GeminiAgent, args.workers).run(
+        args.instruction, page_ids, on_result=report_page
+    )
+    report_fanout(results, time.perf_counter() - started)
+    if not results or any(not result.ok for result in results):
+        sys.exit(1)
+
 
 def main() -> None:
     # 1. Parse Args
     parser = argparse.ArgumentParser(description="Notion Sidecar Agent")
     parser.add_argument("--debug", action="store_true", help="Run system diagnostics and exit")
+    bench = parser.add_argument_group("benchmark", "with --debug: measure models and Notion")
+    bench.add_argument(
+        "--bench", action="store_true", help="Rank candidate models by latency and errors"
+    )
+    bench.add_argument(
+        "--bench-requests", type=int, default=6, metavar="N", help="Prompts per model"
+    )
+    bench.add_argument(
+        "--bench-concurrency", type=int, default=3, metavar="N", help="Prompts in flight"
+    )
+    bench.add_argument("--bench-models", nargs="+", metavar="MODEL", help="Models to compare")
+    fanout = parser.add_argument_group("fan-out", "apply one instruction to many pages and exit")
+    fanout.add_argument("--pages", nargs="+", default=[], metavar="PAGE_ID", help="Page ids")
+    fanout.add_argument("--database", metavar="DATABASE_ID", help="Process the database's pages")
+    fanout.add_argument("--filter", help="Notion database filter object as JSON")
+    fanout.add_argument("--limit", type=int, help="Process at most this many database pages")
+    fanout.add_argument("--instruction", help="Command to run on every page")
+    fanout.add_argument(
+        "--workers", type=int, help="Pages processed concurrently (default: FANOUT_WORKERS)"
+    )
+    batch = parser.add_argument_group("batch", "run commands from a file or stdin and exit")
+    batch.add_argument(
+        "--batch", metavar="FILE", help="Commands, one per line or as JSONL ('-' for stdin)"
+    )
+    batch.add_argument(
+        "--output", metavar="FILE", default="-", help="JSONL results (default: stdout)"
+    )
     args = parser.parse_args()
 
+    if args.bench and not args.debug:
+        parser.error("--bench is only available together with --debug")
+
     # 1.1 Run Diagnostics if requested
     if args.debug:
         from src.diagnostics import Diagnostics
 
-        Diagnostics().run_all()
+        if args.bench:
+            Diagnostics().run_benchmark(
+                args.bench_requests, args.bench_concurrency, args.bench_models
+            )
+        else:
+            Diagnostics().run_all()
+        return
+
+    exporter = MetricsExporter()
+    if exporter.start():
+        atexit.register(exporter.stop)
+
+    # 1.2 Batch mode
+    if args.batch:
+        if not config.validate(require_page=False):
+            sys.exit(1)
+        run_batch_mode(args)
+        return
+
+    # 1.3 Fan-out mode
+    if args.pages or args.database:
+        if not args.instruction:
+            parser.error("--instruction is required with --pages or --database")
+        if not config.validate(require_page=False):
+            sys.exit(1)
+        run_fanout(args)
         return
 
     # 2. Validate Config
@@ -28,23 +558,40 @@ def main() -> None:
         sys.exit(1)
 
     # 3. Initialize Clients
+    from src.page_watcher import PageWatcher
+    from src.write_behind import WriteBehindQueue
+
     try:
         print_colored("[INFO] Initializing Notion Client...", "cyan")
-        notion = NotionClient()
+        client = NotionClient()
+        notion: Any = client
+        writes: Optional["WriteBehindQueue"] = None
+        if config.write_behind_delay > 0:
+            # Edits go through the queue; the watcher only reads
+            writes = WriteBehindQueue(client)
+            notion = writes
+            atexit.register(writes.flush)
+        page = PageModel(notion, config.page_id)
+        watcher = PageWatcher(client, config.page_id)
 
         print_colored("[INFO] Initializing Gemini Agent...", "cyan")
-        agent = GeminiAgent()
+        agent_future = start_agent()
 
         print_colored("[SUCCESS] System Ready. Connected to Notion Page.", "green")
         print_colored(f"Target Page ID: {config.page_id}", "blue")
         print_colored("-" * 48, "white")
-        print("Type 'exit' to quit, 'refresh' to reload content.\n")
+        print(
+            "Type 'exit' to quit, 'refresh' to reload content, 'cache' for cache stats, "
+            "'health' for Notion request stats, 'stats' for timings, "
+            "'flush' to send queued edits.\n"
+        )
 
     except Exception as e:
         logger.critical(f"Initialization failed: {e}")
         sys.exit(1)
 
     # 4. Main REPL Loop
+    watcher.start()
     while True:
         try:
             user_input = input("\nCommand: ").strip()
@@ -58,11 +605,53 @@ def main() -> None:
 
             if user_input.lower() == "refresh":
                 print_colored("[INFO] Refreshing page state...", "blue")
+                blocks = page.reload()
+                print_colored(f"[INFO] Reloaded {len(blocks)} blocks.", "blue")
+                continue
+
+            if user_input.lower() == "cache":
+                agent = await_agent(agent_future)
+                print_colored(f"[INFO] Decision cache: {agent.decision_cache.summary()}", "blue")
+                continue
+
+            if user_input.lower() == "health":
+                health = notion.health()
+                circuit = health.pop("circuit")
+                counters = ", ".join(f"{name} {value}" for name, value in health.items())
+                print_colored(f"[INFO] Notion requests: {counters}", "blue")
+                print_colored(
+                    f"[INFO] Circuit {circuit['state']}, opened {circuit['times_opened']} times, "
+                    f"{circuit['rejected']} requests rejected",
+                    "blue",
+                )
+                if watcher.running:
+                    print_colored(f"[INFO] Page watcher: {watcher.summary()}", "blue")
+                if writes is not None:
+                    print_colored(f"[INFO] Write-behind: {writes.summary()}", "blue")
+                continue
+
+            if user_input.lower() == "stats":
+                report_stats()
+                continue
+
+            if user_input.lower() == "flush":
+                if writes is None:
+                    print_colored("[INFO] Write-behind is off; edits are sent right away.", "blue")
+                    continue
+                requests = writes.flush()
+                print_colored(f"[INFO] Sent queued edits in {requests} requests.", "blue")
+                print_colored(f"[INFO] Write-behind: {writes.summary()}", "blue")
                 continue
 
-            # 4.1 Fetch Current State
+            watcher.touch()
+            started = time.perf_counter()
+
+            # 4.1 Fetch Current State (served from the page model after our own edits)
             print("[INFO] Reading page content...", end="\r")
-            blocks = notion.get_page_blocks(config.page_id)
+            with metrics.span("command.fetch"):
+                blocks = page.blocks()
+            for conflict in page.take_conflicts():
+                print_colored(f"[WARNING] {conflict.describe()}", "yellow")
             if not blocks:
                 print_colored("[WARNING] Page is empty or could not be read.", "yellow")
                 # We continue anyway to allow the agent to potentially APPEND to an empty page
@@ -71,77 +660,24 @@ def main() -> None:
 
             # 4.2 Agent Reasoning
             print("[INFO] Processing...", end="\r")
-            decision = agent.analyze_and_act(user_input, blocks)
-
-            action = decision.get("action")
-            text = decision.get("text", "")
-
-            # 4.3 Execution
-            if action == "UPDATE":
-                idx = decision.get("target_block_index")
-                if idx is not None and 0 <= idx < len(blocks):
-                    target_block = blocks[idx]
-                    target_id = target_block["id"]
-                    target_type = decision.get("block_type", target_block["type"])
-
-                    print_colored(f"[INFO] Updating block [{idx}]...", "cyan")
-                    success = notion.update_block(target_id, text, block_type=target_type)
-
-                    if success:
-                        print_colored("[SUCCESS] Update successful.", "green")
-                    else:
-                        print_colored("[ERROR] Update failed.", "red")
-                else:
-                    print_colored(f"[ERROR] Invalid block index: {idx}", "red")
-
-            elif action == "APPEND":
-                print_colored("[INFO] Appending new block...", "cyan")
-                block_type = decision.get("block_type", "paragraph")
-                success = notion.append_block(config.page_id, text, block_type=block_type)
-
-                if success:
-                    print_colored("[SUCCESS] Appended successfully.", "green")
-                else:
-                    print_colored("[ERROR] Append failed.", "red")
-
-            elif action == "DELETE":
-                idx = decision.get("target_block_index")
-                if idx is not None and 0 <= idx < len(blocks):
-                    target_block = blocks[idx]
-                    target_id = target_block["id"]
-
-                    print_colored(f"[INFO] Deleting block [{idx}]...", "cyan")
-                    success = notion.delete_block(target_id)
-
-                    if success:
-                        print_colored("[SUCCESS] Block deleted.", "green")
-                    else:
-                        print_colored("[ERROR] Delete failed.", "red")
-                else:
-                    print_colored(f"[ERROR] Invalid block index for DELETE: {idx}", "red")
-
-            elif action == "INSERT":
-                idx = decision.get("target_block_index")
-                if idx is not None and 0 <= idx < len(blocks):
-                    target_block = blocks[idx]
-                    target_id = target_block["id"]
-                    block_type = decision.get("block_type", "paragraph")
-
-                    print_colored(f"[INFO] Inserting block after [{idx}]...", "cyan")
-                    success = notion.insert_block_after(target_id, text, block_type=block_type)
-
-                    if success:
-                        print_colored("[SUCCESS] Block inserted.", "green")
-                    else:
-                        print_colored("[ERROR] Insert failed.", "red")
+            agent = await_agent(agent_future)
+            with metrics.span("command.reason"):
+                if config.gemini_stream:
+                    prefetcher = TargetPrefetcher(notion, blocks)
+                    plan = agent.analyze_and_act(user_input, blocks, on_action=prefetcher)
+                    stale = prefetcher.stale_indexes()
                 else:
-                    print_colored(f"[ERROR] Invalid block index for INSERT: {idx}", "red")
+                    plan = agent.analyze_and_act(user_input, blocks)
+                    stale = set()
+            # A background reconcile may have found edits made elsewhere meanwhile
+            stale |= page.stale_indexes(blocks)
 
-            elif action == "CHAT":
-                print_colored(f"\n[AGENT] {text}", "white")
-
-            else:
-                print_colored(f"[WARNING] Unknown action: {action}", "yellow")
+            # 4.3 Execution
+            with metrics.span("command.execute"):
+                outcomes = execute_actions(notion, plan, blocks, config.page_id, stale=stale)
+            report_outcomes(outcomes)
+            page.reconcile_in_background()
+            metrics.observe("command.total", time.perf_counter() - started)
 
         except KeyboardInterrupt:
             print_colored("\n[INFO] Exiting application...", "yellow")
@@ -149,6 +685,9 @@ def main() -> None:
         except Exception as e:
             logger.error(f"An unexpected error occurred: {e}")
 
+    watcher.stop()
+    page.close()
+
 
 if __name__ == "__main__":
     main()
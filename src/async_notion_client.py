@@ -0,0 +1,347 @@
+import asyncio
+import time
+from dataclasses import dataclass, field
+from typing import TYPE_CHECKING, Any, Dict, List, Optional, Tuple
+
+from src.config import config
+from src.metrics import metrics
+from src.notion_client import (
+    BLOCK_DELETED,
+    BLOCK_UPDATED,
+    BLOCKS_CREATED,
+    DONE,
+    FAIL,
+    BaseNotionClient,
+)
+from src.utils import setup_logger
+
+if TYPE_CHECKING:
+    import aiohttp
+
+logger = setup_logger("AsyncNotionClient")
+
+
+@dataclass
+class AsyncResponse:
+    """Status, headers and decoded body of a completed aiohttp request"""
+
+    status_code: int
+    headers: Dict[str, str] = field(default_factory=dict)
+    data: Dict[str, Any] = field(default_factory=dict)
+
+    def json(self) -> Dict[str, Any]:
+        return self.data
+
+
+class AsyncNotionClient(BaseNotionClient):
+    """
+    asyncio counterpart of NotionClient with the same method surface.
+    All requests share one pooled aiohttp session, and backoff uses
+    asyncio.sleep so other tasks keep running while we wait.
+
+    Requires the optional `aiohttp` dependency (pip install notion-sidecar[async]).
+    Use it as an async context manager, or call close() when done.
+    """
+
+    def __init__(self) -> None:
+        super().__init__()
+        self._session: Optional["aiohttp.ClientSession"] = None
+
+    async def __aenter__(self) -> "AsyncNotionClient":
+        return self
+
+    async def __aexit__(self, *exc_info: Any) -> None:
+        await self.close()
+
+    async def close(self) -> None:
+        if self._session is not None and not self._session.closed:
+            await self._session.close()
+        self._session = None
+
+    async def get_page_blocks(
+        self, page_id: str, force_refresh: bool = False, deep: Optional[bool] = None
+    ) -> List[Dict[str, Any]]:
+        """
+        Retrieve all supported blocks from a notion page.
+        Behaves like NotionClient.get_page_blocks, including the snapshot cache.
+        """
+        if deep is None:
+            deep = config.deep_fetch
+
+        last_edited_time = await self._get_page_last_edited_time(page_id)
+        cached = self._cached_blocks(page_id, last_edited_time, deep, force_refresh)
+        if cached is not None:
+            return cached
+
+        fetched_at = time.time()
+        try:
+            items, complete = await self._list_children(page_id)
+            children: Dict[str, List[Dict[str, Any]]] = {page_id: items}
+            if deep:
+                complete = await self._fetch_descendants(items, children) and complete
+            return self._build_snapshot(
+                page_id, children, last_edited_time, fetched_at, deep, complete
+            )
+
+        except Exception as e:
+            logger.error(f"Failed to fetch blocks: {e}")
+            return []
+
+    async def query_database(
+        self,
+        database_id: str,
+        filter: Optional[Dict[str, Any]] = None,
+        sorts: Optional[List[Dict[str, Any]]] = None,
+        limit: Optional[int] = None,
+    ) -> List[str]:
+        """Ids of the database pages matching a filter (see NotionClient.query_database)."""
+        url = f"{self.BASE_URL}/databases/{database_id}/query"
+        page_ids: List[str] = []
+        cursor = None
+
+        while limit is None or len(page_ids) < limit:
+            payload = self._database_query(filter, sorts, cursor)
+            response = await self._make_request("POST", url, json_data=payload)
+            if not response:
+                logger.error(f"Database query for {database_id} failed")
+                break
+            data = response.json()
+            page_ids.extend(self._page_ids(data))
+            if not data.get("has_more"):
+                break
+            cursor = data.get("next_cursor")
+
+        return page_ids[:limit] if limit is not None else page_ids
+
+    async def get_block(self, block_id: str) -> Optional[Dict[str, Any]]:
+        """Retrieve the current state of a single block (see NotionClient.get_block)."""
+        response = await self._make_request("GET", f"{self.BASE_URL}/blocks/{block_id}")
+        if not response:
+            return None
+        return self._parse_single_block(response.json())
+
+    async def update_block(
+        self, block_id: str, new_text: str, block_type: str = "paragraph"
+    ) -> bool:
+        """Update a specific block's text content."""
+        url = f"{self.BASE_URL}/blocks/{block_id}"
+        payload = self._update_payload(new_text, block_type)
+
+        response = await self._make_request("PATCH", url, json_data=payload)
+        return self._mutation_succeeded(response, BLOCK_UPDATED)
+
+    async def append_block(self, parent_id: str, text: str, block_type: str = "paragraph") -> bool:
+        """Append a new block to the end of a page (or block)."""
+        url = f"{self.BASE_URL}/blocks/{parent_id}/children"
+        payload = {"children": [self._text_block(text, block_type)]}
+
+        response = await self._make_request("PATCH", url, json_data=payload)
+        return self._mutation_succeeded(response, BLOCKS_CREATED, parent_id=parent_id)
+
+    async def delete_block(self, block_id: str) -> bool:
+        """Delete (archive) a block."""
+        url = f"{self.BASE_URL}/blocks/{block_id}"
+        response = await self._make_request("DELETE", url)
+        return self._mutation_succeeded(response, BLOCK_DELETED, block_id=block_id)
+
+    async def insert_block_after(
+        self,
+        block_id: str,
+        text: str,
+        block_type: str = "paragraph",
+        parent_id: Optional[str] = None,
+    ) -> bool:
+        """Insert a block after block_id under parent_id (defaults to the configured page)."""
+        url = f"{self.BASE_URL}/blocks/{parent_id or config.page_id}/children"
+        payload = {"children": [self._text_block(text, block_type)], "after": block_id}
+
+        response = await self._make_request("PATCH", url, json_data=payload)
+        return self._mutation_succeeded(
+            response, BLOCKS_CREATED, parent_id=parent_id or config.page_id, after=block_id
+        )
+
+    async def append_blocks(self, parent_id: str, items: List[Tuple[str, str]]) -> List[bool]:
+        """Append several (text, block_type) blocks, up to 100 per request."""
+        return await self._write_children(parent_id, items, after=None)
+
+    async def insert_blocks_after(
+        self,
+        block_id: str,
+        items: List[Tuple[str, str]],
+        parent_id: Optional[str] = None,
+    ) -> List[bool]:
+        """Insert several (text, block_type) blocks, in order, after block_id."""
+        return await self._write_children(parent_id or config.page_id, items, after=block_id)
+
+    async def delete_blocks(self, block_ids: List[str]) -> List[bool]:
+        """Delete several blocks concurrently, at most NOTION_FETCH_CONCURRENCY at a time."""
+        semaphore = asyncio.Semaphore(config.fetch_concurrency)
+
+        async def _bounded(block_id: str) -> bool:
+            async with semaphore:
+                return await self.delete_block(block_id)
+
+        return list(await asyncio.gather(*(_bounded(block_id) for block_id in block_ids)))
+
+    async def _write_children(
+        self, parent_id: str, items: List[Tuple[str, str]], after: Optional[str]
+    ) -> List[bool]:
+        url = f"{self.BASE_URL}/blocks/{parent_id}/children"
+        results: List[bool] = []
+
+        for chunk in self._chunk_children(items):
+            payload: Dict[str, Any] = {"children": chunk}
+            if after is not None:
+                payload["after"] = after
+
+            response = await self._make_request("PATCH", url, json_data=payload)
+            success = self._mutation_succeeded(
+                response, BLOCKS_CREATED, parent_id=parent_id, after=after
+            )
+            results.extend([success] * len(chunk))
+            if not success:
+                break
+
+            if after is not None:
+                created = self._created_ids(response.json()) if response is not None else []
+                if not created:
+                    logger.error("Insert response did not include the created blocks")
+                    break
+                after = created[-1]
+
+        results.extend([False] * (len(items) - len(results)))
+        return results
+
+    async def _get_page_last_edited_time(self, page_id: str) -> Optional[str]:
+        response = await self._make_request("GET", f"{self.BASE_URL}/pages/{page_id}")
+        if not response:
+            return None
+        value = response.json().get("last_edited_time")
+        return value if isinstance(value, str) else None
+
+    async def _list_children(self, block_id: str) -> Tuple[List[Dict[str, Any]], bool]:
+        items: List[Dict[str, Any]] = []
+        url = f"{self.BASE_URL}/blocks/{block_id}/children"
+        has_more = True
+        start_cursor = None
+
+        while has_more:
+            params: Dict[str, Any] = {"page_size": 100}
+            if start_cursor:
+                params["start_cursor"] = start_cursor
+
+            response = await self._make_request("GET", url, params=params)
+            if not response:
+                return items, False
+
+            data = response.json()
+            items.extend(data.get("results", []))
+
+            has_more = data.get("has_more", False)
+            start_cursor = data.get("next_cursor")
+
+        return items, True
+
+    async def _fetch_descendants(
+        self, items: List[Dict[str, Any]], children: Dict[str, List[Dict[str, Any]]]
+    ) -> bool:
+        """Level-by-level tree walk, at most NOTION_FETCH_CONCURRENCY listings in flight"""
+        complete = True
+        semaphore = asyncio.Semaphore(config.fetch_concurrency)
+        level = [item for item in items if self._should_descend(item)]
+
+        async def _bounded(source: str) -> Tuple[List[Dict[str, Any]], bool]:
+            async with semaphore:
+                return await self._list_children(source)
+
+        while level:
+            results = await asyncio.gather(
+                *(_bounded(self._children_source(item)) for item in level)
+            )
+
+            next_level: List[Dict[str, Any]] = []
+            for item, (kids, ok) in zip(level, results, strict=True):
+                complete = complete and ok
+                children[item["id"]] = kids
+                next_level.extend(kid for kid in kids if self._should_descend(kid))
+            level = next_level
+
+        return complete
+
+    def _mutation_succeeded(
+        self, response: Optional[AsyncResponse], event: Optional[str] = None, **details: Any
+    ) -> bool:
+        success = self._record_mutation(response is not None and response.status_code == 200)
+        if success and event is not None and response is not None:
+            self._publish(event, response.json(), **details)
+        return success
+
+    def _get_session(self) -> "aiohttp.ClientSession":
+        """Create the pooled session lazily, inside the running event loop"""
+        if self._session is None or self._session.closed:
+            try:
+                import aiohttp
+            except ImportError as e:
+                raise ImportError(
+                    "AsyncNotionClient requires aiohttp. "
+                    "Install it with: pip install notion-sidecar[async]"
+                ) from e
+
+            connector = aiohttp.TCPConnector(limit=max(config.fetch_concurrency, 4))
+            self._session = aiohttp.ClientSession(headers=self.headers, connector=connector)
+        return self._session
+
+    async def _make_request(
+        self,
+        method: str,
+        url: str,
+        params: Optional[Dict] = None,
+        json_data: Optional[Dict] = None,
+        retries: Optional[int] = None,
+    ) -> Optional[AsyncResponse]:
+        """
+        Same retry policy and circuit breaker as NotionClient._make_request,
+        without blocking the loop.
+        """
+        import aiohttp
+
+        with metrics.span("notion.request"):
+            session = self._get_session()
+            attempts = retries or self.retry_policy.max_attempts
+            deadline_at = self.retry_policy.deadline_at()
+            self._count("requests")
+
+            for attempt in range(attempts):
+                timeouts = self._before_attempt(method, url, attempt, deadline_at)
+                if timeouts is None:
+                    return None
+                connect_timeout, read_timeout = timeouts
+                timeout = aiohttp.ClientTimeout(
+                    sock_connect=connect_timeout, sock_read=read_timeout
+                )
+                try:
+                    await self.rate_limiter.acquire_async()
+                    async with session.request(
+                        method, url, params=params, json=json_data, timeout=timeout
+                    ) as resp:
+                        self._count_bytes(resp.headers)
+                        outcome, delay = self._after_status(resp.status, resp.headers, attempt)
+                        if outcome == DONE:
+                            data = (
+                                await resp.json(content_type=None)
+                                if resp.content_length != 0
+                                else {}
+                            )
+                            return AsyncResponse(resp.status, dict(resp.headers), data or {})
+                        if outcome == FAIL:
+                            return None
+                except asyncio.TimeoutError as e:
+                    delay = self._after_error(e, True, attempt, attempts)
+                except aiohttp.ClientError as e:
+                    delay = self._after_error(e, False, attempt, attempts)
+
+                if not self._may_retry(method, url, delay, attempt, attempts, deadline_at):
+                    return None
+                await asyncio.sleep(delay)
+
+            return None
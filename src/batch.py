@@ -0,0 +1,227 @@
+import json
+import queue
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any, Dict, Iterable, Iterator, Optional, TextIO, Tuple
+
+from src.agent import execute_actions
+from src.metrics import metrics
+from src.page_model import PageModel
+from src.utils import setup_logger
+
+logger = setup_logger("Batch")
+
+
+def read_commands(lines: Iterable[str], default_page_id: str) -> Iterator[Dict[str, Any]]:
+    """
+    Parse batch input lazily. Each non-empty line is either a plain command
+    or a JSON object {"command": ..., "page_id": ..., "id": ...}; lines
+    starting with '#' are comments. Invalid lines are yielded with an error.
+    """
+    for number, raw in enumerate(lines, start=1):
+        line = raw.strip()
+        if not line or line.startswith("#"):
+            continue
+
+        entry: Dict[str, Any] = {"line": number, "page_id": default_page_id}
+        if not line.startswith("{"):
+            entry["command"] = line
+        else:
+            try:
+                data = json.loads(line)
+            except ValueError as e:
+                entry["error"] = f"invalid JSON: {e}"
+                yield entry
+                continue
+
+            command = data.get("command") if isinstance(data, dict) else None
+            if not isinstance(command, str) or not command.strip():
+                entry["error"] = "missing 'command'"
+                yield entry
+                continue
+            entry["command"] = command.strip()
+            entry["page_id"] = data.get("page_id") or default_page_id
+            if "id" in data:
+                entry["id"] = data["id"]
+
+        if not entry["page_id"]:
+            entry["error"] = "no 'page_id' given and PAGE_ID is not set"
+        yield entry
+
+
+# A prefetch started for a specific command
+_Prefetch = Optional[Tuple[Dict[str, Any], Future]]
+
+
+class _Lookahead:
+    """
+    Reads commands on a thread so the next one can be inspected without
+    blocking, e.g. while a producer on the other end of a pipe is idle.
+    """
+
+    _END = object()
+
+    def __init__(self, commands: Iterable[Dict[str, Any]]) -> None:
+        self._queue: "queue.Queue[Any]" = queue.Queue(maxsize=16)
+        self._peeked: Any = None
+        threading.Thread(target=self._read, args=(commands,), daemon=True).start()
+
+    def next(self) -> Optional[Dict[str, Any]]:
+        """The next command, waiting for it if necessary; None at the end of input"""
+        item = self._peeked if self._peeked is not None else self._queue.get()
+        self._peeked = None
+        return None if item is self._END else item
+
+    def peek(self) -> Optional[Dict[str, Any]]:
+        """The next command if it has already been read, without waiting"""
+        if self._peeked is None:
+            try:
+                self._peeked = self._queue.get_nowait()
+            except queue.Empty:
+                return None
+        return None if self._peeked is self._END else self._peeked
+
+    def _read(self, commands: Iterable[Dict[str, Any]]) -> None:
+        try:
+            for command in commands:
+                self._queue.put(command)
+        except Exception as e:
+            logger.error(f"Reading batch input failed: {e}")
+        finally:
+            self._queue.put(self._END)
+
+
+class BatchRunner:
+    """
+    Runs commands without the REPL and writes one JSON result per command.
+
+    Stages are pipelined: while Gemini reasons about command N, the page
+    for command N+1 (if it has been read yet) is fetched in the background.
+    When N+1 targets the same page it is not read at all; its state is the
+    page model after N's writes have been applied locally. Writes still
+    happen strictly in command order.
+
+    `agent` may also be a Future that resolves to the agent; it is first
+    awaited after the first page read has started.
+    """
+
+    def __init__(self, notion: Any, agent: Any, out: TextIO) -> None:
+        self.notion = notion
+        self.agent = agent
+        self.out = out
+        self.summary: Dict[str, Any] = {"commands": 0, "failed": 0, "seconds": 0.0}
+        self._pages: Dict[str, PageModel] = {}
+        self._fetcher = ThreadPoolExecutor(max_workers=1)
+
+    def run(self, commands: Iterable[Dict[str, Any]]) -> Dict[str, Any]:
+        started = time.perf_counter()
+        pending = _Lookahead(commands)
+        current = pending.next()
+        prefetch = self._prefetch(current, previous=None)
+
+        try:
+            while current is not None:
+                result, prefetch = self._run_one(current, prefetch, pending)
+                self._emit(result)
+                current = pending.next()
+        finally:
+            self._fetcher.shutdown(wait=False)
+            for page in self._pages.values():
+                page.close()
+
+        self.summary["seconds"] = round(time.perf_counter() - started, 3)
+        return self.summary
+
+    def _agent(self) -> Any:
+        if isinstance(self.agent, Future):
+            self.agent = self.agent.result()
+        return self.agent
+
+    def _page(self, page_id: str) -> PageModel:
+        page = self._pages.get(page_id)
+        if page is None:
+            page = PageModel(self.notion, page_id)
+            self._pages[page_id] = page
+        return page
+
+    def _prefetch(
+        self, entry: Optional[Dict[str, Any]], previous: Optional[Dict[str, Any]]
+    ) -> _Prefetch:
+        """
+        Start reading the page for `entry`, unless it is the page `previous`
+        is about to edit: that state is only known after previous has run.
+        """
+        if entry is None or entry.get("error"):
+            return None
+        if previous is not None and previous.get("page_id") == entry["page_id"]:
+            return None
+        return entry, self._fetcher.submit(self._page(entry["page_id"]).blocks)
+
+    def _run_one(
+        self,
+        entry: Dict[str, Any],
+        prefetch: _Prefetch,
+        pending: _Lookahead,
+    ) -> Tuple[Dict[str, Any], _Prefetch]:
+        """Run one command; returns its result and the prefetch started for the next one"""
+        result: Dict[str, Any] = {
+            key: entry[key] for key in ("id", "line", "command", "page_id") if key in entry
+        }
+        timings: Dict[str, float] = {}
+        result["timings"] = timings
+
+        if entry.get("error"):
+            result.update(ok=False, actions=[], error=entry["error"])
+            return result, self._prefetch(pending.peek(), previous=None)
+
+        next_prefetch: _Prefetch = None
+        prefetched = False
+        try:
+            mark = time.perf_counter()
+            if prefetch is not None and prefetch[0] is entry:
+                blocks = prefetch[1].result()
+            else:
+                blocks = self._page(entry["page_id"]).blocks()
+            timings["fetch_wait"] = round(time.perf_counter() - mark, 3)
+
+            # Overlap: read the next command's page while the model is thinking
+            next_prefetch = self._prefetch(pending.peek(), previous=entry)
+            prefetched = True
+
+            mark = time.perf_counter()
+            plan = self._agent().analyze_and_act(entry["command"], blocks)
+            timings["reason"] = round(time.perf_counter() - mark, 3)
+
+            mark = time.perf_counter()
+            outcomes = execute_actions(self.notion, plan, blocks, entry["page_id"])
+            timings["execute"] = round(time.perf_counter() - mark, 3)
+            # Confirm the local edits against the server, as the REPL does
+            self._page(entry["page_id"]).reconcile_in_background()
+        except Exception as e:
+            logger.error(f"Command on line {entry['line']} failed: {e}")
+            result.update(ok=False, actions=[], error=str(e))
+            if not prefetched:
+                next_prefetch = self._prefetch(pending.peek(), previous=None)
+            return result, next_prefetch
+
+        for phase, seconds in timings.items():
+            metrics.observe(f"command.{phase}", seconds)
+        result["actions"] = outcomes
+        result["ok"] = all(o["success"] for o in outcomes)
+        result["error"] = None
+        return result, next_prefetch
+
+    def _emit(self, result: Dict[str, Any]) -> None:
+        self.summary["commands"] += 1
+        if not result["ok"]:
+            self.summary["failed"] += 1
+        self.out.write(json.dumps(result, ensure_ascii=False) + "\n")
+        self.out.flush()
+
+
+def run_batch(
+    notion: Any, agent: Any, lines: Iterable[str], out: TextIO, default_page_id: str
+) -> Dict[str, Any]:
+    """Run every command in `lines` against default_page_id or each entry's page_id"""
+    return BatchRunner(notion, agent, out).run(read_commands(lines, default_page_id))
@@ -0,0 +1,87 @@
+import difflib
+from dataclasses import dataclass
+from typing import Any, List, Mapping, Optional, Sequence, Tuple
+
+KEEP = "keep"
+UPDATE = "update"
+INSERT = "insert"
+DELETE = "delete"
+
+
+@dataclass
+class BlockEdit:
+    """
+    One step of a block-level diff.
+
+    old_index points into the old blocks for keep, update and delete. For an
+    insert it is the old block the new one goes after (None: before the first).
+    """
+
+    op: str
+    old_index: Optional[int]
+    text: str = ""
+    block_type: str = "paragraph"
+
+
+def _key(block_type: str, text: str) -> Tuple[str, str]:
+    # Trailing whitespace from the model is not worth a write
+    return block_type, text.strip()
+
+
+def diff_blocks(
+    old: Sequence[Mapping[str, Any]],
+    new: Sequence[Tuple[str, str]],
+    anchored: bool = True,
+) -> List[BlockEdit]:
+    """
+    Minimal edits that turn `old` blocks into `new` (text, block_type) pairs.
+
+    Blocks that match by type and text are kept; a changed run is updated in
+    place pairwise, and any surplus becomes inserts or deletes. The API cannot
+    change a block's type, so a pair whose type differs becomes an insert
+    after the old block followed by its delete. Without an
+    anchor (nothing before old[0] to insert after), a leading insert is
+    folded into the following run so it can be written as updates instead.
+    """
+    old_keys = [_key(str(block["type"]), str(block["content"])) for block in old]
+    new_keys = [_key(block_type, text) for text, block_type in new]
+    opcodes = difflib.SequenceMatcher(None, old_keys, new_keys, autojunk=False).get_opcodes()
+
+    if not anchored and len(opcodes) > 1 and opcodes[0][0] == "insert":
+        _, _, _, j1, _ = opcodes[0]
+        _, _, i2, _, j2 = opcodes[1]
+        opcodes[:2] = [("replace", 0, i2, j1, j2)]
+
+    edits: List[BlockEdit] = []
+    last_old: Optional[int] = None
+    for tag, i1, i2, j1, j2 in opcodes:
+        if tag == "equal":
+            edits.extend(BlockEdit(KEEP, i) for i in range(i1, i2))
+            last_old = i2 - 1
+            continue
+
+        paired = min(i2 - i1, j2 - j1) if tag == "replace" else 0
+        for offset in range(paired):
+            text, block_type = new[j1 + offset]
+            if old_keys[i1 + offset][0] != block_type:
+                edits.append(BlockEdit(INSERT, i1 + offset, text, block_type))
+                edits.append(BlockEdit(DELETE, i1 + offset))
+            else:
+                op = KEEP if old_keys[i1 + offset] == new_keys[j1 + offset] else UPDATE
+                edits.append(BlockEdit(op, i1 + offset, text, block_type))
+            last_old = i1 + offset
+        for j in range(j1 + paired, j2):
+            text, block_type = new[j]
+            edits.append(BlockEdit(INSERT, last_old, text, block_type))
+        edits.extend(BlockEdit(DELETE, i) for i in range(i1 + paired, i2))
+    return edits
+
+
+def summarize(edits: Sequence[BlockEdit]) -> str:
+    counts = {op: 0 for op in (UPDATE, INSERT, DELETE, KEEP)}
+    for edit in edits:
+        counts[edit.op] += 1
+    return (
+        f"{counts[UPDATE]} updated, {counts[INSERT]} inserted, "
+        f"{counts[DELETE]} deleted, {counts[KEEP]} unchanged"
+    )
@@ -1,9 +1,36 @@
 import os
+from typing import Optional, overload
 
-from dotenv import load_dotenv
+_env_loaded = False
 
-# Load environment variables from .env file
-load_dotenv()
+
+def _load_env() -> None:
+    """
+    Load the .env file once, when the first setting is read rather than on
+    import, and apply its LOG_LEVEL to the module loggers.
+    """
+    global _env_loaded
+    if not _env_loaded:
+        _env_loaded = True
+        from dotenv import load_dotenv
+
+        from src.utils import set_log_level
+
+        load_dotenv()
+        set_log_level(os.getenv("LOG_LEVEL", "INFO"))
+
+
+@overload
+def _getenv(name: str) -> Optional[str]: ...
+
+
+@overload
+def _getenv(name: str, default: str) -> str: ...
+
+
+def _getenv(name: str, default: Optional[str] = None) -> Optional[str]:
+    _load_env()
+    return os.getenv(name, default)
 
 
 class Config:
@@ -11,15 +38,19 @@ class Config:
 
     @property
     def notion_token(self) -> str:
-        token = os.getenv("NOTION_TOKEN")
+        token = _getenv("NOTION_TOKEN")
         if not token:
             self._error("NOTION_TOKEN environment variable is not set.")
         assert token is not None
         return token
 
+    @property
+    def notion_base_url(self) -> str:
+        return _getenv("NOTION_BASE_URL", "https://api.notion.com/v1").rstrip("/")
+
     @property
     def page_id(self) -> str:
-        page_id = os.getenv("PAGE_ID")
+        page_id = _getenv("PAGE_ID")
         if not page_id:
             self._error("PAGE_ID environment variable is not set.")
         assert page_id is not None
@@ -27,7 +58,7 @@ class Config:
 
     @property
     def gemini_api_key(self) -> str:
-        api_key = os.getenv("GEMINI_API_KEY")
+        api_key = _getenv("GEMINI_API_KEY")
         if not api_key:
             self._error("GEMINI_API_KEY environment variable is not set.")
         assert api_key is not None
@@ -35,23 +66,224 @@ class Config:
 
     @property
     def gemini_model(self) -> str:
-        return os.getenv("GEMINI_MODEL", "gemini-2.5-flash")
+        return _getenv("GEMINI_MODEL", "gemini-2.5-flash")
+
+    @property
+    def gemini_stream(self) -> bool:
+        return self._flag("GEMINI_STREAM", False)
 
     @property
     def log_level(self) -> str:
-        return os.getenv("LOG_LEVEL", "INFO")
+        return _getenv("LOG_LEVEL", "INFO")
+
+    @property
+    def notion_rate_limit(self) -> float:
+        return max(0.0, self._float("NOTION_RATE_LIMIT", 3.0))
+
+    @property
+    def notion_rate_burst(self) -> float:
+        return max(1.0, self._float("NOTION_RATE_BURST", 3.0))
+
+    @property
+    def notion_max_attempts(self) -> int:
+        return max(1, self._int("NOTION_MAX_ATTEMPTS", 3))
+
+    @property
+    def notion_request_deadline(self) -> float:
+        return max(0.0, self._float("NOTION_REQUEST_DEADLINE", 60.0))
+
+    @property
+    def notion_connect_timeout(self) -> float:
+        return max(0.1, self._float("NOTION_CONNECT_TIMEOUT", 5.0))
+
+    @property
+    def notion_read_timeout(self) -> float:
+        return max(0.1, self._float("NOTION_READ_TIMEOUT", 30.0))
+
+    @property
+    def notion_backoff_base(self) -> float:
+        return max(0.0, self._float("NOTION_BACKOFF_BASE", 0.5))
+
+    @property
+    def notion_backoff_max(self) -> float:
+        return max(0.0, self._float("NOTION_BACKOFF_MAX", 8.0))
+
+    @property
+    def notion_breaker_threshold(self) -> int:
+        return max(0, self._int("NOTION_BREAKER_THRESHOLD", 5))
+
+    @property
+    def notion_breaker_reset(self) -> float:
+        return max(0.0, self._float("NOTION_BREAKER_RESET", 30.0))
+
+    @property
+    def page_reconcile_delay(self) -> float:
+        return max(0.0, self._float("PAGE_RECONCILE_DELAY", 2.0))
+
+    @property
+    def write_behind_delay(self) -> float:
+        return max(0.0, self._float("NOTION_WRITE_BEHIND_DELAY", 0.0))
+
+    @property
+    def watch_interval(self) -> float:
+        return max(0.0, self._float("NOTION_WATCH_INTERVAL", 0.0))
+
+    @property
+    def watch_max_interval(self) -> float:
+        return max(self.watch_interval, self._float("NOTION_WATCH_MAX_INTERVAL", 60.0))
+
+    @property
+    def watch_reserve(self) -> float:
+        return max(0.0, self._float("NOTION_WATCH_RESERVE", 1.0))
+
+    @property
+    def gemini_rate_limit(self) -> float:
+        return max(0.0, self._float("GEMINI_RATE_LIMIT", 0.0))
+
+    @property
+    def gemini_rate_burst(self) -> float:
+        return max(1.0, self._float("GEMINI_RATE_BURST", 1.0))
+
+    @property
+    def gemini_json_mode(self) -> str:
+        value = _getenv("GEMINI_JSON_MODE", "schema").strip().lower()
+        return value if value in ("schema", "json", "off") else "schema"
+
+    @property
+    def gemini_hedge_models(self) -> str:
+        return _getenv("GEMINI_HEDGE_MODELS", "")
 
-    def validate(self) -> bool:
+    @property
+    def gemini_hedge_percentile(self) -> float:
+        return min(1.0, max(0.0, self._float("GEMINI_HEDGE_PERCENTILE", 0.9)))
+
+    @property
+    def gemini_hedge_delay(self) -> float:
+        return max(0.0, self._float("GEMINI_HEDGE_DELAY", 8.0))
+
+    @property
+    def fanout_workers(self) -> int:
+        return max(1, self._int("FANOUT_WORKERS", 4))
+
+    @property
+    def metrics_window(self) -> int:
+        return max(1, self._int("METRICS_WINDOW", 500))
+
+    @property
+    def metrics_export_path(self) -> str:
+        return _getenv("METRICS_EXPORT_PATH", "")
+
+    @property
+    def metrics_export_format(self) -> str:
+        value = _getenv("METRICS_EXPORT_FORMAT", "json").strip().lower()
+        return value if value in ("json", "prometheus") else "json"
+
+    @property
+    def metrics_export_interval(self) -> float:
+        return max(0.0, self._float("METRICS_EXPORT_INTERVAL", 60.0))
+
+    @property
+    def deep_fetch(self) -> bool:
+        return self._flag("NOTION_DEEP_FETCH", False)
+
+    @property
+    def fetch_concurrency(self) -> int:
+        return max(1, self._int("NOTION_FETCH_CONCURRENCY", 3))
+
+    @property
+    def snapshot_cache_size(self) -> int:
+        return max(1, self._int("NOTION_SNAPSHOT_CACHE_SIZE", 32))
+
+    def validate(self, require_page: bool = True) -> bool:
         """Validate all required configuration is present"""
         try:
             _ = self.notion_token
-            _ = self.page_id
+            if require_page:
+                _ = self.page_id
             _ = self.gemini_api_key
             return True
         except ValueError as e:
             print(f"Configuration Error: {e}")
             return False
 
+    @property
+    def context_token_budget(self) -> int:
+        return max(0, self._int("CONTEXT_TOKEN_BUDGET", 32000))
+
+    @property
+    def context_window(self) -> int:
+        return max(0, self._int("CONTEXT_WINDOW", 3))
+
+    @property
+    def retrieval_top_k(self) -> int:
+        return max(0, self._int("RETRIEVAL_TOP_K", 0))
+
+    @property
+    def retrieval_embedder(self) -> str:
+        return _getenv("RETRIEVAL_EMBEDDER", "hashing").strip().lower()
+
+    @property
+    def embedding_model(self) -> str:
+        return _getenv("EMBEDDING_MODEL", "models/text-embedding-004")
+
+    @property
+    def section_summaries(self) -> bool:
+        return self._flag("SECTION_SUMMARIES", False)
+
+    @property
+    def section_summary_min_blocks(self) -> int:
+        return max(1, self._int("SECTION_SUMMARY_MIN_BLOCKS", 4))
+
+    @property
+    def section_summary_model(self) -> str:
+        return _getenv("SECTION_SUMMARY_MODEL", "") or self.gemini_model
+
+    @property
+    def decision_cache_size(self) -> int:
+        return max(0, self._int("DECISION_CACHE_SIZE", 128))
+
+    @property
+    def decision_cache_path(self) -> str:
+        return _getenv("DECISION_CACHE_PATH", "")
+
+    @property
+    def decision_cache_chat_ttl(self) -> float:
+        return self._float("DECISION_CACHE_CHAT_TTL", 3600.0)
+
+    @property
+    def decision_cache_edit_ttl(self) -> float:
+        return self._float("DECISION_CACHE_EDIT_TTL", 3600.0)
+
+    @property
+    def decision_cache_max_disk(self) -> int:
+        return max(1, self._int("DECISION_CACHE_MAX_DISK", 1000))
+
+    def _flag(self, name: str, default: bool) -> bool:
+        value = _getenv(name)
+        if value is None or not value.strip():
+            return default
+        return value.strip().lower() in ("1", "true", "yes", "on")
+
+    def _int(self, name: str, default: int) -> int:
+        value = _getenv(name)
+        if value is None or not value.strip():
+            return default
+        try:
+            return int(value)
+        except ValueError:
+            self._error(f"{name} must be an integer, got {value!r}.")
+            return default
+
+    def _float(self, name: str, default: float) -> float:
+        value = _getenv(name)
+        if value is None or not value.strip():
+            return default
+        try:
+            return float(value)
+        except ValueError:
+            self._error(f"{name} must be a number, got {value!r}.")
+            return default
+
     def _error(self, message: str) -> None:
         """Raise error with helpful message"""
         raise ValueError(f"{message}\nPlease check your .env file or environment variables.")
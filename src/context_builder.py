@@ -0,0 +1,296 @@
+import hashlib
+import re
+from typing import TYPE_CHECKING, Any, Dict, Iterable, List, Mapping, Optional, Set, Tuple
+
+from src.config import config
+from src.utils import setup_logger
+
+if TYPE_CHECKING:
+    from src.retrieval import BlockRetriever
+    from src.section_summaries import SectionSummarizer
+
+logger = setup_logger("ContextBuilder")
+
+# Rough chars-per-token ratio for English prose with Gemini tokenizers
+CHARS_PER_TOKEN = 4
+
+OUTLINE_PREVIEW_CHARS = 60
+
+STOPWORDS = frozenset(
+    "the a an and or of to in on for with about this that these those it its is are was "
+    "be make more less please can could would should into from as at by my our your "
+    "block blocks paragraph paragraphs section text page post".split()
+)
+
+_BLOCK_REF = re.compile(r"\bblock[_\s#]*(\d+)(?:\s*(?:-|–|to)\s*(\d+))?", re.IGNORECASE)
+_WORD = re.compile(r"[^\W\d_]{4,}", re.UNICODE)
+
+
+# A block's header, its render cache key and its token count in full
+Segment = Tuple[str, Tuple[str, str], int]
+
+
+def estimate_tokens(text: str) -> int:
+    """Cheap token estimate; good enough to keep prompts under a budget"""
+    return max(1, (len(text) + CHARS_PER_TOKEN - 1) // CHARS_PER_TOKEN)
+
+
+def content_hash(block: Mapping[str, Any]) -> str:
+    """Stable hash of the parts of a block that end up in a prompt"""
+    raw = f"{block.get('type', '')}\x00{block.get('depth', 0)}\x00{block.get('content', '')}"
+    return hashlib.sha1(raw.encode("utf-8")).hexdigest()
+
+
+class ContextBuilder:
+    """
+    Renders page blocks into the numbered prompt context.
+
+    Each block's rendered content and token count are cached by block id and
+    content hash, so only edited blocks are rendered again between commands.
+    When the whole page does not fit into the token budget, every block is
+    shown as a one-line outline and full text is kept for the blocks around
+    the region the command refers to. With a retriever, keyword matches give
+    way to the top-k blocks by embedding similarity, ranked after the blocks
+    the command names, and nothing else is shown in full.
+    With a summarizer, sections that already have a cached summary and are
+    not needed in full are shown as that one summary instead of outlines.
+    """
+
+    def __init__(
+        self,
+        token_budget: Optional[int] = None,
+        window: Optional[int] = None,
+        retriever: Optional["BlockRetriever"] = None,
+        summarizer: Optional["SectionSummarizer"] = None,
+    ) -> None:
+        self.token_budget = config.context_token_budget if token_budget is None else token_budget
+        self.window = config.context_window if window is None else window
+        self.retriever = retriever
+        self.summarizer = summarizer
+        self._cache: Dict[Tuple[str, str], Tuple[str, int]] = {}
+
+    def build(
+        self,
+        blocks: Iterable[Mapping[str, Any]],
+        query: str = "",
+        focus: Optional[Iterable[int]] = None,
+    ) -> str:
+        """
+        Build the context string. `focus` optionally lists block indexes known
+        to be relevant (e.g. from retrieval); they are kept verbatim first.
+
+        `blocks` may be a list or a stream such as NotionClient.iter_page_blocks;
+        it is read once and parents always precede their children, so parent
+        indexes are resolved as the blocks arrive. Only each block's short
+        header and token count are kept besides the block itself; the
+        rendered text stays in the render cache until it is output.
+        """
+        index_by_id: Dict[str, int] = {}
+        live_keys: Set[Tuple[str, str]] = set()
+        segments: List[Segment] = []
+        seen: List[Mapping[str, Any]] = []
+
+        for idx, block in enumerate(blocks):
+            seen.append(block)
+            index_by_id[block["id"]] = idx
+            header = self._header(idx, block, index_by_id)
+            key, body_tokens = self._render(block, live_keys)
+            segments.append((header, key, estimate_tokens(header) + body_tokens))
+
+        # Forget blocks that no longer exist or changed
+        for key in list(self._cache):
+            if key not in live_keys:
+                del self._cache[key]
+
+        total = sum(tokens for _, _, tokens in segments)
+        if not self.token_budget or total <= self.token_budget:
+            return "\n\n".join(self._segment_text(segment) for segment in segments)
+
+        logger.info(
+            f"Page context (~{total} tokens) exceeds budget of {self.token_budget}, "
+            "using outline mode"
+        )
+        return self._build_outline(seen, segments, query, focus)
+
+    def _header(self, idx: int, block: Mapping[str, Any], index_by_id: Dict[str, int]) -> str:
+        # Include type to help agent decide if it should preserve or change it
+        b_info = f"[BLOCK_{idx}] (ID: {block['id']}, Type: {block['type']}"
+        depth: int = block.get("depth", 0)
+        if depth:
+            # Nested blocks point at their parent so the tree can be reconstructed
+            parent_idx = index_by_id.get(block.get("parent_id", ""))
+            parent = f"BLOCK_{parent_idx}" if parent_idx is not None else "?"
+            b_info += f", Depth: {depth}, Parent: {parent}"
+        return "  " * depth + b_info + ")"
+
+    def _render(
+        self, block: Mapping[str, Any], live_keys: Set[Tuple[str, str]]
+    ) -> Tuple[Tuple[str, str], int]:
+        """Render the block's body into the cache; returns its cache key and token count"""
+        key = (block["id"], content_hash(block))
+        live_keys.add(key)
+        cached = self._cache.get(key)
+        if cached is None:
+            body = f"{'  ' * block.get('depth', 0)}Content: {block['content']}"
+            cached = (body, estimate_tokens(body))
+            self._cache[key] = cached
+        return key, cached[1]
+
+    def _segment_text(self, segment: Segment) -> str:
+        header, key, _ = segment
+        return f"{header}\n{self._cache[key][0]}"
+
+    def _build_outline(
+        self,
+        blocks: List[Mapping[str, Any]],
+        segments: List[Segment],
+        query: str,
+        focus: Optional[Iterable[int]],
+    ) -> str:
+        outlines = [self._outline(idx, block) for idx, block in enumerate(blocks)]
+        outline_tokens = [estimate_tokens(line) for line in outlines]
+        remaining = self.token_budget - sum(outline_tokens)
+
+        # Section start -> (end, summary line, tokens) for sections shown as a summary
+        collapsed: Dict[int, Tuple[int, str, int]] = {}
+        if self.summarizer is not None:
+            sections = self.summarizer.sections(blocks)
+            # Summaries are made in the background and used from the next command on
+            self.summarizer.schedule(blocks, sections)
+            for start, end, key in sections:
+                summary = self.summarizer.get(key)
+                if summary is None:
+                    continue
+                line = self._summary_line(start, end, blocks[start], summary)
+                saved = sum(outline_tokens[start:end]) - estimate_tokens(line)
+                if saved > 0:
+                    collapsed[start] = (end, line, saved)
+                    remaining += saved
+        section_of = {
+            idx: start for start, (end, _, _) in collapsed.items() for idx in range(start, end)
+        }
+
+        backfill = True
+        if self.retriever is not None and focus is None:
+            try:
+                retrieved = self.retriever.search(blocks, query)
+                priority = self._priority(blocks, query, None, backfill=False, retrieved=retrieved)
+                backfill = False
+            except Exception as e:
+                logger.warning(f"Retrieval failed, falling back to keyword matching: {e}")
+                priority = self._priority(blocks, query, focus, backfill=False)
+        else:
+            priority = self._priority(blocks, query, focus, backfill=False)
+        anchored = len(priority)
+        if backfill:
+            seen = set(priority)
+            priority.extend(idx for idx in range(len(blocks)) if idx not in seen)
+
+        full: Set[int] = set()
+        for rank, idx in enumerate(priority):
+            extra = segments[idx][2] - outline_tokens[idx]
+            section = section_of.get(idx)
+            if section is not None:
+                # Only blocks the command points at are worth expanding a summary
+                if rank >= anchored:
+                    continue
+                extra += collapsed[section][2]
+            if idx in full or extra > remaining:
+                continue
+            if section is not None:
+                for covered in range(section, collapsed.pop(section)[0]):
+                    del section_of[covered]
+            full.add(idx)
+            remaining -= extra
+
+        parts = [
+            "NOTE: This page is too long to show in full. Blocks marked (outline) show "
+            "only a preview, and (section summary) lines only summarize a range of "
+            "blocks. Never UPDATE, DELETE or REWRITE those blocks; ask the user to "
+            "point at the section instead."
+        ]
+        idx = 0
+        while idx < len(blocks):
+            if idx in collapsed:
+                end, line, _ = collapsed[idx]
+                parts.append(line)
+                idx = end
+                continue
+            parts.append(self._segment_text(segments[idx]) if idx in full else outlines[idx])
+            idx += 1
+        return "\n\n".join(parts)
+
+    def _summary_line(self, start: int, end: int, first: Mapping[str, Any], summary: str) -> str:
+        title = " ".join(str(first.get("content", "")).split())[:OUTLINE_PREVIEW_CHARS]
+        return f'[BLOCK_{start}-BLOCK_{end - 1}] (section summary, "{title}") {summary}'
+
+    def _outline(self, idx: int, block: Mapping[str, Any]) -> str:
+        content = " ".join(str(block.get("content", "")).split())
+        if len(content) > OUTLINE_PREVIEW_CHARS:
+            content = content[:OUTLINE_PREVIEW_CHARS].rstrip() + "…"
+        indent = "  " * block.get("depth", 0)
+        return f"{indent}[BLOCK_{idx}] (outline, Type: {block['type']}) {content}"
+
+    def _priority(
+        self,
+        blocks: List[Mapping[str, Any]],
+        query: str,
+        focus: Optional[Iterable[int]],
+        backfill: bool = True,
+        retrieved: Optional[Iterable[int]] = None,
+    ) -> List[int]:
+        """
+        Order block indexes by how likely the command needs their full text:
+        explicit focus and block references, keyword matches (or the
+        `retrieved` blocks instead), positional hints, each expanded by a
+        window of neighbours; then, with backfill, the rest of the page.
+        """
+        count = len(blocks)
+        anchors: List[int] = [idx for idx in (focus or []) if 0 <= idx < count]
+        anchors.extend(self._referenced_blocks(query, count))
+        if retrieved is None:
+            anchors.extend(self._keyword_matches(blocks, query))
+
+        lowered = query.lower()
+        if query and any(word in lowered for word in ("intro", "beginning", "first", "title")):
+            anchors.append(0)
+        if query and any(word in lowered for word in ("conclusion", "ending", "last", "end of")):
+            anchors.append(count - 1)
+        # Similarity is a weaker signal than the command naming a block
+        anchors.extend(idx for idx in (retrieved or []) if 0 <= idx < count)
+
+        ordered: List[int] = []
+        seen: Set[int] = set()
+        for anchor in anchors:
+            # The anchor itself first, then its neighbours closest first
+            for offset in [0] + [d for n in range(1, self.window + 1) for d in (-n, n)]:
+                idx = anchor + offset
+                if 0 <= idx < count and idx not in seen:
+                    seen.add(idx)
+                    ordered.append(idx)
+        if backfill:
+            ordered.extend(idx for idx in range(count) if idx not in seen)
+        return ordered
+
+    def _referenced_blocks(self, query: str, count: int) -> List[int]:
+        refs: List[int] = []
+        for match in _BLOCK_REF.finditer(query):
+            start = int(match.group(1))
+            end = int(match.group(2)) if match.group(2) else start
+            refs.extend(idx for idx in range(start, end + 1) if idx < count)
+        return refs
+
+    def _keyword_matches(
+        self, blocks: List[Mapping[str, Any]], query: str, limit: int = 5
+    ) -> List[int]:
+        words = {w.lower() for w in _WORD.findall(query)} - STOPWORDS
+        if not words:
+            return []
+        scored = []
+        for idx, block in enumerate(blocks):
+            content = str(block.get("content", "")).lower()
+            score = sum(1 for word in words if word in content)
+            if score:
+                scored.append((score, idx))
+        scored.sort(key=lambda item: (-item[0], item[1]))
+        return [idx for _, idx in scored[:limit]]
@@ -0,0 +1,202 @@
+import copy
+import hashlib
+import json
+import re
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Tuple
+
+from src.config import config
+from src.utils import setup_logger
+
+logger = setup_logger("DecisionCache")
+
+CHAT = "chat"
+EDIT = "edit"
+
+
+def normalize_query(query: str) -> str:
+    """Case, whitespace and trailing punctuation do not change the meaning of a command"""
+    return re.sub(r"\s+", " ", query).strip().rstrip(".!?").lower()
+
+
+def plan_kind(plan: List[Dict[str, Any]]) -> str:
+    """A plan made only of CHAT replies is an answer; anything else edits the page"""
+    return CHAT if all(a.get("action") == "CHAT" for a in plan) else EDIT
+
+
+class DecisionCache:
+    """
+    Memoizes GeminiAgent decisions keyed by (model, normalized query, context).
+
+    Entries live in an in-memory LRU and, when a path is configured, in a
+    SQLite file so they survive restarts. CHAT answers and edit plans have
+    their own TTL; a TTL of 0 disables caching for that kind. The persistent
+    store drops expired entries and evicts the least recently used ones once
+    it holds more than max_disk_entries.
+    """
+
+    def __init__(
+        self,
+        max_entries: Optional[int] = None,
+        path: Optional[str] = None,
+        chat_ttl: Optional[float] = None,
+        edit_ttl: Optional[float] = None,
+        max_disk_entries: Optional[int] = None,
+    ) -> None:
+        self.max_entries = config.decision_cache_size if max_entries is None else max_entries
+        self.ttl = {
+            CHAT: config.decision_cache_chat_ttl if chat_ttl is None else chat_ttl,
+            EDIT: config.decision_cache_edit_ttl if edit_ttl is None else edit_ttl,
+        }
+        self.max_disk_entries = (
+            config.decision_cache_max_disk if max_disk_entries is None else max_disk_entries
+        )
+        self.stats: Dict[str, int] = {
+            "hits": 0,
+            "misses": 0,
+            "chat_hits": 0,
+            "edit_hits": 0,
+            "disk_hits": 0,
+        }
+
+        self._memory: "OrderedDict[str, Tuple[str, float, List[Dict[str, Any]]]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._db: Optional[sqlite3.Connection] = None
+
+        path = config.decision_cache_path if path is None else path
+        if path:
+            self._open(path)
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_entries > 0 and any(ttl > 0 for ttl in self.ttl.values())
+
+    @staticmethod
+    def make_key(model: str, query: str, context: str) -> str:
+        digest = hashlib.sha256()
+        for part in (model, normalize_query(query), context):
+            digest.update(part.encode("utf-8"))
+            digest.update(b"\x00")
+        return digest.hexdigest()
+
+    def get(self, key: str) -> Optional[List[Dict[str, Any]]]:
+        """Return a copy of the cached plan, or None on a miss"""
+        if not self.enabled:
+            return None
+
+        now = time.time()
+        with self._lock:
+            entry = self._memory.get(key)
+            from_disk = False
+            if entry is None:
+                entry = self._load(key)
+                from_disk = entry is not None
+
+            if entry is not None and not self._expired(entry[0], entry[1], now):
+                kind, created, plan = entry
+                self._remember(key, kind, created, plan)
+                self.stats["hits"] += 1
+                self.stats[f"{kind}_hits"] += 1
+                if from_disk:
+                    self.stats["disk_hits"] += 1
+                return copy.deepcopy(plan)
+
+            if entry is not None:
+                self._memory.pop(key, None)
+                self._delete(key)
+            self.stats["misses"] += 1
+            return None
+
+    def put(self, key: str, plan: List[Dict[str, Any]]) -> None:
+        """Store a plan, unless caching is disabled for its kind"""
+        kind = plan_kind(plan)
+        if not self.enabled or self.ttl[kind] <= 0:
+            return
+
+        created = time.time()
+        stored = copy.deepcopy(plan)
+        with self._lock:
+            self._remember(key, kind, created, stored)
+            self._store(key, kind, created, stored)
+
+    def summary(self) -> str:
+        lookups = self.stats["hits"] + self.stats["misses"]
+        rate = (self.stats["hits"] / lookups * 100) if lookups else 0.0
+        return (
+            f"{self.stats['hits']} hits ({self.stats['chat_hits']} chat, "
+            f"{self.stats['edit_hits']} edit, {self.stats['disk_hits']} from disk), "
+            f"{self.stats['misses']} misses, {rate:.0f}% hit rate, "
+            f"{len(self._memory)} entries in memory"
+        )
+
+    def _expired(self, kind: str, created: float, now: float) -> bool:
+        ttl = self.ttl.get(kind, 0)
+        return ttl <= 0 or now - created > ttl
+
+    def _remember(self, key: str, kind: str, created: float, plan: List[Dict[str, Any]]) -> None:
+        self._memory[key] = (kind, created, plan)
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_entries:
+            self._memory.popitem(last=False)
+
+    def _open(self, path: str) -> None:
+        try:
+            self._db = sqlite3.connect(path, check_same_thread=False)
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS decisions ("
+                "key TEXT PRIMARY KEY, kind TEXT, created REAL, accessed REAL, plan TEXT)"
+            )
+            self._db.commit()
+        except sqlite3.Error as e:
+            logger.warning(f"Decision cache at {path} unavailable, using memory only: {e}")
+            self._db = None
+
+    def _load(self, key: str) -> Optional[Tuple[str, float, List[Dict[str, Any]]]]:
+        if self._db is None:
+            return None
+        try:
+            row = self._db.execute(
+                "SELECT kind, created, plan FROM decisions WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None:
+                return None
+            self._db.execute("UPDATE decisions SET accessed = ? WHERE key = ?", (time.time(), key))
+            self._db.commit()
+            return row[0], float(row[1]), json.loads(row[2])
+        except (sqlite3.Error, ValueError) as e:
+            logger.warning(f"Decision cache read failed: {e}")
+            return None
+
+    def _store(self, key: str, kind: str, created: float, plan: List[Dict[str, Any]]) -> None:
+        if self._db is None:
+            return
+        try:
+            self._db.execute(
+                "INSERT OR REPLACE INTO decisions VALUES (?, ?, ?, ?, ?)",
+                (key, kind, created, created, json.dumps(plan)),
+            )
+            for expired_kind, ttl in self.ttl.items():
+                self._db.execute(
+                    "DELETE FROM decisions WHERE kind = ? AND created < ?",
+                    (expired_kind, created - max(ttl, 0)),
+                )
+            self._db.execute(
+                "DELETE FROM decisions WHERE key NOT IN "
+                "(SELECT key FROM decisions ORDER BY accessed DESC LIMIT ?)",
+                (self.max_disk_entries,),
+            )
+            self._db.commit()
+        except sqlite3.Error as e:
+            logger.warning(f"Decision cache write failed: {e}")
+
+    def _delete(self, key: str) -> None:
+        if self._db is None:
+            return
+        try:
+            self._db.execute("DELETE FROM decisions WHERE key = ?", (key,))
+            self._db.commit()
+        except sqlite3.Error as e:
+            logger.warning(f"Decision cache delete failed: {e}")
@@ -1,12 +1,94 @@
-from typing import List
-
-import google.generativeai as genai
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from typing import TYPE_CHECKING, Any, Dict, List, Optional, Tuple
 
 from src.config import config
-from src.utils import print_colored, setup_logger
+from src.context_builder import ContextBuilder, estimate_tokens
+from src.utils import LazyModule, print_colored, setup_logger
+
+if TYPE_CHECKING:
+    import google.generativeai as genai
+else:
+    genai = LazyModule("google.generativeai")
 
 logger = setup_logger("Diagnostics", "INFO")
 
+# Used for benchmark prompts when the configured page cannot be read
+SAMPLE_BLOCKS = [
+    {"id": "sample-0", "type": "heading_1", "content": "Why we moved our builds to ARM"},
+    {
+        "id": "sample-1",
+        "type": "paragraph",
+        "content": "Last year our CI bill doubled while build times crept past twenty minutes. "
+        "We tried bigger machines, smarter caching and fewer tests before looking at the "
+        "hardware itself.",
+    },
+    {"id": "sample-2", "type": "heading_2", "content": "What we measured"},
+    {
+        "id": "sample-3",
+        "type": "paragraph",
+        "content": "Across 400 builds the ARM runners were 31% cheaper and 12% faster, with "
+        "two flaky tests that turned out to depend on x86 floating point rounding.",
+    },
+    {"id": "sample-4", "type": "bulleted_list_item", "content": "Docker images built for both"},
+    {"id": "sample-5", "type": "bulleted_list_item", "content": "Native modules rebuilt once"},
+    {"id": "sample-6", "type": "heading_2", "content": "Conclusion"},
+    {"id": "sample-7", "type": "paragraph", "content": "It was worth it, mostly."},
+]
+
+BENCH_COMMANDS = [
+    "Fix grammar and typos in the first paragraph",
+    "Make the introduction more engaging",
+    "Add a short paragraph after the measurements explaining the flaky tests",
+    "Rewrite the conclusion so it summarizes the numbers",
+    "Turn the paragraph under 'What we measured' into bullet points",
+    "What is this post about?",
+]
+
+
+def _percentile(values: List[float], share: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * share))] if ordered else 0.0
+
+
+@dataclass
+class ModelBenchmark:
+    """Latencies and failures of one model over a benchmark run"""
+
+    model: str
+    latencies: List[float] = field(default_factory=list)
+    output_tokens: int = 0
+    errors: int = 0
+
+    @property
+    def requests(self) -> int:
+        return len(self.latencies) + self.errors
+
+    @property
+    def error_rate(self) -> float:
+        return self.errors / self.requests if self.requests else 0.0
+
+    @property
+    def tokens_per_second(self) -> float:
+        busy = sum(self.latencies)
+        return self.output_tokens / busy if busy else 0.0
+
+    def p(self, share: float) -> float:
+        return _percentile(self.latencies, share)
+
+    def rank_key(self) -> Tuple[bool, float, float]:
+        # Models that never answered go last, then fewer errors, then faster p50
+        return (not self.latencies, self.error_rate, self.p(0.5))
+
+
+def generate_content_models() -> List[str]:
+    """Names of the models this API key can call generateContent on"""
+    genai.configure(api_key=config.gemini_api_key)
+    return [
+        m.name for m in genai.list_models() if "generateContent" in m.supported_generation_methods
+    ]
+
 
 class Diagnostics:
     def __init__(self) -> None:
@@ -47,12 +129,10 @@ class Diagnostics:
 
     def _list_available_models(self) -> List[str]:
         print("\n[2/3] Fetching Available Gemini Models...")
-        models_found = []
         try:
-            for m in genai.list_models():
-                if "generateContent" in m.supported_generation_methods:
-                    print(f"  - {m.name}")
-                    models_found.append(m.name)
+            models_found = generate_content_models()
+            for name in models_found:
+                print(f"  - {name}")
 
             if not models_found:
                 print_colored("  ⚠️  No 'generateContent' models found for this API key.", "yellow")
@@ -65,9 +145,7 @@ class Diagnostics:
             print_colored(f"  Error: {e}", "white")
             return []
 
-    def _test_default_model(self, available_models: List[str]) -> None:
-        print("\n[3/3] Finding a working model...")
-
+    def _candidate_models(self, available_models: List[str]) -> List[str]:
         # Priority list of models to try
         models_to_try = [
             config.gemini_model,  # Try configured one first
@@ -83,6 +161,11 @@ class Diagnostics:
             clean_name = m.replace("models/", "")
             if clean_name not in models_to_try and "flash" in clean_name:
                 models_to_try.append(clean_name)
+        return models_to_try
+
+    def _test_default_model(self, available_models: List[str]) -> None:
+        print("\n[3/3] Finding a working model...")
+        models_to_try = self._candidate_models(available_models)
 
         tested = set()
         working_model = None
@@ -125,6 +208,136 @@ class Diagnostics:
             )
             print("  Please check your billing and API limits at https://aistudio.google.com/")
 
+    def run_benchmark(
+        self,
+        requests: int = 6,
+        concurrency: int = 3,
+        models: Optional[List[str]] = None,
+    ) -> List[ModelBenchmark]:
+        """
+        Send `requests` editing prompts (`concurrency` at a time) to each
+        candidate model and print them ranked by error rate and p50 latency.
+        Also times reading the configured page and a write round trip.
+        """
+        print_colored("\n⏱️  Starting Benchmark...", "cyan")
+        print_colored("--------------------------------", "white")
+        if not self._check_api_key():
+            return []
+
+        blocks = self._bench_notion()
+        if not blocks:
+            print("  Using a built-in sample page for prompts.")
+            blocks = SAMPLE_BLOCKS
+
+        if models is None:
+            available = self._list_available_models()
+            models = list(dict.fromkeys(self._candidate_models(available)))
+
+        prompts = self._bench_prompts(blocks, requests)
+        print(f"\nBenchmarking {len(models)} models: {requests} prompts, {concurrency} at a time")
+        results = [self._bench_model(name, prompts, concurrency) for name in models]
+        results.sort(key=ModelBenchmark.rank_key)
+        self._print_ranking(results)
+        return results
+
+    def _bench_notion(self) -> List[Dict[str, Any]]:
+        """Time a full paginated read of PAGE_ID and an append + delete round trip"""
+        try:
+            page_id = config.page_id
+            _ = config.notion_token
+        except ValueError:
+            print("\n[Notion] NOTION_TOKEN / PAGE_ID not set, skipping Notion timings.")
+            return []
+
+        from src.notion_client import NotionClient
+
+        print(f"\n[Notion] Timing page {page_id}...")
+        notion = NotionClient()
+        reads: List[float] = []
+        blocks: List[Dict[str, Any]] = []
+        for _ in range(3):
+            started = time.perf_counter()
+            blocks = notion.get_page_blocks(page_id, force_refresh=True)
+            reads.append(time.perf_counter() - started)
+        # Every read is one page metadata request plus the listings
+        listings = notion.request_stats["requests"] / len(reads) - 1
+        print(
+            f"  Read {len(blocks)} blocks: p50 {_percentile(reads, 0.5) * 1000:.0f} ms, "
+            f"p95 {_percentile(reads, 0.95) * 1000:.0f} ms ({listings:.0f} listing requests)"
+        )
+
+        probes: List[str] = []
+        notion.subscribe(
+            lambda _, payload: probes.extend(b["id"] for b in payload.get("blocks", []))
+        )
+        started = time.perf_counter()
+        appended = notion.append_block(page_id, "Notion Sidecar benchmark probe")
+        append_ms = (time.perf_counter() - started) * 1000
+        started = time.perf_counter()
+        deleted = bool(probes) and notion.delete_block(probes[-1])
+        delete_ms = (time.perf_counter() - started) * 1000
+        if appended and deleted:
+            print(f"  Write round trip: append {append_ms:.0f} ms, delete {delete_ms:.0f} ms")
+        else:
+            print_colored("  Write round trip failed; check the page for a probe block.", "yellow")
+        return blocks
+
+    def _bench_prompts(self, blocks: List[Dict[str, Any]], count: int) -> List[str]:
+        from src.gemini_agent import build_prompt
+
+        builder = ContextBuilder()
+        return [
+            build_prompt(command, builder.build(blocks, command))
+            for command in (BENCH_COMMANDS[i % len(BENCH_COMMANDS)] for i in range(count))
+        ]
+
+    def _bench_model(self, name: str, prompts: List[str], concurrency: int) -> ModelBenchmark:
+        from src.gemini_agent import new_plan_model
+
+        result = ModelBenchmark(name)
+        # The same JSON mode and response schema as the agent's own requests
+        model = new_plan_model(name)
+
+        def _one(prompt: str) -> Tuple[float, int]:
+            started = time.perf_counter()
+            response = model.generate_content(prompt)
+            elapsed = time.perf_counter() - started
+            usage = getattr(response, "usage_metadata", None)
+            tokens = getattr(usage, "candidates_token_count", None)
+            return elapsed, tokens if isinstance(tokens, int) else estimate_tokens(response.text)
+
+        print(f"  {name}...", end="", flush=True)
+        with ThreadPoolExecutor(max_workers=max(1, concurrency)) as pool:
+            futures = [pool.submit(_one, prompt) for prompt in prompts]
+            for future in futures:
+                try:
+                    elapsed, tokens = future.result()
+                except Exception as e:
+                    logger.debug(f"{name} failed: {e}")
+                    result.errors += 1
+                    continue
+                result.latencies.append(elapsed)
+                result.output_tokens += tokens
+        print_colored(
+            " done" if result.latencies else " failed", "green" if result.latencies else "red"
+        )
+        return result
+
+    def _print_ranking(self, results: List[ModelBenchmark]) -> None:
+        print(f"\n{'#':<4}{'model':<32}{'p50 ms':>10}{'p95 ms':>10}{'tok/s':>10}{'errors':>9}")
+        for rank, result in enumerate(results, start=1):
+            line = (
+                f"{rank:<4}{result.model:<32}{result.p(0.5) * 1000:>10.0f}"
+                f"{result.p(0.95) * 1000:>10.0f}{result.tokens_per_second:>10.1f}"
+                f"{result.error_rate:>9.0%}"
+            )
+            print_colored(line, "white" if result.latencies else "red")
+        if results and results[0].latencies:
+            best = results[0].model.replace("models/", "")
+            print_colored(f"\n✅ Fastest reliable model: set GEMINI_MODEL={best}", "green")
+        else:
+            print_colored("\n❌ No model answered any benchmark prompt.", "red")
+
 
 if __name__ == "__main__":
     diag = Diagnostics()
@@ -0,0 +1,154 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, Iterable, List, Optional
+
+from src.agent import execute_actions
+from src.config import config
+from src.utils import print_colored, setup_logger
+
+logger = setup_logger("FanOut")
+
+
+@dataclass
+class PageResult:
+    """What happened to one page of a fan-out run"""
+
+    page_id: str
+    seconds: float = 0.0
+    blocks: int = 0
+    outcomes: List[Dict[str, Any]] = field(default_factory=list)
+    error: Optional[str] = None
+
+    @property
+    def edits(self) -> List[Dict[str, Any]]:
+        return [o for o in self.outcomes if o["action"] != "CHAT"]
+
+    @property
+    def applied(self) -> int:
+        return sum(1 for o in self.edits if o["success"])
+
+    @property
+    def ok(self) -> bool:
+        return self.error is None and self.applied == len(self.edits)
+
+
+def resolve_pages(
+    notion: Any,
+    page_ids: Iterable[str] = (),
+    database_id: Optional[str] = None,
+    filter: Optional[Dict[str, Any]] = None,
+    limit: Optional[int] = None,
+) -> List[str]:
+    """Explicit page ids followed by the pages of a database query, without duplicates"""
+    ids = list(page_ids)
+    if database_id:
+        ids.extend(notion.query_database(database_id, filter=filter, limit=limit))
+    return list(dict.fromkeys(ids))
+
+
+class FanOut:
+    """
+    Runs one instruction across many pages: fetch, reason and execute for
+    each page, with up to `workers` pages in flight.
+
+    All workers share one Notion client, and through it the per-token rate
+    limiter and circuit breaker; Gemini calls share the GEMINI_RATE_LIMIT
+    bucket. Each worker thread gets its own agent from `agent_factory`, so
+    per-page context caches do not evict each other.
+    """
+
+    def __init__(
+        self, notion: Any, agent_factory: Callable[[], Any], workers: Optional[int] = None
+    ) -> None:
+        self.notion = notion
+        self.agent_factory = agent_factory
+        self.workers = config.fanout_workers if workers is None else max(1, workers)
+        self._local = threading.local()
+
+    def run(
+        self,
+        instruction: str,
+        page_ids: List[str],
+        on_result: Optional[Callable[[PageResult], None]] = None,
+    ) -> List[PageResult]:
+        """Process every page; results are returned in the order of page_ids"""
+        results: Dict[str, PageResult] = {}
+        with ThreadPoolExecutor(max_workers=self.workers) as pool:
+            futures = [pool.submit(self._process, instruction, page_id) for page_id in page_ids]
+            for future in as_completed(futures):
+                result = future.result()
+                results[result.page_id] = result
+                if on_result is not None:
+                    on_result(result)
+        return [results[page_id] for page_id in page_ids]
+
+    def _agent(self) -> Any:
+        agent = getattr(self._local, "agent", None)
+        if agent is None:
+            agent = self.agent_factory()
+            self._local.agent = agent
+        return agent
+
+    def _process(self, instruction: str, page_id: str) -> PageResult:
+        result = PageResult(page_id)
+        started = time.perf_counter()
+        try:
+            blocks = self.notion.get_page_blocks(page_id)
+            result.blocks = len(blocks)
+            plan = self._agent().analyze_and_act(instruction, blocks)
+            result.outcomes = execute_actions(self.notion, plan, blocks, page_id)
+        except Exception as e:
+            logger.error(f"Page {page_id} failed: {e}")
+            result.error = str(e)
+        result.seconds = time.perf_counter() - started
+        return result
+
+
+def report_page(result: PageResult) -> None:
+    """Progress line for one finished page"""
+    for outcome in result.outcomes:
+        if outcome["action"] == "CHAT":
+            print_colored(f"[AGENT] {result.page_id}: {outcome['message']}", "white")
+    if result.error:
+        print_colored(f"[ERROR] {result.page_id}: {result.error}", "red")
+    elif result.edits:
+        color = "green" if result.ok else "yellow"
+        print_colored(
+            f"[INFO] {result.page_id}: applied {result.applied}/{len(result.edits)} actions "
+            f"({result.seconds:.1f}s)",
+            color,
+        )
+
+
+def report_fanout(results: List[PageResult], elapsed: float) -> None:
+    """Aggregate throughput and failures of a fan-out run"""
+    if not results:
+        print_colored("[WARNING] No pages to process.", "yellow")
+        return
+
+    failed = [r for r in results if not r.ok]
+    edits = sum(len(r.edits) for r in results)
+    applied = sum(r.applied for r in results)
+    latencies = sorted(r.seconds for r in results)
+    p50 = latencies[len(latencies) // 2]
+    p95 = latencies[min(len(latencies) - 1, int(len(latencies) * 0.95))]
+    per_minute = len(results) / elapsed * 60 if elapsed > 0 else 0.0
+
+    print_colored("-" * 48, "white")
+    print_colored(
+        f"[INFO] {len(results)} pages in {elapsed:.1f}s ({per_minute:.1f} pages/min), "
+        f"{applied}/{edits} actions applied",
+        "blue",
+    )
+    print_colored(
+        f"[INFO] Per page: p50 {p50:.1f}s, p95 {p95:.1f}s, max {latencies[-1]:.1f}s", "blue"
+    )
+    if failed:
+        print_colored(f"[ERROR] {len(failed)} pages failed or were only partly edited:", "red")
+        for result in failed:
+            reason = result.error or f"{len(result.edits) - result.applied} actions failed"
+            print_colored(f"  {result.page_id}: {reason}", "red")
+    else:
+        print_colored("[SUCCESS] All pages processed.", "green")
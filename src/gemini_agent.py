@@ -1,12 +1,157 @@
 import json
-from typing import Any, Dict, List, cast
-
-import google.generativeai as genai
+from typing import (
+    TYPE_CHECKING,
+    Any,
+    Callable,
+    Dict,
+    Iterable,
+    List,
+    Mapping,
+    Optional,
+    Tuple,
+    cast,
+)
 
 from src.config import config
-from src.utils import setup_logger
+from src.context_builder import ContextBuilder, estimate_tokens
+from src.hedging import HedgedGenerator, hedge_models
+from src.json_repair import repair_json
+from src.metrics import metrics
+from src.rate_limiter import get_rate_limiter
+from src.retrieval import BlockRetriever
+from src.section_summaries import SectionSummarizer
+from src.stream_parser import IncrementalPlanParser, validate_action_event
+from src.utils import LazyModule, setup_logger
+
+if TYPE_CHECKING:
+    import google.generativeai as genai
+
+    from src.decision_cache import DecisionCache
+else:
+    # The SDK takes most of a second to import; load it when an agent is built
+    genai = LazyModule("google.generativeai")
+
+logger = setup_logger("GeminiAgent")
+
+ACTION_NAMES = ["UPDATE", "APPEND", "DELETE", "INSERT", "REWRITE", "CHAT"]
+
+# Response schema for GEMINI_JSON_MODE=schema (OpenAPI subset used by the SDK)
+PLAN_SCHEMA: Dict[str, Any] = {
+    "type": "object",
+    "properties": {
+        "actions": {
+            "type": "array",
+            "items": {
+                "type": "object",
+                "properties": {
+                    "action": {"type": "string", "enum": ACTION_NAMES},
+                    "target_block_index": {"type": "integer"},
+                    "end_block_index": {"type": "integer"},
+                    "block_type": {"type": "string"},
+                    "text": {"type": "string"},
+                    "blocks": {
+                        "type": "array",
+                        "items": {
+                            "type": "object",
+                            "properties": {
+                                "block_type": {"type": "string"},
+                                "text": {"type": "string"},
+                            },
+                            "required": ["text"],
+                        },
+                    },
+                },
+                "required": ["action"],
+            },
+        }
+    },
+    "required": ["actions"],
+}
+
+# Longest piece of a broken response sent back for the repair retry
+REPAIR_EXCERPT_CHARS = 8000
+
+
+def new_plan_model(name: str) -> "genai.GenerativeModel":
+    """
+    A model for action plans, asked for JSON where the SDK supports it (see
+    GEMINI_JSON_MODE). With a response schema Gemini writes keys in its own
+    order, which would delay early action events, so streaming only requests
+    the JSON mime type.
+    """
+    mode = config.gemini_json_mode
+    if mode == "off":
+        return genai.GenerativeModel(name)
+    generation_config: Dict[str, Any] = {"response_mime_type": "application/json"}
+    if mode == "schema" and not config.gemini_stream:
+        generation_config["response_schema"] = PLAN_SCHEMA
+    try:
+        return genai.GenerativeModel(
+            name, generation_config=cast("genai.GenerationConfig", generation_config)
+        )
+    except Exception as e:
+        logger.warning(f"JSON mode not available for {name}, using plain text: {e}")
+        return genai.GenerativeModel(name)
+
+
+def build_prompt(query: str, context: str) -> str:
+    """The editing prompt for a command against the rendered page context"""
+    return f"""
+    You are an intelligent Notion Blog Editor Agent.
+    Your goal is to help the user edit, write, or refine their blog post.
 
-logger = setup_logger("GeminiAgent", config.log_level)
+    CURRENT PAGE CONTENT (Indexed Blocks):
+    ----------------------------------------
+    {context}
+    ----------------------------------------
+
+    USER COMMAND: "{query}"
+
+    INSTRUCTIONS:
+    1. Analyze the user's command and the current content.
+    2. Plan an ordered list of one or more of the following actions:
+       - 'UPDATE': Modify an existing block's content.
+       - 'APPEND': Add a new block to the end of the page.
+       - 'DELETE': Remove a specific block.
+       - 'INSERT': Insert a new block AFTER a specific block.
+       - 'REWRITE': Replace a whole section, blocks target_block_index through
+         end_block_index (same nesting level), with the blocks listed in
+         "blocks". Repeat unchanged blocks verbatim; only differences are written.
+       - 'CHAT': Reply to the user if no editing is needed.
+       Use as many actions as the command needs (e.g. one UPDATE per paragraph
+       to reword, then an APPEND for a new conclusion). UPDATE cannot change a
+       block's type: to convert blocks, REWRITE them or DELETE and INSERT.
+       Prefer one REWRITE over many UPDATE/INSERT/DELETE actions when
+       reworking a section.
+
+    3. IMPORTANT: Work with block indexes (0, 1, 2...) from the context above.
+       Nested blocks are indented and name their parent block.
+       Every index refers to the page AS SHOWN ABOVE; do not adjust indexes for
+       blocks added or removed by earlier actions in your plan. Several INSERTs
+       after the same block are placed in the order you list them.
+
+    4. LANGUAGE:
+    - The user may write in any language.
+    - Unless explicitly asked, generate content and CHAT responses in English.
+
+    5. OUTPUT FORMAT:
+    Return ONLY valid JSON. Do not include markdown formatting.
+    Write the keys of each action in this order: action, target_block_index,
+    end_block_index, block_type, text, blocks.
+
+    {{
+        "actions": [
+            {{
+                "action": "UPDATE" | "APPEND" | "DELETE" | "INSERT" | "REWRITE" | "CHAT",
+                "target_block_index": <int> (Required for UPDATE, DELETE, INSERT, REWRITE),
+                "end_block_index": <int> (Required for REWRITE, inclusive),
+                "text": "<new_content_or_chat_reply>",
+                "block_type": "<paragraph|heading_1|heading_2|...>" (Optional),
+                "blocks": [{{"block_type": "<type>", "text": "<content>"}}] (REWRITE only)
+            }}
+        ]
+    }}
+    """
 
 
 class GeminiAgent:
@@ -18,7 +163,29 @@ class GeminiAgent:
     def __init__(self) -> None:
         self._configure_genai()
         self.model_name = config.gemini_model
-        self.model = genai.GenerativeModel(self.model_name)
+        self.model = new_plan_model(self.model_name)
+        # Optional backups raced against the primary model on slow answers
+        self.backup_models: List[Tuple[str, Any]] = []
+        if config.gemini_hedge_models:
+            self.backup_models = [
+                (name, new_plan_model(name))
+                for name in hedge_models(self.model_name, config.gemini_hedge_models)
+            ]
+            logger.info(f"Hedging with: {', '.join(name for name, _ in self.backup_models)}")
+        self.hedger = HedgedGenerator(self._is_valid_response)
+        self._summary_model: Optional["genai.GenerativeModel"] = None
+        summarizer = SectionSummarizer(self._summarize) if config.section_summaries else None
+        self.context_builder = ContextBuilder(
+            retriever=BlockRetriever.from_config(), summarizer=summarizer
+        )
+        # sqlite3 is only needed once an agent exists
+        from src.decision_cache import DecisionCache
+
+        self.decision_cache: "DecisionCache" = DecisionCache()
+        # Shared by every agent using the same API key, e.g. fan-out workers
+        self.rate_limiter = get_rate_limiter(
+            config.gemini_api_key, config.gemini_rate_limit, config.gemini_rate_burst
+        )
 
     def _configure_genai(self) -> None:
         try:
@@ -27,25 +194,55 @@ class GeminiAgent:
             logger.error(f"Failed to configure Gemini API: {e}")
             raise
 
+    @metrics.timed("gemini.analyze")
     def analyze_and_act(
-        self, user_query: str, current_blocks: List[Dict[str, Any]]
-    ) -> Dict[str, Any]:
+        self,
+        user_query: str,
+        current_blocks: List[Dict[str, Any]],
+        on_action: Optional[Callable[[Dict[str, Any]], None]] = None,
+    ) -> List[Dict[str, Any]]:
         """
         Main reasoning loop:
         1. Contextualize blocks
         2. Construct prompt
         3. Get JSON decision from Gemini
-        4. Parse and return action plan
+        4. Parse and return action plan (an ordered list of actions)
+
+        With GEMINI_STREAM enabled the response is streamed, and on_action is
+        called for each action as soon as its type and target index have been
+        generated, with an `error` entry if they are invalid.
         """
-        context_str = self._build_context(current_blocks)
+        context_str = self._build_context(current_blocks, user_query)
+
+        # Repeated commands against unchanged content reuse the earlier decision
+        cache_key = self.decision_cache.make_key(self.model_name, user_query, context_str)
+        cached = self.decision_cache.get(cache_key)
+        if cached is not None:
+            logger.debug("Using cached decision")
+            return cached
+
         prompt = self._build_system_prompt(user_query, context_str)
 
         try:
-            response = self.model.generate_content(prompt)
-            decision = self._parse_json_response(response.text)
+            self.rate_limiter.acquire()
+            with metrics.span("gemini.generate"):
+                if config.gemini_stream:
+                    response = None
+                    response_text = self._generate_streaming(prompt, len(current_blocks), on_action)
+                else:
+                    response = self._generate(prompt)
+                    response_text = response.text
+            self._count_tokens(prompt, response)
+            plan = self._try_parse(response_text)
+            decision = plan if plan is not None else self._retry_parse(response_text)
+            if not self._is_fallback(decision):
+                self.decision_cache.put(cache_key, decision)
             return decision
         except Exception as e:
             logger.error(f"Gemini reasoning failed: {e}")
+            metrics.incr("gemini_errors")
+            if "429" in str(e):
+                self.rate_limiter.on_throttled()
 
             # Additional debug info for model not found errors
             if "404" in str(e) and "not found" in str(e):
@@ -57,73 +254,176 @@ class GeminiAgent:
                 except Exception as list_err:
                     logger.error(f"Could not list models: {list_err}")
 
-            return {
-                "action": "CHAT",
-                "text": (
-                    f"I encountered an error with the AI model ({self.model_name}). "
-                    "Please check the logs for available models."
-                ),
-            }
+            return [
+                {
+                    "action": "CHAT",
+                    "text": (
+                        f"I encountered an error with the AI model ({self.model_name}). "
+                        "Please check the logs for available models."
+                    ),
+                }
+            ]
 
-    def _build_context(self, blocks: List[Dict[str, Any]]) -> str:
-        """Create a numbered string representation of the page content"""
-        context = []
-        for idx, block in enumerate(blocks):
-            # Include type to help agent decide if it should preserve or change it
-            b_info = f"[BLOCK_{idx}] (ID: {block['id']}, Type: {block['type']})"
-            context.append(f"{b_info}\nContent: {block['content']}")
-        return "\n\n".join(context)
+    @metrics.timed("gemini.summarize")
+    def _summarize(self, text: str) -> str:
+        """Short summary of one page section, for the section summary cache"""
+        # Background work only uses spare capacity, never delaying commands
+        if not self.rate_limiter.try_acquire(reserve=1.0):
+            raise RuntimeError("No spare Gemini rate limit capacity")
+        if self._summary_model is None:
+            # Plain text model: the plan model may be constrained to JSON
+            self._summary_model = genai.GenerativeModel(config.section_summary_model)
+        prompt = (
+            "Summarize this section of a blog post in at most two sentences, keeping "
+            "names, numbers and claims. Reply with the summary only.\n\n" + text
+        )
+        response = self._summary_model.generate_content(prompt)
+        self._count_tokens(prompt, response)
+        return str(response.text)
 
-    def _build_system_prompt(self, query: str, context: str) -> str:
-        return f"""
-        You are an intelligent Notion Blog Editor Agent.
-        Your goal is to help the user edit, write, or refine their blog post.
-
-        CURRENT PAGE CONTENT (Indexed Blocks):
-        ----------------------------------------
-        {context}
-        ----------------------------------------
-
-        USER COMMAND: "{query}"
-
-        INSTRUCTIONS:
-        1. Analyze the user's command and the current content.
-        2. Decide on ONE of the following actions:
-           - 'UPDATE': Modify an existing block's content.
-           - 'APPEND': Add a new block to the end of the page.
-           - 'DELETE': Remove a specific block.
-           - 'INSERT': Insert a new block AFTER a specific block.
-           - 'CHAT': Reply to the user if no editing is needed.
-
-        3. IMPORTANT: Work with block indexes (0, 1, 2...) from the context above.
-
-        4. LANGUAGE:
-        - The user may write in any language.
-        - Unless explicitly asked, generate content and CHAT responses in English.
-
-        5. OUTPUT FORMAT:
-        Return ONLY valid JSON. Do not include markdown formatting.
-
-        {{
-            "action": "UPDATE" | "APPEND" | "DELETE" | "INSERT" | "CHAT",
-            "target_block_index": <int> (Required for UPDATE, DELETE, INSERT),
-            "text": "<new_content_or_chat_reply>",
-            "block_type": "<paragraph|heading_1|heading_2|...>" (Optional)
-        }}
+    def _retry_parse(self, response_text: str) -> List[Dict[str, Any]]:
+        """
+        One cheap retry for an unparseable answer: only the broken output is
+        sent back (not the page) with a request to return it as valid JSON.
         """
+        metrics.incr("gemini_parse_failures")
+        logger.warning("Gemini response is not valid JSON, asking for a corrected copy")
+        excerpt = response_text[:REPAIR_EXCERPT_CHARS]
+        prompt = (
+            "The following was meant to be a JSON object of the form "
+            '{"actions": [{"action": ..., "target_block_index": ..., "text": ...}]} '
+            "but it is not valid JSON. Return only the corrected JSON, keeping its "
+            "content; drop an action that is cut off.\n\n" + excerpt
+        )
+        self.rate_limiter.acquire()
+        metrics.incr("gemini_parse_retries")
+        response = self.model.generate_content(prompt)
+        self._count_tokens(prompt, response)
+        return self._parse_json_response(response.text)
 
-    def _parse_json_response(self, response_text: str) -> Dict[str, Any]:
-        """Clean and parse JSON from LLM response"""
-        try:
-            # Strip potential markdown code blocks
-            clean_text = response_text.replace("```json", "").replace("```", "").strip()
-            return cast(Dict[str, Any], json.loads(clean_text))
-        except json.JSONDecodeError:
-            logger.error("Failed to parse JSON response from Gemini")
-            return {
+    def _generate(self, prompt: str) -> Any:
+        """One response from the model, hedged across backup models if configured"""
+        if not self.backup_models:
+            return self.model.generate_content(prompt)
+        models = [(self.model_name, self.model), *self.backup_models]
+        response, winner = self.hedger.generate(prompt, models)
+        if winner != self.model_name:
+            logger.info(f"Answer from backup model {winner}")
+        return response
+
+    def _count_tokens(self, prompt: str, response: Any) -> None:
+        """Token usage as reported by the API, or estimated when it is not"""
+        usage = getattr(response, "usage_metadata", None)
+        prompt_tokens = getattr(usage, "prompt_token_count", None)
+        if not isinstance(prompt_tokens, int):
+            prompt_tokens = estimate_tokens(prompt)
+        metrics.incr("gemini_requests")
+        metrics.incr("gemini_prompt_tokens", prompt_tokens)
+        output_tokens = getattr(usage, "candidates_token_count", None)
+        if isinstance(output_tokens, int):
+            metrics.incr("gemini_output_tokens", output_tokens)
+
+    def _generate_streaming(
+        self,
+        prompt: str,
+        block_count: int,
+        on_action: Optional[Callable[[Dict[str, Any]], None]],
+    ) -> str:
+        """Stream the response, reporting actions early; returns the full text"""
+        parser = IncrementalPlanParser()
+        chunks: List[str] = []
+
+        for chunk in self.model.generate_content(prompt, stream=True):
+            try:
+                text = chunk.text
+            except ValueError:
+                # Chunks without text parts (e.g. only safety metadata)
+                continue
+            chunks.append(text)
+            for event in parser.feed(text):
+                problem = validate_action_event(event, block_count)
+                if problem:
+                    logger.warning(f"Streamed action {event['position']}: {problem}")
+                    event["error"] = problem
+                if on_action is not None:
+                    try:
+                        on_action(event)
+                    except Exception as e:
+                        logger.error(f"Action callback failed: {e}")
+
+        return "".join(chunks)
+
+    @metrics.timed("gemini.build_context")
+    def _build_context(self, blocks: Iterable[Mapping[str, Any]], query: str = "") -> str:
+        """Create a numbered string representation of the page content (list or stream)"""
+        return self.context_builder.build(blocks, query)
+
+    def _build_system_prompt(self, query: str, context: str) -> str:
+        return build_prompt(query, context)
+
+    def _parse_json_response(self, response_text: str) -> List[Dict[str, Any]]:
+        """Clean and parse JSON from LLM response into a list of actions"""
+        plan = self._try_parse(response_text)
+        if plan is not None:
+            return plan
+        logger.error("Failed to parse JSON response from Gemini")
+        return [
+            {
                 "action": "CHAT",
                 "text": (
                     "I understood your request but failed to generate a structured action. "
                     "Could you try rephrasing?"
                 ),
+                "fallback": True,
             }
+        ]
+
+    def _decode_plan(self, response_text: str) -> List[Dict[str, Any]]:
+        # Strip potential markdown code blocks
+        clean_text = response_text.replace("```json", "").replace("```", "").strip()
+        return self._normalize_plan(json.loads(clean_text))
+
+    def _parse_plan(self, response_text: str) -> Tuple[Optional[List[Dict[str, Any]]], bool]:
+        """
+        The plan in a response and whether it needed repairing, without
+        counting or logging anything; the plan is None if it cannot be read.
+        """
+        try:
+            return self._decode_plan(response_text), False
+        except (json.JSONDecodeError, ValueError):
+            pass
+        try:
+            return self._normalize_plan(repair_json(response_text)), True
+        except ValueError:
+            return None, False
+
+    def _try_parse(self, response_text: str) -> Optional[List[Dict[str, Any]]]:
+        """The plan in a response, repairing near-miss JSON locally; None if neither works"""
+        plan, repaired = self._parse_plan(response_text)
+        if repaired:
+            logger.info("Repaired malformed JSON from Gemini")
+            metrics.incr("gemini_json_repaired")
+        return plan
+
+    def _is_valid_response(self, response_text: str) -> bool:
+        """
+        Whether a response parses into a plan; used to pick a hedging winner.
+        Repairs are only counted once the winning response is parsed.
+        """
+        return self._parse_plan(response_text)[0] is not None
+
+    def _is_fallback(self, plan: List[Dict[str, Any]]) -> bool:
+        """Our own error replies must never be cached as if the model had answered"""
+        return len(plan) == 1 and plan[0].get("fallback") is True
+
+    def _normalize_plan(self, data: Any) -> List[Dict[str, Any]]:
+        """Accept {"actions": [...]}, a bare list, or a single action object"""
+        if isinstance(data, dict) and "actions" in data:
+            data = data["actions"]
+        if isinstance(data, dict):
+            data = [data]
+        if not isinstance(data, list) or not data:
+            raise ValueError("Response does not contain any actions")
+        if not all(isinstance(action, dict) for action in data):
+            raise ValueError("Every action must be a JSON object")
+        return cast(List[Dict[str, Any]], data)
@@ -0,0 +1,176 @@
+import threading
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, Future, wait
+from typing import Any, Callable, Deque, Dict, List, Optional, Set, Tuple
+
+from src.config import config
+from src.metrics import metrics
+from src.utils import setup_logger
+
+logger = setup_logger("Hedging")
+
+# Primary latencies needed before the percentile replaces the initial delay
+MIN_SAMPLES = 5
+
+
+class HedgedGenerator:
+    """
+    Sends a prompt to the primary model (the first of `models`) and, if it
+    has not produced a usable answer within the hedge deadline, to the next
+    backup model as well. The
+    first response accepted by `is_valid` wins; the losers keep running on
+    daemon threads and their answers are ignored, so a hung call never
+    delays the command or the exit.
+
+    The deadline is the `percentile` of recent primary latencies, or
+    `initial_delay` until enough have been seen. A primary that fails or
+    answers with an invalid decision triggers the next backup immediately.
+    """
+
+    def __init__(
+        self,
+        is_valid: Callable[[str], bool],
+        percentile: Optional[float] = None,
+        initial_delay: Optional[float] = None,
+        window: int = 100,
+    ) -> None:
+        self.is_valid = is_valid
+        self.percentile = config.gemini_hedge_percentile if percentile is None else percentile
+        self.initial_delay = config.gemini_hedge_delay if initial_delay is None else initial_delay
+        self._latencies: Deque[float] = deque(maxlen=window)
+        self._lock = threading.Lock()
+        self.stats: Dict[str, int] = {"requests": 0, "hedged": 0, "backup_wins": 0}
+
+    def deadline(self) -> float:
+        """Seconds to wait for the primary before hedging"""
+        with self._lock:
+            if len(self._latencies) < MIN_SAMPLES:
+                return self.initial_delay
+            ordered = sorted(self._latencies)
+        return ordered[min(len(ordered) - 1, int(len(ordered) * self.percentile))]
+
+    def hedge_rate(self) -> float:
+        """Share of requests that needed a backup model"""
+        with self._lock:
+            requests, hedged = self.stats["requests"], self.stats["hedged"]
+        return hedged / requests if requests else 0.0
+
+    def generate(self, prompt: str, models: List[Tuple[str, Any]]) -> Tuple[Any, str]:
+        """
+        The winning response and the name of the model that produced it.
+        If no model gives a valid answer, the last response received is
+        returned (or the last error raised) so callers handle it as before.
+        """
+        self._count("requests", "gemini_hedge_requests")
+
+        pending: Dict[Future, str] = {}
+        last_response: Optional[Tuple[Any, str]] = None
+        last_error: Optional[BaseException] = None
+        started = time.perf_counter()
+        next_model = 0
+
+        def _launch() -> None:
+            nonlocal next_model
+            name, model = models[next_model]
+            future = _submit(model.generate_content, prompt)
+            if next_model == 0:
+                future.add_done_callback(lambda f: self._record(f, time.perf_counter() - started))
+            else:
+                logger.info(f"Hedging: also asking {name}")
+                if next_model == 1:
+                    self._count("hedged", "gemini_hedged")
+            pending[future] = name
+            next_model += 1
+
+        _launch()
+        while pending:
+            can_hedge = next_model < len(models)
+            timeout = self.deadline() if can_hedge else None
+            done, _ = wait(set(pending), timeout=timeout, return_when=FIRST_COMPLETED)
+            if not done:
+                _launch()
+                continue
+
+            for future in done:
+                name = pending.pop(future)
+                try:
+                    response = future.result()
+                    text = response.text
+                except Exception as e:
+                    logger.warning(f"{name} failed: {e}")
+                    last_error = e
+                    continue
+                if self.is_valid(text):
+                    self._finish(won_by_backup=name != models[0][0])
+                    return response, name
+                logger.warning(f"{name} returned an unusable decision")
+                last_response = (response, name)
+
+            if not pending and next_model < len(models):
+                _launch()
+
+        if last_response is not None:
+            return last_response
+        assert last_error is not None
+        raise last_error
+
+    def _count(self, stat: str, counter: str) -> None:
+        with self._lock:
+            self.stats[stat] += 1
+        metrics.incr(counter)
+
+    def _finish(self, won_by_backup: bool) -> None:
+        if won_by_backup:
+            self._count("backup_wins", "gemini_hedge_backup_wins")
+        else:
+            metrics.incr("gemini_hedge_primary_wins")
+
+    def _record(self, future: Future, seconds: float) -> None:
+        """Only successful primary calls shape the deadline; fast failures would skew it"""
+        if future.exception() is not None:
+            return
+        with self._lock:
+            self._latencies.append(seconds)
+
+
+def _submit(fn: Callable[..., Any], *args: Any) -> Future:
+    """Run fn on a daemon thread; unlike an executor, exit never waits for it"""
+    future: Future = Future()
+
+    def _run() -> None:
+        future.set_running_or_notify_cancel()
+        try:
+            future.set_result(fn(*args))
+        except BaseException as e:
+            future.set_exception(e)
+
+    threading.Thread(target=_run, name="Hedge", daemon=True).start()
+    return future
+
+
+def hedge_models(primary: str, setting: str) -> List[str]:
+    """
+    Backup model names from GEMINI_HEDGE_MODELS: a comma-separated list, or
+    "auto" for the flash models the API key can use (see src.diagnostics).
+    """
+    auto = setting.strip().lower() == "auto"
+    if auto:
+        from src.diagnostics import generate_content_models
+
+        try:
+            names = [name for name in generate_content_models() if "flash" in name]
+        except Exception as e:
+            logger.warning(f"Could not list models for hedging: {e}")
+            names = []
+    else:
+        names = [name.strip() for name in setting.split(",") if name.strip()]
+
+    backups: List[str] = []
+    seen: Set[str] = {primary.replace("models/", "")}
+    for name in (name.replace("models/", "") for name in names):
+        if name not in seen:
+            seen.add(name)
+            backups.append(name)
+    # Discovered models are untested, so only hedge to one of them
+    return backups[:1] if auto else backups
@@ -0,0 +1,97 @@
+import json
+from typing import Any, List, Optional, Tuple
+
+_CLOSERS = {"{": "}", "[": "]"}
+
+
+def _scan(text: str) -> Tuple[str, List[str], List[Tuple[int, List[str]]]]:
+    """
+    Copy the first JSON value in `text`, dropping trailing commas before a
+    closing bracket, and stop where that value ends so trailing prose is
+    ignored. Returns the copy, the brackets still open at its end, and the
+    positions (in the copy) right after each complete array element, with
+    the brackets open there.
+    """
+    out: List[str] = []
+    stack: List[str] = []
+    cuts: List[Tuple[int, List[str]]] = []
+    in_string = False
+    escaped = False
+
+    for char in text:
+        if in_string:
+            out.append(char)
+            if escaped:
+                escaped = False
+            elif char == "\\":
+                escaped = True
+            elif char == '"':
+                in_string = False
+            continue
+
+        if char == '"':
+            in_string = True
+        elif char in _CLOSERS:
+            stack.append(char)
+        elif char in "}]":
+            # Trailing comma: {"a": 1,} or [1, 2, ]
+            while out and out[-1].isspace():
+                out.pop()
+            if out and out[-1] == ",":
+                out.pop()
+            if stack:
+                stack.pop()
+            out.append(char)
+            if not stack:
+                break
+            if stack[-1] == "[":
+                cuts.append((len(out), list(stack)))
+            continue
+        elif char == "," and stack and stack[-1] == "[":
+            cuts.append((len(out), list(stack)))
+        out.append(char)
+
+    return "".join(out), stack, cuts
+
+
+def _close(text: str, stack: List[str]) -> str:
+    return text.rstrip().rstrip(",") + "".join(_CLOSERS[b] for b in reversed(stack))
+
+
+def _loads(text: str) -> Optional[Any]:
+    try:
+        return json.loads(text)
+    except json.JSONDecodeError:
+        return None
+
+
+def repair_json(text: str) -> Any:
+    """
+    Parse near-miss JSON from a model: code fences or prose around the
+    value, trailing commas, and output truncated mid-value. Truncated output
+    is cut back to the last complete element of the actions array and the
+    open brackets are closed; a half-written action is dropped rather than
+    guessed. Raises ValueError if no JSON object or array can be recovered,
+    including when not even the first action is complete.
+    """
+    starts = [i for i in (text.find("{"), text.find("[")) if i >= 0]
+    if not starts:
+        raise ValueError("No JSON object or array found")
+    body, stack, cuts = _scan(text[min(starts) :])
+
+    if not stack:
+        value = _loads(body)
+        if value is not None:
+            return value
+
+    # Only cut the actions list itself, {"actions": [...]} or a bare [...]: a
+    # REWRITE whose "blocks" list was cut short would delete the blocks that
+    # are missing from it, so a truncated first action is not recoverable
+    actions_level = ["{", "["] if body.startswith("{") else ["["]
+    for position, open_brackets in reversed(cuts):
+        if open_brackets != actions_level:
+            continue
+        value = _loads(_close(body[:position], open_brackets))
+        if value is not None:
+            return value
+    raise ValueError("JSON could not be repaired")
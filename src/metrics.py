@@ -0,0 +1,189 @@
+import functools
+import json
+import os
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from typing import Any, Callable, Deque, Dict, Iterator, List, Optional, TypeVar, cast
+
+from src.config import config
+from src.utils import setup_logger
+
+logger = setup_logger("Metrics")
+
+PREFIX = "notion_sidecar"
+QUANTILES = (0.5, 0.95)
+
+F = TypeVar("F", bound=Callable[..., Any])
+
+
+def _quantile(ordered: List[float], share: float) -> float:
+    return ordered[min(len(ordered) - 1, int(len(ordered) * share))]
+
+
+class Metrics:
+    """
+    Process-wide phase timings and counters.
+
+    A span records how long one phase took, e.g. "notion.request" or
+    "gemini.generate". The last `window` durations of every phase are kept
+    for rolling percentiles, next to an all-time count and sum. Counters
+    only ever go up (requests, retries, bytes, prompt tokens...).
+    """
+
+    def __init__(self, window: Optional[int] = None) -> None:
+        # METRICS_WINDOW is read on first use so importing this module reads no settings
+        self._window = window
+        self._recent: Dict[str, Deque[float]] = {}
+        self._count: Dict[str, int] = {}
+        self._sum: Dict[str, float] = {}
+        self._counters: Dict[str, float] = {}
+        self._lock = threading.Lock()
+
+    @property
+    def window(self) -> int:
+        if self._window is None:
+            self._window = config.metrics_window
+        return self._window
+
+    @contextmanager
+    def span(self, name: str) -> Iterator[None]:
+        """Time the enclosed block as one occurrence of phase `name`"""
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(name, time.perf_counter() - started)
+
+    def timed(self, name: str) -> Callable[[F], F]:
+        """Decorator form of span for functions and methods"""
+
+        def decorate(func: F) -> F:
+            @functools.wraps(func)
+            def wrapper(*args: Any, **kwargs: Any) -> Any:
+                with self.span(name):
+                    return func(*args, **kwargs)
+
+            return cast(F, wrapper)
+
+        return decorate
+
+    def observe(self, name: str, seconds: float) -> None:
+        with self._lock:
+            recent = self._recent.get(name)
+            if recent is None:
+                recent = self._recent[name] = deque(maxlen=max(1, self.window))
+            recent.append(seconds)
+            self._count[name] = self._count.get(name, 0) + 1
+            self._sum[name] = self._sum.get(name, 0.0) + seconds
+
+    def incr(self, name: str, value: float = 1) -> None:
+        with self._lock:
+            self._counters[name] = self._counters.get(name, 0) + value
+
+    def phases(self) -> Dict[str, Dict[str, float]]:
+        """Per phase: all-time count and sum, and rolling p50/p95 in seconds"""
+        with self._lock:
+            recent = {name: sorted(values) for name, values in self._recent.items()}
+            counts = dict(self._count)
+            sums = dict(self._sum)
+        return {
+            name: {
+                "count": counts[name],
+                "sum": sums[name],
+                **{f"p{int(q * 100)}": _quantile(values, q) for q in QUANTILES},
+            }
+            for name, values in sorted(recent.items())
+        }
+
+    def counters(self) -> Dict[str, float]:
+        with self._lock:
+            return dict(sorted(self._counters.items()))
+
+    def snapshot(self) -> Dict[str, Any]:
+        return {"time": time.time(), "phases": self.phases(), "counters": self.counters()}
+
+    def to_prometheus(self) -> str:
+        """Prometheus text exposition format"""
+        lines = [
+            f"# HELP {PREFIX}_phase_seconds Duration of each phase (rolling quantiles)",
+            f"# TYPE {PREFIX}_phase_seconds summary",
+        ]
+        for name, stats in self.phases().items():
+            for q in QUANTILES:
+                value = stats[f"p{int(q * 100)}"]
+                lines.append(f'{PREFIX}_phase_seconds{{phase="{name}",quantile="{q}"}} {value}')
+            lines.append(f'{PREFIX}_phase_seconds_sum{{phase="{name}"}} {stats["sum"]}')
+            lines.append(f'{PREFIX}_phase_seconds_count{{phase="{name}"}} {stats["count"]}')
+        for name, value in self.counters().items():
+            lines.append(f"# TYPE {PREFIX}_{name}_total counter")
+            lines.append(f"{PREFIX}_{name}_total {value}")
+        return "\n".join(lines) + "\n"
+
+    def reset(self) -> None:
+        with self._lock:
+            self._recent.clear()
+            self._count.clear()
+            self._sum.clear()
+            self._counters.clear()
+
+
+metrics = Metrics()
+
+
+class MetricsExporter:
+    """
+    Periodically writes the metrics to a file from a daemon thread, and once
+    more on stop. The "json" format appends one snapshot per line; the
+    "prometheus" format replaces the file atomically (textfile collector).
+    """
+
+    def __init__(
+        self,
+        registry: Metrics = metrics,
+        path: Optional[str] = None,
+        format: Optional[str] = None,
+        interval: Optional[float] = None,
+    ) -> None:
+        self.registry = registry
+        self.path = config.metrics_export_path if path is None else path
+        self.format = config.metrics_export_format if format is None else format
+        self.interval = config.metrics_export_interval if interval is None else interval
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self) -> bool:
+        """Start exporting; returns False if no export path is configured"""
+        if not self.path:
+            return False
+        if self.interval > 0:
+            self._thread = threading.Thread(target=self._run, name="MetricsExporter", daemon=True)
+            self._thread.start()
+        return True
+
+    def stop(self) -> None:
+        if not self.path:
+            return
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=1)
+            self._thread = None
+        self.export_once()
+
+    def export_once(self) -> None:
+        try:
+            if self.format == "prometheus":
+                tmp = f"{self.path}.tmp"
+                with open(tmp, "w", encoding="utf-8") as f:
+                    f.write(self.registry.to_prometheus())
+                os.replace(tmp, self.path)
+            else:
+                with open(self.path, "a", encoding="utf-8") as f:
+                    f.write(json.dumps(self.registry.snapshot()) + "\n")
+        except OSError as e:
+            logger.warning(f"Could not export metrics to {self.path}: {e}")
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.interval):
+            self.export_once()
@@ -1,110 +1,884 @@
+import functools
+import threading
 import time
-from typing import Any, Dict, List, Optional
-
-import requests
+from collections import OrderedDict
+from collections.abc import Mapping
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import TYPE_CHECKING, Any, Callable, Dict, Iterator, List, Optional, Tuple
 
 from src.config import config
-from src.utils import setup_logger
+from src.metrics import metrics
+from src.rate_limiter import get_rate_limiter
+from src.retry_policy import OPEN, RetryPolicy, get_circuit_breaker
+from src.utils import LazyModule, setup_logger
+
+if TYPE_CHECKING:
+    import requests
+else:
+    requests = LazyModule("requests")
+
+logger = setup_logger("NotionClient")
+
+# Notion truncates last_edited_time to the minute, so a timestamp only proves
+# the page is unchanged once that whole minute has elapsed.
+LAST_EDITED_GRANULARITY = 60
+
+# Blocks that report has_children but whose children are not part of this page
+NON_DESCENDING_TYPES = ("child_page", "child_database")
+
+# Block types whose rich text we read and write
+SUPPORTED_TYPES = frozenset(
+    (
+        "paragraph",
+        "heading_1",
+        "heading_2",
+        "heading_3",
+        "bulleted_list_item",
+        "numbered_list_item",
+        "quote",
+        "callout",
+        "code",
+        "to_do",
+        "toggle",
+    )
+)
+
+# What a request attempt tells the retry loop to do next
+DONE = "done"
+RETRY = "retry"
+FAIL = "fail"
 
-logger = setup_logger("NotionClient", config.log_level)
+REQUEST_STATS = (
+    "requests",
+    "retries",
+    "throttled",
+    "server_errors",
+    "client_errors",
+    "timeouts",
+    "connection_errors",
+    "short_circuited",
+    "deadline_exceeded",
+    "gave_up",
+    "deferred",
+)
 
+# Events published to mutation listeners after a successful write
+BLOCK_UPDATED = "updated"
+BLOCKS_CREATED = "created"
+BLOCK_DELETED = "deleted"
 
-class NotionClient:
+MutationListener = Callable[[str, Dict[str, Any]], None]
+
+# Notion API request limits
+MAX_CHILDREN_PER_REQUEST = 100
+MAX_TEXT_CONTENT_LENGTH = 2000
+
+
+def split_text(text: str, limit: int = MAX_TEXT_CONTENT_LENGTH) -> List[str]:
     """
-    A client wrapper for the Notion API handling block operations
-    with retry logic and error handling.
+    Split text into chunks that fit a single rich_text item.
+    Notion measures length in UTF-16 code units, so characters outside the
+    BMP (most emoji) count twice.
+    """
+    chunks: List[str] = []
+    start = 0
+    units = 0
+    for pos, char in enumerate(text):
+        width = 2 if ord(char) > 0xFFFF else 1
+        if units + width > limit:
+            chunks.append(text[start:pos])
+            start = pos
+            units = 0
+        units += width
+    chunks.append(text[start:])
+    return chunks
+
+
+@functools.lru_cache(maxsize=None)
+def _fast_json_loads() -> Optional[Callable[[bytes], Any]]:
+    """orjson.loads if the optional `fast` extra is installed"""
+    try:
+        import orjson
+    except ImportError:
+        return None
+    return orjson.loads
+
+
+class IncompleteListingError(RuntimeError):
+    """Raised by iter_page_blocks when a listing request fails partway through"""
+
+
+class Block(Mapping):
+    """
+    Compact parsed block yielded by iter_page_blocks.
+
+    Holds the same fields as the block dicts returned by get_page_blocks in
+    slots instead of a per-block dict, and supports the same read access
+    (block["id"], block.get("depth", 0), "parent_id" in block, {**block}).
+    parent_id is only present for blocks that have one.
+    """
+
+    __slots__ = ("id", "type", "content", "depth", "parent_id")
+
+    def __init__(
+        self, id: str, type: str, content: str, depth: int = 0, parent_id: Optional[str] = None
+    ) -> None:
+        self.id = id
+        self.type = type
+        self.content = content
+        self.depth = depth
+        self.parent_id = parent_id
+
+    def __getitem__(self, key: str) -> Any:
+        if key in self.__slots__ and (key != "parent_id" or self.parent_id is not None):
+            return getattr(self, key)
+        raise KeyError(key)
+
+    def __iter__(self) -> Iterator[str]:
+        return (key for key in self.__slots__ if key != "parent_id" or self.parent_id is not None)
+
+    def __len__(self) -> int:
+        return 4 if self.parent_id is None else 5
+
+    def __repr__(self) -> str:
+        return f"Block({self.to_dict()!r})"
+
+    def to_dict(self) -> Dict[str, Any]:
+        return dict(self)
+
+
+def _parse_notion_time(value: str) -> float:
+    """Convert a Notion ISO-8601 timestamp to a POSIX timestamp"""
+    return datetime.fromisoformat(value.replace("Z", "+00:00")).timestamp()
+
+
+@dataclass
+class PageSnapshot:
+    """Parsed blocks of a page as of a given page last_edited_time"""
+
+    last_edited_time: str
+    fetched_at: float
+    blocks: List[Dict[str, Any]]
+    block_versions: Dict[str, str] = field(default_factory=dict)
+    deep: bool = False
+    stale: bool = False
+    # When the page was last confirmed unchanged (0 = never)
+    verified_at: float = 0.0
+
+    def is_current(self, last_edited_time: str) -> bool:
+        """
+        Check whether the snapshot still reflects the page.
+        The timestamp must match and the snapshot must have been taken after
+        the minute the timestamp refers to was over.
+        """
+        if self.stale or last_edited_time != self.last_edited_time:
+            return False
+        return self._taken_after(last_edited_time)
+
+    def has_block(self, block_id: str, last_edited_time: str) -> bool:
+        """Same check for one block: its cached copy can be reused as is"""
+        if self.block_versions.get(block_id) != last_edited_time:
+            return False
+        return self._taken_after(last_edited_time)
+
+    def _taken_after(self, last_edited_time: str) -> bool:
+        # Notion rounds last_edited_time down to the minute, so an edit later
+        # in that minute keeps the same timestamp
+        try:
+            edited_at = _parse_notion_time(last_edited_time)
+        except ValueError:
+            return False
+        return self.fetched_at >= edited_at + LAST_EDITED_GRANULARITY
+
+
+class BaseNotionClient:
+    """
+    Transport-independent parts of the Notion clients: request payloads,
+    block parsing, tree flattening and the page snapshot cache.
     """
 
     BASE_URL = "https://api.notion.com/v1"
 
     def __init__(self) -> None:
+        # NOTION_BASE_URL points the client at a stand-in server, e.g. for benchmarks
+        self.BASE_URL = config.notion_base_url
         self.headers = {
             "Authorization": f"Bearer {config.notion_token}",
             "Content-Type": "application/json",
             "Notion-Version": "2022-06-28",
         }
+        # Most recently read pages last; fan-out workers read several at once
+        self._snapshots: "OrderedDict[str, PageSnapshot]" = OrderedDict()
+        self._snapshots_lock = threading.Lock()
+        self.max_snapshots = config.snapshot_cache_size
+        # Shared with every other client using the same integration token
+        self.rate_limiter = get_rate_limiter(config.notion_token)
+        self.circuit_breaker = get_circuit_breaker(config.notion_token)
+        self.retry_policy = RetryPolicy()
+        self.request_stats: Dict[str, int] = dict.fromkeys(REQUEST_STATS, 0)
+        self._stats_lock = threading.Lock()
+        self._listeners: List[MutationListener] = []
+        # Snapshots confirmed current within this many seconds are served
+        # without any request; set by PageWatcher while it keeps them warm.
+        self.snapshot_ttl = 0.0
+
+    def subscribe(self, listener: MutationListener) -> None:
+        """
+        Call listener(event, payload) after every successful write, with the
+        blocks parsed from Notion's response:
+        - BLOCK_UPDATED: {"block": block}
+        - BLOCKS_CREATED: {"parent_id": id, "after": id or None, "blocks": [block, ...]}
+        - BLOCK_DELETED: {"block_id": id}
+        """
+        self._listeners.append(listener)
+
+    def health(self) -> Dict[str, Any]:
+        """Request counters of this client and the state of the shared circuit breaker"""
+        with self._stats_lock:
+            stats: Dict[str, Any] = dict(self.request_stats)
+        stats["circuit"] = self.circuit_breaker.snapshot()
+        return stats
+
+    def snapshot(self, page_id: str) -> Optional[PageSnapshot]:
+        """The cached snapshot of a page, if any"""
+        with self._snapshots_lock:
+            snapshot = self._snapshots.get(page_id)
+            if snapshot is not None:
+                self._snapshots.move_to_end(page_id)
+            return snapshot
+
+    def invalidate_cache(self, page_id: Optional[str] = None) -> None:
+        """Drop the cached snapshot of one page, or of every page"""
+        with self._snapshots_lock:
+            if page_id is None:
+                self._snapshots.clear()
+            else:
+                self._snapshots.pop(page_id, None)
+
+    def _cached_blocks(
+        self,
+        page_id: str,
+        last_edited_time: Optional[str],
+        deep: bool,
+        force_refresh: bool,
+    ) -> Optional[List[Dict[str, Any]]]:
+        """Return the cached blocks if the snapshot still matches the page"""
+        snapshot = self.snapshot(page_id)
+        if (
+            not force_refresh
+            and snapshot is not None
+            and snapshot.deep == deep
+            and last_edited_time is not None
+            and snapshot.is_current(last_edited_time)
+        ):
+            logger.debug(f"Page {page_id} unchanged since last read, using cached blocks")
+            snapshot.verified_at = time.time()
+            return list(snapshot.blocks)
+        return None
+
+    def _trusted_blocks(self, page_id: str, deep: bool) -> Optional[List[Dict[str, Any]]]:
+        """Blocks of a snapshot verified within snapshot_ttl, served without a request"""
+        snapshot = self.snapshot(page_id)
+        if (
+            self.snapshot_ttl > 0
+            and snapshot is not None
+            and snapshot.deep == deep
+            and not snapshot.stale
+            and time.time() - snapshot.verified_at <= self.snapshot_ttl
+        ):
+            return list(snapshot.blocks)
+        return None
+
+    def _build_snapshot(
+        self,
+        page_id: str,
+        children: Dict[str, List[Dict[str, Any]]],
+        last_edited_time: Optional[str],
+        fetched_at: float,
+        deep: bool,
+        complete: bool,
+    ) -> List[Dict[str, Any]]:
+        """
+        Flatten listed children into blocks and store them as the page snapshot.
+        Blocks whose own last_edited_time did not change are reused from the
+        previous snapshot instead of being parsed again.
+        """
+        previous = self.snapshot(page_id)
+        reusable: Dict[str, Dict[str, Any]] = {}
+        if previous is not None:
+            reusable = {b["id"]: b for b in previous.blocks}
+
+        blocks: List[Dict[str, Any]] = []
+        block_versions: Dict[str, str] = {}
+        self._flatten(page_id, 0, children, reusable, previous, blocks, block_versions)
+
+        if complete and last_edited_time is not None:
+            snapshot = PageSnapshot(
+                last_edited_time=last_edited_time,
+                fetched_at=fetched_at,
+                blocks=blocks,
+                block_versions=block_versions,
+                deep=deep,
+            )
+            with self._snapshots_lock:
+                self._snapshots[page_id] = snapshot
+                self._snapshots.move_to_end(page_id)
+                while len(self._snapshots) > self.max_snapshots:
+                    self._snapshots.popitem(last=False)
+        else:
+            self.invalidate_cache(page_id)
+
+        return list(blocks)
+
+    def _record_mutation(self, success: bool) -> bool:
+        """
+        Our own writes bump the page's last_edited_time within the same minute,
+        so cached snapshots are marked stale explicitly.
+        """
+        if success:
+            with self._snapshots_lock:
+                for snapshot in self._snapshots.values():
+                    snapshot.stale = True
+        return success
+
+    def _publish(self, event: str, data: Dict[str, Any], **details: Any) -> None:
+        if not self._listeners:
+            return
+        payload: Dict[str, Any] = dict(details)
+        if event == BLOCKS_CREATED:
+            payload.setdefault("after", None)
+            parsed = (self._parse_block(item) for item in data.get("results", []) if item.get("id"))
+            payload["blocks"] = [block for block in parsed if block]
+        elif event == BLOCK_UPDATED:
+            block = self._parse_block(data) if data.get("id") else None
+            if block is None:
+                return
+            payload["block"] = block
+
+        for listener in list(self._listeners):
+            try:
+                listener(event, payload)
+            except Exception as e:
+                logger.warning(f"Mutation listener failed on {event}: {e}")
+
+    def _database_query(
+        self,
+        filter: Optional[Dict[str, Any]],
+        sorts: Optional[List[Dict[str, Any]]],
+        cursor: Optional[str],
+    ) -> Dict[str, Any]:
+        payload: Dict[str, Any] = {"page_size": 100}
+        if cursor:
+            payload["start_cursor"] = cursor
+        if filter:
+            payload["filter"] = filter
+        if sorts:
+            payload["sorts"] = sorts
+        return payload
+
+    def _page_ids(self, data: Dict[str, Any]) -> List[str]:
+        """Ids of the live pages in a database query response"""
+        return [
+            str(r["id"])
+            for r in data.get("results", [])
+            if r.get("object", "page") == "page" and not (r.get("archived") or r.get("in_trash"))
+        ]
+
+    def _rich_text(self, text: str) -> List[Dict[str, Any]]:
+        """Rich text array for text of any length, split into API-sized segments"""
+        return [{"type": "text", "text": {"content": chunk}} for chunk in split_text(text)]
+
+    def _text_block(self, text: str, block_type: str) -> Dict[str, Any]:
+        """Build a new block object for a children payload"""
+        return {
+            "object": "block",
+            "type": block_type,
+            block_type: {"rich_text": self._rich_text(text)},
+        }
+
+    def _update_payload(self, text: str, block_type: str) -> Dict[str, Any]:
+        # Notion API structure requires nested object with type name
+        return {block_type: {"rich_text": self._rich_text(text)}}
+
+    def _chunk_children(self, items: List[Tuple[str, str]]) -> List[List[Dict[str, Any]]]:
+        """Build block objects for (text, block_type) pairs, grouped per request"""
+        children = [self._text_block(text, block_type) for text, block_type in items]
+        return [
+            children[i : i + MAX_CHILDREN_PER_REQUEST]
+            for i in range(0, len(children), MAX_CHILDREN_PER_REQUEST)
+        ]
+
+    def _created_ids(self, data: Dict[str, Any]) -> List[str]:
+        """Ids of the blocks created by an append children call"""
+        return [str(r["id"]) for r in data.get("results", []) if r.get("id")]
+
+    def _retry_after(self, headers: Any) -> int:
+        """Seconds to wait after a 429, as instructed by the Retry-After header"""
+        try:
+            return int(headers.get("Retry-After", 1)) + 1
+        except (TypeError, ValueError):
+            return 2
+
+    def _count(self, stat: str) -> None:
+        with self._stats_lock:
+            self.request_stats[stat] += 1
+        metrics.incr(f"notion_{stat}")
+
+    def _count_bytes(self, headers: Any) -> None:
+        """Response size as sent on the wire, when the server reports it"""
+        try:
+            size = int(headers.get("Content-Length", 0))
+        except (AttributeError, TypeError, ValueError):
+            return
+        metrics.incr("notion_bytes_received", size)
+
+    def _before_attempt(
+        self, method: str, url: str, attempt: int, deadline_at: Optional[float]
+    ) -> Optional[Tuple[float, float]]:
+        """(connect, read) timeouts for the next attempt, or None if it must not be sent"""
+        timeout = self.retry_policy.timeout(deadline_at)
+        if timeout is None:
+            self._count("deadline_exceeded")
+            logger.error(
+                f"{method} {url} gave up: deadline of {self.retry_policy.deadline}s passed"
+            )
+            return None
+        if not self.circuit_breaker.allow():
+            self._count("short_circuited")
+            logger.error(f"Notion circuit open, not sending {method} {url}")
+            return None
+        if attempt:
+            self._count("retries")
+        return timeout
+
+    def _after_status(self, status: int, headers: Any, attempt: int) -> Tuple[str, float]:
+        """Classify a response: (DONE | RETRY | FAIL, seconds to wait before retrying)"""
+        if status == 429:
+            # Notion is up, just busy: pause the shared bucket so every caller backs off
+            self.circuit_breaker.record_success()
+            self._count("throttled")
+            wait_time = self._retry_after(headers)
+            logger.warning(f"Rate limited. Waiting {wait_time}s...")
+            self.rate_limiter.on_throttled(wait_time)
+            return RETRY, wait_time
+
+        if status >= 500:
+            self.circuit_breaker.record_failure()
+            self._count("server_errors")
+            logger.warning(f"Server error {status}. Retrying...")
+            return RETRY, self.retry_policy.backoff(attempt)
+
+        self.circuit_breaker.record_success()
+        if status >= 400:
+            # The request itself is wrong; sending it again will not help
+            self._count("client_errors")
+            logger.error(f"API Request failed with status {status}")
+            return FAIL, 0.0
+
+        self.rate_limiter.on_success()
+        return DONE, 0.0
+
+    def _after_error(self, error: Exception, timed_out: bool, attempt: int, attempts: int) -> float:
+        """Record a transport failure; returns the backoff before the next attempt"""
+        self.circuit_breaker.record_failure()
+        self._count("timeouts" if timed_out else "connection_errors")
+        logger.error(f"API Request failed (Attempt {attempt+1}/{attempts}): {error}")
+        return self.retry_policy.backoff(attempt)
+
+    def _may_retry(
+        self,
+        method: str,
+        url: str,
+        delay: float,
+        attempt: int,
+        attempts: int,
+        deadline_at: Optional[float],
+    ) -> bool:
+        if attempt == attempts - 1:
+            self._count("gave_up")
+            return False
+        if self.circuit_breaker.state == OPEN:
+            # This failure tripped the breaker; waiting for another attempt is pointless
+            self._count("short_circuited")
+            return False
+        if not self.retry_policy.fits(delay, deadline_at):
+            self._count("deadline_exceeded")
+            logger.error(f"{method} {url} gave up: retrying would miss the deadline")
+            return False
+        return True
+
+    def _should_descend(self, item: Dict[str, Any]) -> bool:
+        # Child pages and databases are separate documents, not nested content
+        return bool(item.get("has_children")) and item.get("type") not in NON_DESCENDING_TYPES
+
+    def _children_source(self, item: Dict[str, Any]) -> str:
+        """Synced copies hold no children themselves; read the original block instead"""
+        if item.get("type") == "synced_block":
+            synced_from = item.get("synced_block", {}).get("synced_from") or {}
+            if synced_from.get("block_id"):
+                return str(synced_from["block_id"])
+        return str(item["id"])
+
+    def _flatten(
+        self,
+        parent_id: str,
+        depth: int,
+        children: Dict[str, List[Dict[str, Any]]],
+        reusable: Dict[str, Dict[str, Any]],
+        previous: Optional[PageSnapshot],
+        blocks: List[Dict[str, Any]],
+        block_versions: Dict[str, str],
+    ) -> None:
+        """Emit blocks in document order, each annotated with depth and parent_id"""
+        for item in children.get(parent_id, []):
+            version = item.get("last_edited_time")
+            cached = reusable.get(item.get("id", ""))
+            if (
+                cached is not None
+                and version is not None
+                and previous is not None
+                and previous.has_block(cached["id"], version)
+                and cached.get("parent_id") == parent_id
+            ):
+                block_data: Optional[Dict[str, Any]] = cached
+            else:
+                block_data = self._parse_block(item)
+                if block_data:
+                    block_data["depth"] = depth
+                    block_data["parent_id"] = parent_id
+
+            if block_data:
+                blocks.append(block_data)
+                if isinstance(version, str):
+                    block_versions[block_data["id"]] = version
+
+            if item.get("id") in children:
+                self._flatten(
+                    item["id"], depth + 1, children, reusable, previous, blocks, block_versions
+                )
+
+    def _parse_single_block(self, item: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        block = self._parse_block(item)
+        if block is not None:
+            block["archived"] = bool(item.get("archived") or item.get("in_trash"))
+        return block
+
+    def _parse_block(self, item: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        """
+        Extract relevant data from raw block response.
+        """
+        b_type, content = self._block_text(item)
+        return {"id": item["id"], "type": b_type, "content": content}
+
+    def _block_text(self, item: Dict[str, Any]) -> Tuple[str, str]:
+        """(type, plain text) of a raw block; unsupported types get a placeholder"""
+        b_type = item.get("type")
+        if b_type not in SUPPORTED_TYPES:
+            return "unsupported", f"[{b_type} block]"
+
+        try:
+            rich_text = item.get(b_type, {}).get("rich_text", [])
+            # Combine all text chunks
+            return b_type, "".join([t.get("plain_text", "") for t in rich_text])
+        except Exception:
+            return "error", "[Error parsing block]"
+
+    def _decode(self, response: Any) -> Any:
+        """JSON body of a response, decoded with orjson when it is available"""
+        loads = _fast_json_loads()
+        content = getattr(response, "content", None)
+        if loads is not None and isinstance(content, bytes):
+            return loads(content)
+        return response.json()
+
+
+class NotionClient(BaseNotionClient):
+    """
+    A client wrapper for the Notion API handling block operations
+    with retry logic and error handling.
+    """
+
+    def __init__(self) -> None:
+        super().__init__()
         self.session = requests.Session()
         self.session.headers.update(self.headers)
 
-    def get_page_blocks(self, page_id: str) -> List[Dict[str, Any]]:
+    @metrics.timed("notion.get_page_blocks")
+    def get_page_blocks(
+        self,
+        page_id: str,
+        force_refresh: bool = False,
+        deep: Optional[bool] = None,
+        background: bool = False,
+    ) -> List[Dict[str, Any]]:
         """
         Retrieve all supported blocks from a notion page.
         Handles pagination automatically.
-        """
-        blocks = []
-        url = f"{self.BASE_URL}/blocks/{page_id}/children"
-        has_more = True
-        start_cursor = None
 
-        try:
-            while has_more:
-                params = {"page_size": 100}
-                if start_cursor:
-                    params["start_cursor"] = start_cursor
+        With deep=True (default: NOTION_DEEP_FETCH) nested children such as
+        toggles, nested lists, columns and synced blocks are included as well.
+        The result is a flat list in document order where every block carries
+        its `depth` and `parent_id`.
 
-                response = self._make_request("GET", url, params=params)
-                if not response:
-                    break
+        Results are cached per page. While the page's last_edited_time is
+        unchanged the cached blocks are returned without listing children again.
+        Pass force_refresh=True to bypass the cache.
 
-                data = response.json()
-                results = data.get("results", [])
+        background=True is for polling: requests only use spare rate-limit
+        capacity, and a poll that runs out of it leaves the cache untouched
+        and returns an empty list.
+        """
+        if deep is None:
+            deep = config.deep_fetch
 
-                for item in results:
-                    block_data = self._parse_block(item)
-                    if block_data:
-                        blocks.append(block_data)
+        if not force_refresh and not background:
+            trusted = self._trusted_blocks(page_id, deep)
+            if trusted is not None:
+                return trusted
 
-                has_more = data.get("has_more", False)
-                start_cursor = data.get("next_cursor")
+        last_edited_time = self._get_page_last_edited_time(page_id, background)
+        if background and last_edited_time is None:
+            return []
+        cached = self._cached_blocks(page_id, last_edited_time, deep, force_refresh)
+        if cached is not None:
+            return cached
 
-            return blocks
+        fetched_at = time.time()
+        try:
+            items, complete = self._list_children(page_id, background)
+            children: Dict[str, List[Dict[str, Any]]] = {page_id: items}
+            if deep:
+                complete = self._fetch_descendants(items, children, background) and complete
+            if background and not complete:
+                return []
+            return self._build_snapshot(
+                page_id, children, last_edited_time, fetched_at, deep, complete
+            )
 
         except Exception as e:
             logger.error(f"Failed to fetch blocks: {e}")
             return []
 
+    def _get_page_last_edited_time(self, page_id: str, background: bool = False) -> Optional[str]:
+        """Read the page's last_edited_time, or None if it could not be retrieved"""
+        response = self._make_request(
+            "GET", f"{self.BASE_URL}/pages/{page_id}", background=background
+        )
+        if not response:
+            return None
+        try:
+            value = self._decode(response).get("last_edited_time")
+        except Exception:
+            return None
+        return value if isinstance(value, str) else None
+
+    def iter_page_blocks(self, page_id: str, deep: Optional[bool] = None) -> Iterator[Block]:
+        """
+        Yield the blocks of a page one at a time, in the same order and with
+        the same fields as get_page_blocks, as compact Block objects.
+
+        Each page of children is parsed as soon as it arrives and nested
+        children are read depth-first, so only the listing currently being
+        walked is held in memory instead of the whole document. A current
+        cached snapshot is served without any requests; streamed reads do not
+        populate the cache. If a listing request fails, IncompleteListingError
+        is raised after the blocks read so far, so a truncated page is never
+        mistaken for a complete one.
+        """
+        if deep is None:
+            deep = config.deep_fetch
+
+        cached = self._trusted_blocks(page_id, deep)
+        if cached is None and self.snapshot(page_id) is not None:
+            last_edited_time = self._get_page_last_edited_time(page_id)
+            cached = self._cached_blocks(page_id, last_edited_time, deep, False)
+        if cached is not None:
+            for block in cached:
+                yield Block(
+                    block["id"],
+                    block["type"],
+                    block["content"],
+                    block.get("depth", 0),
+                    block.get("parent_id"),
+                )
+            return
+
+        yield from self._iter_children(page_id, page_id, 0, deep)
+
+    def _iter_children(
+        self, source_id: str, parent_id: str, depth: int, deep: bool
+    ) -> Iterator[Block]:
+        complete = True
+        for results, has_more in self._child_pages(source_id):
+            complete = not has_more
+            for item in results:
+                b_type, content = self._block_text(item)
+                yield Block(item["id"], b_type, content, depth, parent_id)
+                if deep and self._should_descend(item):
+                    yield from self._iter_children(
+                        self._children_source(item), item["id"], depth + 1, deep
+                    )
+        if not complete:
+            # The last page still had more: a request failed (see _child_pages)
+            raise IncompleteListingError(f"Listing the children of {source_id} failed")
+
+    def _child_pages(
+        self, block_id: str, background: bool = False
+    ) -> Iterator[Tuple[List[Dict[str, Any]], bool]]:
+        """
+        Yield each page of raw children of a block with its has_more flag,
+        following pagination. Stops after a failed request, so a last page
+        with has_more=True means the listing is incomplete.
+        """
+        url = f"{self.BASE_URL}/blocks/{block_id}/children"
+        start_cursor = None
+
+        while True:
+            params = {"page_size": 100}
+            if start_cursor:
+                params["start_cursor"] = start_cursor
+
+            response = self._make_request("GET", url, params=params, background=background)
+            if not response:
+                yield [], True
+                return
+
+            data = self._decode(response)
+            has_more = bool(data.get("has_more", False))
+            yield data.get("results", []), has_more
+            if not has_more:
+                return
+            start_cursor = data.get("next_cursor")
+
+    @metrics.timed("notion.list_children")
+    def _list_children(
+        self, block_id: str, background: bool = False
+    ) -> Tuple[List[Dict[str, Any]], bool]:
+        """
+        Read every raw child of a block, following pagination.
+        Returns the children and whether the listing completed.
+        """
+        items: List[Dict[str, Any]] = []
+        complete = True
+        for results, has_more in self._child_pages(block_id, background):
+            items.extend(results)
+            complete = not has_more
+        return items, complete
+
+    def _fetch_descendants(
+        self,
+        items: List[Dict[str, Any]],
+        children: Dict[str, List[Dict[str, Any]]],
+        background: bool = False,
+    ) -> bool:
+        """
+        Walk the block tree one level at a time. All parents on a level are
+        listed in parallel (bounded by NOTION_FETCH_CONCURRENCY), so latency
+        grows with the depth of the tree rather than with the number of nested
+        blocks. Fills `children` keyed by parent block id.
+        """
+        complete = True
+        level = [item for item in items if self._should_descend(item)]
+
+        with ThreadPoolExecutor(max_workers=config.fetch_concurrency) as pool:
+            while level:
+                sources = [self._children_source(item) for item in level]
+                results = list(
+                    pool.map(lambda source: self._list_children(source, background), sources)
+                )
+
+                next_level: List[Dict[str, Any]] = []
+                for item, (kids, ok) in zip(level, results, strict=True):
+                    complete = complete and ok
+                    children[item["id"]] = kids
+                    next_level.extend(kid for kid in kids if self._should_descend(kid))
+                level = next_level
+
+        return complete
+
+    @metrics.timed("notion.query_database")
+    def query_database(
+        self,
+        database_id: str,
+        filter: Optional[Dict[str, Any]] = None,
+        sorts: Optional[List[Dict[str, Any]]] = None,
+        limit: Optional[int] = None,
+    ) -> List[str]:
+        """
+        Return the ids of the pages in a database matching a Notion filter
+        object, following pagination (at most `limit` ids if given).
+        """
+        url = f"{self.BASE_URL}/databases/{database_id}/query"
+        page_ids: List[str] = []
+        cursor = None
+
+        while limit is None or len(page_ids) < limit:
+            payload = self._database_query(filter, sorts, cursor)
+            response = self._make_request("POST", url, json_data=payload)
+            if not response:
+                logger.error(f"Database query for {database_id} failed")
+                break
+            data = response.json()
+            page_ids.extend(self._page_ids(data))
+            if not data.get("has_more"):
+                break
+            cursor = data.get("next_cursor")
+
+        return page_ids[:limit] if limit is not None else page_ids
+
+    def get_block(self, block_id: str) -> Optional[Dict[str, Any]]:
+        """
+        Retrieve the current state of a single block, including whether it was
+        archived (deleted). Returns None if the block could not be read.
+        """
+        response = self._make_request("GET", f"{self.BASE_URL}/blocks/{block_id}")
+        if not response:
+            return None
+        return self._parse_single_block(response.json())
+
+    @metrics.timed("notion.update_block")
     def update_block(self, block_id: str, new_text: str, block_type: str = "paragraph") -> bool:
         """
         Update a specific block's text content.
         Preserves the block type if possible.
         """
         url = f"{self.BASE_URL}/blocks/{block_id}"
-
-        # Construct payload based on block type
-        # Notion API structure requires nested object with type name
-        payload = {block_type: {"rich_text": [{"type": "text", "text": {"content": new_text}}]}}
+        payload = self._update_payload(new_text, block_type)
 
         response = self._make_request("PATCH", url, json_data=payload)
-        return response is not None and response.status_code == 200
+        return self._mutation_succeeded(response, BLOCK_UPDATED)
 
+    @metrics.timed("notion.append_block")
     def append_block(self, parent_id: str, text: str, block_type: str = "paragraph") -> bool:
         """
         Append a new block to the end of a page (or block).
         """
         url = f"{self.BASE_URL}/blocks/{parent_id}/children"
 
-        payload = {
-            "children": [
-                {
-                    "object": "block",
-                    "type": block_type,
-                    block_type: {"rich_text": [{"type": "text", "text": {"content": text}}]},
-                }
-            ]
-        }
+        payload = {"children": [self._text_block(text, block_type)]}
 
         response = self._make_request("PATCH", url, json_data=payload)
-        return response is not None and response.status_code == 200
+        return self._mutation_succeeded(response, BLOCKS_CREATED, parent_id=parent_id)
 
+    @metrics.timed("notion.delete_block")
     def delete_block(self, block_id: str) -> bool:
         """
         Delete (archive) a block.
         """
         url = f"{self.BASE_URL}/blocks/{block_id}"
         response = self._make_request("DELETE", url)
-        return response is not None and response.status_code == 200
+        return self._mutation_succeeded(response, BLOCK_DELETED, block_id=block_id)
 
-    def insert_block_after(self, block_id: str, text: str, block_type: str = "paragraph") -> bool:
+    @metrics.timed("notion.insert_block_after")
+    def insert_block_after(
+        self,
+        block_id: str,
+        text: str,
+        block_type: str = "paragraph",
+        parent_id: Optional[str] = None,
+    ) -> bool:
         """
         Insert a block after a specific block_id.
         Notion API 'append' adds to children. To insert *after*, we technically need
@@ -113,91 +887,144 @@ class NotionClient:
         The 'after' parameter allows us to specify the ID of the existing block
         that the new block should be appended after.
 
-        Since we treat the page as a flat list in this agent, we assume the parent
-        is the Page ID.
+        The parent defaults to the configured page. Pass parent_id when the
+        anchor block is nested (see the `parent_id` of deep-fetched blocks).
         """
-        url = f"{self.BASE_URL}/blocks/{config.page_id}/children"
+        url = f"{self.BASE_URL}/blocks/{parent_id or config.page_id}/children"
 
-        payload = {
-            "children": [
-                {
-                    "object": "block",
-                    "type": block_type,
-                    block_type: {"rich_text": [{"type": "text", "text": {"content": text}}]},
-                }
-            ],
-            "after": block_id,
-        }
+        payload = {"children": [self._text_block(text, block_type)], "after": block_id}
 
         response = self._make_request("PATCH", url, json_data=payload)
-        return response is not None and response.status_code == 200
+        return self._mutation_succeeded(
+            response, BLOCKS_CREATED, parent_id=parent_id or config.page_id, after=block_id
+        )
 
-    def _make_request(
+    @metrics.timed("notion.append_blocks")
+    def append_blocks(self, parent_id: str, items: List[Tuple[str, str]]) -> List[bool]:
+        """
+        Append several (text, block_type) blocks to a parent, packing up to 100
+        children into each request. Returns one success flag per item.
+        """
+        return self._write_children(parent_id, items, after=None)
+
+    @metrics.timed("notion.insert_blocks_after")
+    def insert_blocks_after(
         self,
-        method: str,
-        url: str,
-        params: Optional[Dict] = None,
-        json_data: Optional[Dict] = None,
-        retries: int = 3,
-    ) -> Optional[requests.Response]:
+        block_id: str,
+        items: List[Tuple[str, str]],
+        parent_id: Optional[str] = None,
+    ) -> List[bool]:
         """
-        Internal method to handle requests with rate limiting and retries.
+        Insert several (text, block_type) blocks, in order, after block_id.
+        Returns one success flag per item.
         """
-        for attempt in range(retries):
-            try:
-                response = self.session.request(method, url, params=params, json=json_data)
+        return self._write_children(parent_id or config.page_id, items, after=block_id)
+
+    @metrics.timed("notion.delete_blocks")
+    def delete_blocks(self, block_ids: List[str]) -> List[bool]:
+        """
+        Delete several blocks concurrently (Notion has no bulk delete).
+        Returns one success flag per block id.
+        """
+        if not block_ids:
+            return []
+        with ThreadPoolExecutor(max_workers=config.fetch_concurrency) as pool:
+            return list(pool.map(self.delete_block, block_ids))
 
-                if response.status_code == 429:
-                    # Rate limited
-                    wait_time = int(response.headers.get("Retry-After", 1)) + 1
-                    logger.warning(f"Rate limited. Waiting {wait_time}s...")
-                    time.sleep(wait_time)
-                    continue
+    def _write_children(
+        self, parent_id: str, items: List[Tuple[str, str]], after: Optional[str]
+    ) -> List[bool]:
+        """
+        Send children in chunks. When inserting, each chunk is anchored after the
+        last block created by the previous one so the original order is kept.
+        """
+        url = f"{self.BASE_URL}/blocks/{parent_id}/children"
+        results: List[bool] = []
 
-                if response.status_code >= 500:
-                    logger.warning(f"Server error {response.status_code}. Retrying...")
-                    time.sleep(1 * (attempt + 1))
-                    continue
+        for chunk in self._chunk_children(items):
+            payload: Dict[str, Any] = {"children": chunk}
+            if after is not None:
+                payload["after"] = after
 
-                response.raise_for_status()
-                return response
+            response = self._make_request("PATCH", url, json_data=payload)
+            success = self._mutation_succeeded(
+                response, BLOCKS_CREATED, parent_id=parent_id, after=after
+            )
+            results.extend([success] * len(chunk))
+            if not success:
+                break
 
-            except requests.exceptions.RequestException as e:
-                logger.error(f"API Request failed (Attempt {attempt+1}/{retries}): {e}")
-                if attempt == retries - 1:
-                    return None
-                time.sleep(1 * (attempt + 1))  # Exponential backoff
+            if after is not None:
+                created = self._created_ids(response.json()) if response is not None else []
+                if not created:
+                    logger.error("Insert response did not include the created blocks")
+                    break
+                after = created[-1]
 
-        return None
+        # Chunks after a failure are not attempted to keep the order intact
+        results.extend([False] * (len(items) - len(results)))
+        return results
 
-    def _parse_block(self, item: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+    def _mutation_succeeded(
+        self, response: Optional["requests.Response"], event: Optional[str] = None, **details: Any
+    ) -> bool:
+        success = self._record_mutation(response is not None and response.status_code == 200)
+        if success and event is not None and response is not None:
+            self._publish(event, response.json(), **details)
+        return success
+
+    @metrics.timed("notion.request")
+    def _make_request(
+        self,
+        method: str,
+        url: str,
+        params: Optional[Dict] = None,
+        json_data: Optional[Dict] = None,
+        retries: Optional[int] = None,
+        background: bool = False,
+    ) -> Optional["requests.Response"]:
         """
-        Extract relevant data from raw block response.
+        Internal method to send a request under the retry policy: jittered
+        backoff on 5xx, timeouts and connection errors, Retry-After on 429,
+        no retries for other 4xx, and nothing sent while the circuit is open.
+
+        Background requests never wait for the rate limiter: they are dropped
+        unless a token is free with NOTION_WATCH_RESERVE more left for
+        interactive requests.
         """
-        b_type = item.get("type")
-        supported_types = [
-            "paragraph",
-            "heading_1",
-            "heading_2",
-            "heading_3",
-            "bulleted_list_item",
-            "numbered_list_item",
-            "quote",
-            "callout",
-            "code",
-            "to_do",
-        ]
+        attempts = retries or self.retry_policy.max_attempts
+        deadline_at = self.retry_policy.deadline_at()
+        self._count("requests")
 
-        if b_type not in supported_types:
-            return {"id": item["id"], "type": "unsupported", "content": f"[{b_type} block]"}
+        for attempt in range(attempts):
+            # Deferred before asking the breaker, which would hand out its
+            # half-open probe to a request that is never sent
+            if background and not self.rate_limiter.try_acquire(reserve=config.watch_reserve):
+                self._count("deferred")
+                return None
+            timeout = self._before_attempt(method, url, attempt, deadline_at)
+            if timeout is None:
+                return None
+            try:
+                if not background:
+                    self.rate_limiter.acquire()
+                response = self.session.request(
+                    method, url, params=params, json=json_data, timeout=timeout
+                )
+            except requests.exceptions.Timeout as e:
+                delay = self._after_error(e, True, attempt, attempts)
+            except requests.exceptions.RequestException as e:
+                delay = self._after_error(e, False, attempt, attempts)
+            else:
+                self._count_bytes(response.headers)
+                outcome, delay = self._after_status(response.status_code, response.headers, attempt)
+                if outcome == DONE:
+                    return response
+                if outcome == FAIL:
+                    return None
 
-        try:
-            rich_text = item.get(b_type, {}).get("rich_text", [])
-            content = ""
-            if rich_text:
-                # Combine all text chunks
-                content = "".join([t.get("plain_text", "") for t in rich_text])
+            if not self._may_retry(method, url, delay, attempt, attempts, deadline_at):
+                return None
+            time.sleep(delay)
 
-            return {"id": item["id"], "type": b_type, "content": content}
-        except Exception:
-            return {"id": item["id"], "type": "error", "content": "[Error parsing block]"}
+        return None
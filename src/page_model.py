@@ -0,0 +1,246 @@
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional, Set, Tuple
+
+from src.config import config
+from src.notion_client import BLOCK_DELETED, BLOCK_UPDATED, BLOCKS_CREATED
+from src.utils import setup_logger
+
+logger = setup_logger("PageModel")
+
+
+def _signature(block: Dict[str, Any]) -> Tuple[Any, ...]:
+    return (block["type"], block["content"], block.get("depth", 0), block.get("parent_id"))
+
+
+@dataclass
+class PageConflict:
+    """Blocks that someone else changed while we held local edits"""
+
+    version: int
+    added: List[str] = field(default_factory=list)
+    removed: List[str] = field(default_factory=list)
+    changed: List[str] = field(default_factory=list)
+
+    def describe(self) -> str:
+        return (
+            f"Page was edited elsewhere ({len(self.changed)} changed, {len(self.added)} added, "
+            f"{len(self.removed)} removed blocks); now showing the server version."
+        )
+
+
+class PageModel:
+    """
+    Versioned in-memory copy of one page's blocks.
+
+    Successful writes through the client are applied in place from the
+    blocks Notion returns, so the next command can use the page without
+    reading it again. After local edits a background reconcile reads the
+    page and compares it with the model; any difference not caused by our
+    own writes is recorded as a conflict and the server version wins.
+    `version` increases whenever the block list changes.
+    """
+
+    def __init__(self, notion: Any, page_id: str, reconcile_delay: Optional[float] = None) -> None:
+        self.notion = notion
+        self.page_id = page_id
+        self.reconcile_delay = (
+            config.page_reconcile_delay if reconcile_delay is None else reconcile_delay
+        )
+        self.version = 0
+        self.dirty = False
+        self._blocks: Optional[List[Dict[str, Any]]] = None
+        self._needs_reload = False
+        self._conflicts: List[PageConflict] = []
+        self._lock = threading.RLock()
+        self._closed = threading.Event()
+        self._pool = ThreadPoolExecutor(max_workers=1)
+        self._reconciling: Optional[Future] = None
+        notion.subscribe(self.on_mutation)
+
+    def blocks(self) -> List[Dict[str, Any]]:
+        """
+        Current blocks. While local edits are unconfirmed the model is served
+        as is; otherwise the client is asked, which is cheap when the page has
+        not changed.
+        """
+        with self._lock:
+            if self._blocks is not None and self.dirty and not self._needs_reload:
+                return list(self._blocks)
+        return self._adopt(self.notion.get_page_blocks(self.page_id))
+
+    def reload(self) -> List[Dict[str, Any]]:
+        """Discard local state and read the page from the server"""
+        blocks = self._adopt(self.notion.get_page_blocks(self.page_id, force_refresh=True))
+        with self._lock:
+            self.dirty = False
+        return blocks
+
+    def stale_indexes(self, snapshot: List[Dict[str, Any]]) -> Set[int]:
+        """Indexes of `snapshot` whose block is gone or different in the current model"""
+        with self._lock:
+            current = {b["id"]: _signature(b) for b in self._blocks or []}
+        return {
+            idx
+            for idx, block in enumerate(snapshot)
+            if current.get(block["id"]) != _signature(block)
+        }
+
+    def take_conflicts(self) -> List[PageConflict]:
+        with self._lock:
+            conflicts, self._conflicts = self._conflicts, []
+            return conflicts
+
+    def on_mutation(self, event: str, payload: Dict[str, Any]) -> None:
+        """Mutation listener for the Notion client"""
+        with self._lock:
+            if self._blocks is None:
+                return
+            if event == BLOCK_UPDATED:
+                changed = self._apply_update(payload["block"])
+            elif event == BLOCKS_CREATED:
+                changed = self._apply_created(
+                    payload["parent_id"], payload["after"], payload["blocks"]
+                )
+            elif event == BLOCK_DELETED:
+                changed = self._apply_deleted(payload["block_id"])
+            else:
+                return
+            if changed:
+                self.version += 1
+                self.dirty = True
+
+    def reconcile(self) -> bool:
+        """
+        Compare the model with the server. Returns False if local edits were
+        made while reading, in which case the comparison must be repeated.
+        """
+        with self._lock:
+            started = self.version
+            local = list(self._blocks or [])
+
+        server = self.notion.get_page_blocks(self.page_id, force_refresh=True)
+        if not server and local:
+            logger.warning("Reconcile could not read the page, keeping local model")
+            return True
+
+        with self._lock:
+            if self.version != started:
+                return False
+            conflict = self._diff(local, server)
+            if conflict is not None:
+                logger.warning(conflict.describe())
+                self._conflicts.append(conflict)
+                self._blocks = list(server)
+                self.version += 1
+            self.dirty = False
+            self._needs_reload = False
+            return True
+
+    def reconcile_in_background(self) -> None:
+        """Schedule a reconcile if there are unconfirmed local edits"""
+        with self._lock:
+            if not self.dirty or self._closed.is_set():
+                return
+            if self._reconciling is not None and not self._reconciling.done():
+                return
+            self._reconciling = self._pool.submit(self._reconcile_loop)
+
+    def close(self) -> None:
+        self._closed.set()
+        self._pool.shutdown(wait=False)
+
+    def _reconcile_loop(self) -> None:
+        try:
+            # Give Notion a moment so our own writes are visible to the read
+            while not self._closed.wait(self.reconcile_delay):
+                if self.reconcile():
+                    return
+        except Exception as e:
+            logger.warning(f"Background reconcile failed: {e}")
+
+    def _adopt(self, blocks: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        with self._lock:
+            if self._blocks is None or [(b["id"], _signature(b)) for b in blocks] != [
+                (b["id"], _signature(b)) for b in self._blocks
+            ]:
+                self.version += 1
+            self._blocks = list(blocks)
+            self._needs_reload = False
+            return list(blocks)
+
+    def _diff(
+        self, local: List[Dict[str, Any]], server: List[Dict[str, Any]]
+    ) -> Optional[PageConflict]:
+        local_by_id = {b["id"]: _signature(b) for b in local}
+        server_by_id = {b["id"]: _signature(b) for b in server}
+        if [b["id"] for b in local] == [b["id"] for b in server] and local_by_id == server_by_id:
+            return None
+        return PageConflict(
+            version=self.version + 1,
+            added=[i for i in server_by_id if i not in local_by_id],
+            removed=[i for i in local_by_id if i not in server_by_id],
+            changed=[
+                i for i, sig in server_by_id.items() if i in local_by_id and local_by_id[i] != sig
+            ],
+        )
+
+    def _index(self, block_id: str) -> Optional[int]:
+        for idx, block in enumerate(self._blocks or []):
+            if block["id"] == block_id:
+                return idx
+        return None
+
+    def _subtree_end(self, idx: int) -> int:
+        """Index just past the block at idx and all of its descendants"""
+        blocks = self._blocks or []
+        depth = blocks[idx].get("depth", 0)
+        end = idx + 1
+        while end < len(blocks) and blocks[end].get("depth", 0) > depth:
+            end += 1
+        return end
+
+    def _apply_update(self, block: Dict[str, Any]) -> bool:
+        idx = self._index(block["id"])
+        if idx is None or self._blocks is None:
+            return False
+        old = self._blocks[idx]
+        self._blocks[idx] = {**old, "type": block["type"], "content": block["content"]}
+        return True
+
+    def _apply_created(
+        self, parent_id: str, after: Optional[str], created: List[Dict[str, Any]]
+    ) -> bool:
+        if self._blocks is None or not created:
+            return False
+
+        if parent_id == self.page_id:
+            depth = 0
+            position = len(self._blocks)
+        else:
+            parent_idx = self._index(parent_id)
+            if parent_idx is None:
+                # Not part of this page, or nested content we did not fetch
+                return False
+            depth = self._blocks[parent_idx].get("depth", 0) + 1
+            position = self._subtree_end(parent_idx)
+
+        if after is not None:
+            anchor = self._index(after)
+            if anchor is None:
+                logger.debug(f"Insert anchor {after} not in page model, reloading on next read")
+                self._needs_reload = True
+                return False
+            position = self._subtree_end(anchor)
+
+        new_blocks = [{**block, "depth": depth, "parent_id": parent_id} for block in created]
+        self._blocks[position:position] = new_blocks
+        return True
+
+    def _apply_deleted(self, block_id: str) -> bool:
+        idx = self._index(block_id)
+        if idx is None or self._blocks is None:
+            return False
+        del self._blocks[idx : self._subtree_end(idx)]
+        return True
@@ -0,0 +1,106 @@
+import threading
+from typing import Any, Dict, Optional
+
+from src.config import config
+from src.utils import setup_logger
+
+logger = setup_logger("PageWatcher")
+
+
+class PageWatcher:
+    """
+    Keeps a page snapshot warm from a daemon thread.
+
+    Every interval the watcher checks the page's last_edited_time and, when
+    it changed, lists the page again; blocks whose own last_edited_time is
+    unchanged are reused from the previous snapshot. Snapshots it confirmed
+    within one base interval are served to get_page_blocks without any
+    request. While the page is idle the interval doubles up to
+    NOTION_WATCH_MAX_INTERVAL; a change or user activity resets it.
+
+    Polls only use spare rate-limit capacity (see NOTION_WATCH_RESERVE), so
+    interactive requests never wait behind them.
+    """
+
+    def __init__(
+        self,
+        notion: Any,
+        page_id: str,
+        interval: Optional[float] = None,
+        max_interval: Optional[float] = None,
+    ) -> None:
+        self.notion = notion
+        self.page_id = page_id
+        self.interval = config.watch_interval if interval is None else interval
+        self.max_interval = config.watch_max_interval if max_interval is None else max_interval
+        self.current_interval = self.interval
+        self.stats: Dict[str, int] = {"polls": 0, "changes": 0, "deferred": 0}
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def running(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self) -> bool:
+        """Start polling; returns False if watching is disabled (interval 0)"""
+        if self.interval <= 0 or self.running:
+            return False
+        self._stop.clear()
+        self.notion.snapshot_ttl = self.interval
+        self._thread = threading.Thread(target=self._run, name="PageWatcher", daemon=True)
+        self._thread.start()
+        logger.info(f"Watching page {self.page_id} every {self.interval}s")
+        return True
+
+    def stop(self) -> None:
+        self._stop.set()
+        self.notion.snapshot_ttl = 0.0
+        if self._thread is not None:
+            self._thread.join(timeout=1)
+            self._thread = None
+
+    def touch(self) -> None:
+        """The user is active: go back to the base interval"""
+        self.current_interval = self.interval
+
+    def poll_once(self) -> Optional[bool]:
+        """Refresh the snapshot; True if the page changed, None if the poll was deferred"""
+        before = self.notion.snapshot(self.page_id)
+        deferred = self.notion.request_stats["deferred"]
+        self.stats["polls"] += 1
+
+        self.notion.get_page_blocks(self.page_id, background=True)
+
+        if self.notion.request_stats["deferred"] > deferred:
+            self.stats["deferred"] += 1
+            return None
+        after = self.notion.snapshot(self.page_id)
+        changed = after is not None and (
+            before is None or after.last_edited_time != before.last_edited_time
+        )
+        if changed:
+            self.stats["changes"] += 1
+        return changed
+
+    def summary(self) -> str:
+        return (
+            f"{self.stats['polls']} polls, {self.stats['changes']} changes seen, "
+            f"{self.stats['deferred']} deferred, next in {self.current_interval:.0f}s"
+        )
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.current_interval):
+            try:
+                changed = self.poll_once()
+            except Exception as e:
+                logger.warning(f"Page poll failed: {e}")
+                changed = False
+            self._reschedule(changed)
+
+    def _reschedule(self, changed: Optional[bool]) -> None:
+        if changed:
+            self.current_interval = self.interval
+        elif changed is False:
+            # Idle page: poll less often. Deferred polls keep the interval.
+            self.current_interval = min(self.max_interval, self.current_interval * 2)
@@ -0,0 +1,139 @@
+import hashlib
+import threading
+import time
+from typing import Dict, Optional
+
+from src.config import config
+from src.utils import setup_logger
+
+logger = setup_logger("RateLimiter")
+
+
+class TokenBucket:
+    """
+    Client-side token bucket shared by every caller using the same Notion token.
+
+    Tokens refill continuously at `rate` per second up to `burst`. A caller
+    reserves a token under a lock and then sleeps outside it, so threads and
+    asyncio tasks queue up fairly and the long-run request rate never exceeds
+    `rate`. A rate of 0 disables limiting.
+
+    The rate adapts: each 429 halves it (down to `min_rate`) and pauses the
+    bucket for the server's Retry-After; every success recovers a little of
+    the configured rate.
+    """
+
+    DECREASE_FACTOR = 0.5
+    RECOVERY_STEP = 0.05
+
+    def __init__(self, rate: float, burst: float, min_rate: Optional[float] = None) -> None:
+        self.base_rate = rate
+        self.rate = rate
+        self.burst = max(1.0, burst)
+        self.min_rate = min_rate if min_rate is not None else rate / 8
+        self.throttle_count = 0
+        self._tokens = self.burst
+        self._updated = time.monotonic()
+        self._paused_until = 0.0
+        self._lock = threading.Lock()
+
+    @property
+    def enabled(self) -> bool:
+        return self.base_rate > 0
+
+    def acquire(self, tokens: float = 1.0) -> float:
+        """Block the calling thread until a token is available; returns seconds waited"""
+        wait = self._reserve(tokens)
+        if wait > 0:
+            time.sleep(wait)
+        return wait
+
+    async def acquire_async(self, tokens: float = 1.0) -> float:
+        """Like acquire, but yields to the event loop while waiting"""
+        import asyncio
+
+        wait = self._reserve(tokens)
+        if wait > 0:
+            await asyncio.sleep(wait)
+        return wait
+
+    def try_acquire(self, tokens: float = 1.0, reserve: float = 0.0) -> bool:
+        """
+        Take a token only if one is available right now and at least `reserve`
+        tokens would remain afterwards. Never waits.
+        """
+        if not self.enabled:
+            return True
+        with self._lock:
+            now = time.monotonic()
+            self._refill(now)
+            if now < self._paused_until or self._tokens - tokens < reserve:
+                return False
+            self._tokens -= tokens
+            return True
+
+    def on_throttled(self, retry_after: Optional[float] = None) -> None:
+        """The server answered 429 despite the limiter: slow down and pause"""
+        if not self.enabled:
+            return
+        with self._lock:
+            now = time.monotonic()
+            self._refill(now)
+            self.throttle_count += 1
+            self.rate = max(self.min_rate, self.rate * self.DECREASE_FACTOR)
+            self._tokens = min(self._tokens, 0.0)
+            if retry_after:
+                self._paused_until = max(self._paused_until, now + retry_after)
+        logger.warning(f"Notion rate limit hit, lowering client rate to {self.rate:.2f} req/s")
+
+    def on_success(self) -> None:
+        """Recover towards the configured rate after successful requests"""
+        if not self.enabled or self.rate >= self.base_rate:
+            return
+        with self._lock:
+            self.rate = min(self.base_rate, self.rate + self.base_rate * self.RECOVERY_STEP)
+
+    def _reserve(self, tokens: float) -> float:
+        if not self.enabled:
+            return 0.0
+        with self._lock:
+            now = time.monotonic()
+            self._refill(now)
+            # Tokens may go negative: that is the queue of callers already waiting
+            self._tokens -= tokens
+            # Refilling only resumes once a pause after a 429 is over
+            wait = max(0.0, self._paused_until - now)
+            if self._tokens < 0:
+                wait += -self._tokens / self.rate
+            return wait
+
+    def _refill(self, now: float) -> None:
+        start = max(self._updated, self._paused_until)
+        if now > start:
+            self._tokens = min(self.burst, self._tokens + (now - start) * self.rate)
+        self._updated = max(now, self._updated)
+
+
+_limiters: Dict[str, TokenBucket] = {}
+_registry_lock = threading.Lock()
+
+
+def get_rate_limiter(
+    token: str, rate: Optional[float] = None, burst: Optional[float] = None
+) -> TokenBucket:
+    """
+    Return the bucket shared by all clients using `token`. Notion enforces its
+    limit per integration token, so every client for a token must share one.
+    Rate and burst default to the Notion settings and only apply when the
+    bucket is first created.
+    """
+    key = hashlib.sha256(token.encode("utf-8")).hexdigest()
+    with _registry_lock:
+        limiter = _limiters.get(key)
+        if limiter is None:
+            limiter = TokenBucket(
+                config.notion_rate_limit if rate is None else rate,
+                config.notion_rate_burst if burst is None else burst,
+            )
+            _limiters[key] = limiter
+        return limiter
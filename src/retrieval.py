@@ -0,0 +1,170 @@
+import hashlib
+import re
+from typing import TYPE_CHECKING, Any, Dict, List, Mapping, Optional, Protocol, Sequence, cast
+
+from src.config import config
+from src.context_builder import content_hash
+from src.utils import setup_logger
+
+if TYPE_CHECKING:
+    import numpy as np
+
+logger = setup_logger("Retrieval")
+
+_TOKEN = re.compile(r"\w+", re.UNICODE)
+
+
+def _numpy() -> Any:
+    try:
+        import numpy
+    except ImportError as e:
+        raise ImportError(
+            "Semantic retrieval requires numpy. "
+            "Install it with: pip install notion-sidecar[retrieval]"
+        ) from e
+    return numpy
+
+
+class Embedder(Protocol):
+    """Turns texts into fixed-size vectors. Documents and queries may be embedded differently."""
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]: ...
+
+    def embed_query(self, text: str) -> List[float]: ...
+
+
+class HashingEmbedder:
+    """
+    Deterministic, offline embedder based on feature hashing of words and
+    word bigrams. Not semantic, but stable across runs and useful for tests
+    and for running without network access.
+    """
+
+    def __init__(self, dim: int = 256) -> None:
+        self.dim = dim
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        return [self._embed(text) for text in texts]
+
+    def embed_query(self, text: str) -> List[float]:
+        return self._embed(text)
+
+    def _embed(self, text: str) -> List[float]:
+        vector = [0.0] * self.dim
+        words = [w.lower() for w in _TOKEN.findall(text)]
+        features = words + [f"{a} {b}" for a, b in zip(words, words[1:], strict=False)]
+        for feature in features:
+            digest = hashlib.blake2b(feature.encode("utf-8"), digest_size=8).digest()
+            bucket = int.from_bytes(digest[:4], "little") % self.dim
+            sign = 1.0 if digest[4] & 1 else -1.0
+            vector[bucket] += sign
+        return vector
+
+
+class GeminiEmbedder:
+    """Embeddings from the Gemini embedding API"""
+
+    def __init__(self, model: Optional[str] = None) -> None:
+        import google.generativeai as genai
+
+        self._genai = genai
+        self.model = model or config.embedding_model
+
+    # Maximum number of texts per embed_content request
+    BATCH_SIZE = 100
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        vectors: List[List[float]] = []
+        for start in range(0, len(texts), self.BATCH_SIZE):
+            result = self._genai.embed_content(
+                model=self.model,
+                content=texts[start : start + self.BATCH_SIZE],
+                task_type="retrieval_document",
+            )
+            vectors.extend(cast(List[List[float]], result["embedding"]))
+        return vectors
+
+    def embed_query(self, text: str) -> List[float]:
+        result = self._genai.embed_content(
+            model=self.model, content=text, task_type="retrieval_query"
+        )
+        return list(result["embedding"])
+
+
+class BlockRetriever:
+    """
+    Finds the blocks most relevant to a command.
+
+    Each block is embedded once; vectors are cached by content hash, so an
+    edited block is re-embedded and everything else is reused. The current
+    page is held as one normalized NumPy matrix, and a query is scored
+    against all blocks with a single matrix-vector product.
+    """
+
+    def __init__(self, embedder: Embedder, top_k: Optional[int] = None) -> None:
+        self.embedder = embedder
+        self.top_k = config.retrieval_top_k if top_k is None else top_k
+        self._vectors: Dict[str, "np.ndarray"] = {}
+        self._matrix: Optional["np.ndarray"] = None
+        self._matrix_keys: List[str] = []
+
+    @classmethod
+    def from_config(cls) -> Optional["BlockRetriever"]:
+        """Build the retriever configured by RETRIEVAL_TOP_K/RETRIEVAL_EMBEDDER, if enabled"""
+        if config.retrieval_top_k <= 0:
+            return None
+        embedder: Embedder
+        if config.retrieval_embedder == "gemini":
+            embedder = GeminiEmbedder()
+        else:
+            embedder = HashingEmbedder()
+        return cls(embedder)
+
+    def search(
+        self, blocks: Sequence[Mapping[str, Any]], query: str, k: Optional[int] = None
+    ) -> List[int]:
+        """Return the indexes of the k most relevant blocks, best first"""
+        np = _numpy()
+        k = self.top_k if k is None else k
+        if not blocks or k <= 0:
+            return []
+
+        matrix = self._page_matrix(blocks)
+        query_vector = self._normalize(
+            np.asarray(self.embedder.embed_query(query), dtype=np.float32)
+        )
+        scores = matrix @ query_vector
+
+        k = min(k, len(blocks))
+        top = np.argpartition(-scores, k - 1)[:k]
+        return [int(idx) for idx in top[np.argsort(-scores[top], kind="stable")]]
+
+    def _page_matrix(self, blocks: Sequence[Mapping[str, Any]]) -> "np.ndarray":
+        np = _numpy()
+        keys = [content_hash(block) for block in blocks]
+        if self._matrix is not None and keys == self._matrix_keys:
+            return self._matrix
+
+        missing = [i for i, key in enumerate(keys) if key not in self._vectors]
+        if missing:
+            texts = [self._document_text(blocks[i]) for i in missing]
+            logger.debug(f"Embedding {len(texts)} new or changed blocks")
+            vectors = np.asarray(self.embedder.embed_documents(texts), dtype=np.float32)
+            for i, vector in zip(missing, vectors, strict=True):
+                self._vectors[keys[i]] = self._normalize(vector)
+
+        # Keep only vectors of blocks that are still on the page
+        live = set(keys)
+        self._vectors = {key: vec for key, vec in self._vectors.items() if key in live}
+
+        self._matrix = np.vstack([self._vectors[key] for key in keys])
+        self._matrix_keys = keys
+        return self._matrix
+
+    def _document_text(self, block: Mapping[str, Any]) -> str:
+        return f"{block.get('type', '')}: {block.get('content', '')}"
+
+    def _normalize(self, vector: "np.ndarray") -> "np.ndarray":
+        np = _numpy()
+        norm = float(np.linalg.norm(vector))
+        return vector / norm if norm else vector
@@ -0,0 +1,184 @@
+import hashlib
+import random
+import threading
+import time
+from typing import Any, Dict, Optional, Tuple
+
+from src.config import config
+from src.utils import setup_logger
+
+logger = setup_logger("RetryPolicy")
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+
+class RetryPolicy:
+    """
+    How hard a single Notion call may try before giving up.
+
+    Each call gets a deadline; attempts stop once it has passed, and the
+    read timeout of the last attempt is cut down to whatever time is left.
+    Between attempts the policy waits an exponentially growing, fully
+    jittered delay so concurrent callers do not retry in lockstep.
+    """
+
+    def __init__(
+        self,
+        max_attempts: Optional[int] = None,
+        deadline: Optional[float] = None,
+        connect_timeout: Optional[float] = None,
+        read_timeout: Optional[float] = None,
+        base_delay: Optional[float] = None,
+        max_delay: Optional[float] = None,
+    ) -> None:
+        self.max_attempts = config.notion_max_attempts if max_attempts is None else max_attempts
+        self.deadline = config.notion_request_deadline if deadline is None else deadline
+        self.connect_timeout = (
+            config.notion_connect_timeout if connect_timeout is None else connect_timeout
+        )
+        self.read_timeout = config.notion_read_timeout if read_timeout is None else read_timeout
+        self.base_delay = config.notion_backoff_base if base_delay is None else base_delay
+        self.max_delay = config.notion_backoff_max if max_delay is None else max_delay
+
+    def deadline_at(self) -> Optional[float]:
+        """Monotonic time by which a call starting now must finish (None = no deadline)"""
+        return time.monotonic() + self.deadline if self.deadline > 0 else None
+
+    def remaining(self, deadline_at: Optional[float]) -> Optional[float]:
+        if deadline_at is None:
+            return None
+        return deadline_at - time.monotonic()
+
+    def timeout(self, deadline_at: Optional[float]) -> Optional[Tuple[float, float]]:
+        """(connect, read) timeouts for the next attempt, or None if the deadline has passed"""
+        remaining = self.remaining(deadline_at)
+        if remaining is None:
+            return self.connect_timeout, self.read_timeout
+        if remaining <= 0:
+            return None
+        return min(self.connect_timeout, remaining), min(self.read_timeout, remaining)
+
+    def backoff(self, attempt: int) -> float:
+        """Full-jitter delay before retry number `attempt` (0-based)"""
+        cap = min(self.max_delay, self.base_delay * (2**attempt))
+        return random.uniform(0, cap)
+
+    def fits(self, delay: float, deadline_at: Optional[float]) -> bool:
+        """Whether waiting `delay` seconds still leaves time for another attempt"""
+        remaining = self.remaining(deadline_at)
+        return remaining is None or delay < remaining
+
+
+class CircuitBreaker:
+    """
+    Fails fast while Notion is unhealthy.
+
+    After `failure_threshold` consecutive failures (5xx responses, timeouts,
+    connection errors) the circuit opens and requests are rejected without
+    touching the network. Once `reset_timeout` has passed, a single probe is
+    let through (half-open); its success closes the circuit, its failure
+    opens it again. A probe that has not reported back within
+    `reset_timeout` (cancelled, or ended by an unexpected error) is treated
+    as lost and another one is let through. A threshold of 0 disables the
+    breaker.
+    """
+
+    def __init__(
+        self,
+        failure_threshold: Optional[int] = None,
+        reset_timeout: Optional[float] = None,
+    ) -> None:
+        self.failure_threshold = (
+            config.notion_breaker_threshold if failure_threshold is None else failure_threshold
+        )
+        self.reset_timeout = config.notion_breaker_reset if reset_timeout is None else reset_timeout
+        self.state = CLOSED
+        self.consecutive_failures = 0
+        self.times_opened = 0
+        self.rejected = 0
+        self._opened_at = 0.0
+        self._probing = False
+        self._probe_started = 0.0
+        self._lock = threading.Lock()
+
+    @property
+    def enabled(self) -> bool:
+        return self.failure_threshold > 0
+
+    def allow(self) -> bool:
+        """Whether a request may be sent right now"""
+        if not self.enabled:
+            return True
+        with self._lock:
+            now = time.monotonic()
+            if self.state == OPEN and now - self._opened_at >= self.reset_timeout:
+                self.state = HALF_OPEN
+                self._probing = False
+            if (
+                self.state == HALF_OPEN
+                and self._probing
+                and now - self._probe_started >= self.reset_timeout
+            ):
+                logger.warning("Circuit probe never reported back, sending another")
+                self._probing = False
+            if self.state == HALF_OPEN and not self._probing:
+                self._probing = True
+                self._probe_started = now
+                return True
+            if self.state == CLOSED:
+                return True
+            self.rejected += 1
+            return False
+
+    def record_success(self) -> None:
+        if not self.enabled:
+            return
+        with self._lock:
+            if self.state != CLOSED:
+                logger.info("Notion is responding again, closing circuit")
+            self.state = CLOSED
+            self.consecutive_failures = 0
+            self._probing = False
+
+    def record_failure(self) -> None:
+        if not self.enabled:
+            return
+        with self._lock:
+            self.consecutive_failures += 1
+            if self.state == HALF_OPEN or (
+                self.state == CLOSED and self.consecutive_failures >= self.failure_threshold
+            ):
+                self.state = OPEN
+                self.times_opened += 1
+                self._opened_at = time.monotonic()
+                self._probing = False
+                logger.error(
+                    f"Notion failing ({self.consecutive_failures} consecutive errors), "
+                    f"opening circuit for {self.reset_timeout}s"
+                )
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "state": self.state,
+                "consecutive_failures": self.consecutive_failures,
+                "times_opened": self.times_opened,
+                "rejected": self.rejected,
+            }
+
+
+_breakers: Dict[str, CircuitBreaker] = {}
+_registry_lock = threading.Lock()
+
+
+def get_circuit_breaker(token: str) -> CircuitBreaker:
+    """Return the breaker shared by all clients using `token`, like the rate limiter"""
+    key = hashlib.sha256(token.encode("utf-8")).hexdigest()
+    with _registry_lock:
+        breaker = _breakers.get(key)
+        if breaker is None:
+            breaker = CircuitBreaker()
+            _breakers[key] = breaker
+        return breaker
@@ -0,0 +1,130 @@
+import hashlib
+import queue
+import threading
+from collections import OrderedDict
+from typing import Any, Callable, List, Mapping, Optional, Sequence, Set, Tuple
+
+from src.config import config
+from src.context_builder import content_hash
+from src.metrics import metrics
+from src.utils import setup_logger
+
+logger = setup_logger("SectionSummaries")
+
+HEADING_TYPES = ("heading_1", "heading_2", "heading_3")
+
+
+def split_sections(blocks: Sequence[Mapping[str, Any]]) -> List[Tuple[int, int]]:
+    """
+    [start, end) index ranges of the page's sections. Every top-level
+    heading_1/2/3 starts a section that runs until the next heading, so a
+    heading_2 under a heading_1 is summarized on its own; the blocks before
+    the first heading form the first section.
+    """
+    starts = [0]
+    for idx, block in enumerate(blocks):
+        if idx and block.get("depth", 0) == 0 and block.get("type") in HEADING_TYPES:
+            starts.append(idx)
+    ends = starts[1:] + [len(blocks)]
+    return [(start, end) for start, end in zip(starts, ends, strict=True) if start < end]
+
+
+def section_hash(blocks: Sequence[Mapping[str, Any]]) -> str:
+    """Hash of a section's content; unchanged sections keep their summary"""
+    digest = hashlib.sha1()
+    for block in blocks:
+        digest.update(content_hash(block).encode("ascii"))
+    return digest.hexdigest()
+
+
+def section_text(blocks: Sequence[Mapping[str, Any]]) -> str:
+    return "\n".join(f"{'  ' * b.get('depth', 0)}{b.get('content', '')}" for b in blocks)
+
+
+class SectionSummarizer:
+    """
+    Summaries of page sections, keyed by section hash and generated on a
+    background daemon thread so commands (and exit) never wait for them. `schedule` queues the
+    sections without a summary; `get` returns a summary once it is ready.
+    A failed summary is dropped and tried again the next time it is
+    scheduled.
+    """
+
+    def __init__(
+        self,
+        summarize: Callable[[str], str],
+        min_blocks: Optional[int] = None,
+        max_entries: int = 512,
+    ) -> None:
+        self.summarize = summarize
+        self.min_blocks = config.section_summary_min_blocks if min_blocks is None else min_blocks
+        self.max_entries = max_entries
+        self._summaries: "OrderedDict[str, str]" = OrderedDict()
+        self._pending: Set[str] = set()
+        self._lock = threading.Lock()
+        self._queue: "queue.Queue[Tuple[str, str]]" = queue.Queue()
+        self._worker: Optional[threading.Thread] = None
+
+    def get(self, key: str) -> Optional[str]:
+        with self._lock:
+            summary = self._summaries.get(key)
+            if summary is not None:
+                self._summaries.move_to_end(key)
+            return summary
+
+    def sections(self, blocks: Sequence[Mapping[str, Any]]) -> List[Tuple[int, int, str]]:
+        """(start, end, hash) of the sections long enough to be summarized"""
+        return [
+            (start, end, section_hash(blocks[start:end]))
+            for start, end in split_sections(blocks)
+            if end - start >= self.min_blocks
+        ]
+
+    def schedule(
+        self,
+        blocks: Sequence[Mapping[str, Any]],
+        sections: Optional[List[Tuple[int, int, str]]] = None,
+    ) -> int:
+        """Queue summaries for the page's sections that lack one; returns how many"""
+        queued = 0
+        for start, end, key in self.sections(blocks) if sections is None else sections:
+            with self._lock:
+                if key in self._summaries or key in self._pending:
+                    continue
+                self._pending.add(key)
+            self._queue.put((key, section_text(blocks[start:end])))
+            queued += 1
+        with self._lock:
+            if queued and self._worker is None:
+                self._worker = threading.Thread(
+                    target=self._work, name="SectionSummary", daemon=True
+                )
+                self._worker.start()
+        return queued
+
+    def wait(self) -> None:
+        """Block until every queued summary is done (tests and benchmarks)"""
+        self._queue.join()
+
+    def _work(self) -> None:
+        while True:
+            key, text = self._queue.get()
+            try:
+                self._run(key, text)
+            finally:
+                self._queue.task_done()
+
+    def _run(self, key: str, text: str) -> None:
+        try:
+            summary = " ".join(self.summarize(text).split())
+        except Exception as e:
+            logger.debug(f"Section summary failed: {e}")
+            summary = ""
+        with self._lock:
+            self._pending.discard(key)
+            if not summary:
+                return
+            self._summaries[key] = summary
+            while len(self._summaries) > self.max_entries:
+                self._summaries.popitem(last=False)
+        metrics.incr("section_summaries")
@@ -0,0 +1,188 @@
+import json
+from typing import Any, Dict, List, Optional, Union
+
+# Actions that must name a target block before they can be acted on
+TARGETED_ACTIONS = ("UPDATE", "DELETE", "INSERT", "REWRITE")
+KNOWN_ACTIONS = TARGETED_ACTIONS + ("APPEND", "CHAT")
+
+_Container = Dict[str, Any]
+
+
+class IncrementalPlanParser:
+    """
+    Incremental parser for a streamed action plan.
+
+    Chunks of model output are fed in as they arrive. The parser tracks the
+    JSON structure character by character and reports each action as soon as
+    its `action` (and, for targeted actions, its `target_block_index`) have
+    been read, long before the `text` value is complete. It accepts both
+    {"actions": [...]} and a single action object, and skips any leading
+    markdown fence.
+
+    It is only used for early feedback; the complete response is still
+    parsed normally once the stream ends.
+    """
+
+    def __init__(self) -> None:
+        self._started = False
+        self._stack: List[_Container] = []
+        self._in_string = False
+        self._escape = False
+        self._token: List[str] = []
+        self._scalar: List[str] = []
+        self._action_count = 0
+        self._done = False
+
+    def feed(self, chunk: str) -> List[Dict[str, Any]]:
+        """Consume a chunk; return the actions that became identifiable in it"""
+        ready: List[Dict[str, Any]] = []
+        for char in chunk:
+            if self._done:
+                break
+            if not self._started:
+                if char not in "{[":
+                    continue
+                self._started = True
+            self._consume(char, ready)
+        return ready
+
+    def _consume(self, char: str, ready: List[Dict[str, Any]]) -> None:
+        if self._in_string:
+            if self._escape:
+                self._escape = False
+                if self._wants_string():
+                    self._token.append(char)
+            elif char == "\\":
+                self._escape = True
+                if self._wants_string():
+                    self._token.append(char)
+            elif char == '"':
+                self._in_string = False
+                raw = "".join(self._token)
+                self._token = []
+                try:
+                    text = json.loads(f'"{raw}"')
+                except ValueError:
+                    text = raw
+                self._value(text, ready, is_key_candidate=True)
+            else:
+                # Only keys and short scalar values matter; skip buffering long text
+                if self._wants_string():
+                    self._token.append(char)
+            return
+
+        if char == '"':
+            self._in_string = True
+            return
+
+        if char in "{[":
+            self._flush_scalar(ready)
+            container: _Container = {
+                "kind": "object" if char == "{" else "array",
+                "key": None,
+                "fields": {},
+                "path": self._child_path(),
+                "reported": False,
+            }
+            self._stack.append(container)
+            return
+
+        if char in "}]":
+            self._flush_scalar(ready)
+            closed = self._stack.pop() if self._stack else None
+            if closed is not None and closed["kind"] == "object":
+                self._report(closed, ready, final=True)
+            if not self._stack:
+                self._done = True
+            else:
+                self._after_value()
+            return
+
+        if char in ",:":
+            self._flush_scalar(ready)
+            return
+
+        if not char.isspace():
+            self._scalar.append(char)
+        else:
+            self._flush_scalar(ready)
+
+    def _flush_scalar(self, ready: List[Dict[str, Any]]) -> None:
+        if not self._scalar:
+            return
+        raw = "".join(self._scalar)
+        self._scalar = []
+        try:
+            value = json.loads(raw)
+        except ValueError:
+            value = raw
+        self._value(value, ready, is_key_candidate=False)
+
+    def _value(self, value: Any, ready: List[Dict[str, Any]], is_key_candidate: bool) -> None:
+        if not self._stack:
+            return
+        top = self._stack[-1]
+        if top["kind"] == "object":
+            if top["key"] is None and is_key_candidate:
+                top["key"] = value
+                return
+            if top["key"] is not None:
+                top["fields"][top["key"]] = value
+                top["key"] = None
+                self._report(top, ready, final=False)
+
+    def _after_value(self) -> None:
+        """A nested container finished; it was the value of the parent's pending key"""
+        top = self._stack[-1]
+        if top["kind"] == "object":
+            top["key"] = None
+
+    def _wants_string(self) -> bool:
+        if not self._stack:
+            return True
+        top = self._stack[-1]
+        return top["kind"] != "object" or top["key"] in (None, "action", "block_type")
+
+    def _child_path(self) -> List[Union[str, int]]:
+        if not self._stack:
+            return []
+        parent = self._stack[-1]
+        if parent["kind"] == "object":
+            return list(parent["path"]) + [parent["key"]]
+        return list(parent["path"]) + ["*"]
+
+    def _is_action_object(self, container: _Container) -> bool:
+        path: List[Union[str, int]] = container["path"]
+        return path in ([], ["actions", "*"], ["*"])
+
+    def _report(self, container: _Container, ready: List[Dict[str, Any]], final: bool) -> None:
+        if container["reported"] or not self._is_action_object(container):
+            return
+        fields = container["fields"]
+        action = fields.get("action")
+        if not isinstance(action, str):
+            return
+        action = action.upper()
+        if action in TARGETED_ACTIONS and "target_block_index" not in fields and not final:
+            return
+
+        container["reported"] = True
+        event: Dict[str, Any] = {"position": self._action_count, "action": action}
+        if "target_block_index" in fields:
+            event["target_block_index"] = fields["target_block_index"]
+        if "block_type" in fields:
+            event["block_type"] = fields["block_type"]
+        self._action_count += 1
+        ready.append(event)
+
+
+def validate_action_event(event: Dict[str, Any], block_count: int) -> Optional[str]:
+    """Return a problem description for an early action event, or None if it looks valid"""
+    action = event.get("action")
+    if action not in KNOWN_ACTIONS:
+        return f"unknown action {action!r}"
+    if action in TARGETED_ACTIONS:
+        idx = event.get("target_block_index")
+        if not isinstance(idx, int) or isinstance(idx, bool) or not 0 <= idx < block_count:
+            return f"invalid block index {idx!r} for {action}"
+    return None
@@ -1,16 +1,29 @@
+import importlib
 import logging
 import sys
+from types import ModuleType
+from typing import Any, Optional, Set, TextIO
 
+# Where setup_logger sends log lines; see redirect_logging
+_log_stream: TextIO = sys.stdout
+# Level of loggers created without one; see set_log_level
+_log_level = "INFO"
+_default_level_loggers: Set[str] = set()
 
-def setup_logger(name: str = "GeminiAgent", level: str = "INFO") -> logging.Logger:
+
+def setup_logger(name: str = "GeminiAgent", level: Optional[str] = None) -> logging.Logger:
     """
-    Set up a logger with colorful console output
+    Set up a logger with colorful console output. Without a level the logger
+    follows set_log_level, so modules can create loggers at import time
+    without reading the configuration.
     """
     logger = logging.getLogger(name)
-    logger.setLevel(getattr(logging, level.upper()))
+    if level is None:
+        _default_level_loggers.add(name)
+    logger.setLevel(getattr(logging, (level or _log_level).upper()))
 
     if not logger.handlers:
-        handler = logging.StreamHandler(sys.stdout)
+        handler = logging.StreamHandler(_log_stream)
 
         # Custom formatter
         formatter = logging.Formatter(
@@ -22,6 +35,53 @@ def setup_logger(name: str = "GeminiAgent", level: str = "INFO") -> logging.Logg
     return logger
 
 
+def set_log_level(level: str) -> None:
+    """Apply LOG_LEVEL to the loggers created without a level, and to later ones"""
+    global _log_level
+    _log_level = level
+    for name in _default_level_loggers:
+        logging.getLogger(name).setLevel(getattr(logging, level.upper()))
+
+
+def redirect_logging(stream: TextIO) -> None:
+    """
+    Send all log output to another stream, e.g. stderr when stdout carries
+    machine-readable results. Applies to existing and future loggers.
+    """
+    global _log_stream
+    _log_stream = stream
+    for logger in logging.Logger.manager.loggerDict.values():
+        for handler in getattr(logger, "handlers", []):
+            if isinstance(handler, logging.StreamHandler):
+                handler.setStream(stream)
+
+
+class LazyModule:
+    """
+    Stand-in for a module that is imported on first attribute access.
+
+    Keeps heavy dependencies (the Gemini SDK, requests) off the startup path
+    of commands that never use them, while `module.attr` still works and
+    can be patched in tests.
+    """
+
+    def __init__(self, name: str) -> None:
+        self._name = name
+        self._module: Optional[ModuleType] = None
+
+    def __getattr__(self, attr: str) -> Any:
+        # Only called for names not set on the instance itself
+        module = self.__dict__["_module"]
+        if module is None:
+            module = importlib.import_module(self.__dict__["_name"])
+            self._module = module
+        return getattr(module, attr)
+
+    def __repr__(self) -> str:
+        state = "loaded" if self._module is not None else "not loaded"
+        return f"<lazy module '{self._name}' ({state})>"
+
+
 def print_colored(text: str, color: str = "cyan") -> None:
     """Print colored text to terminal"""
     colors = {
@@ -0,0 +1,372 @@
+import itertools
+import threading
+from dataclasses import dataclass, field
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+from src.config import config
+from src.metrics import metrics
+from src.notion_client import (
+    BLOCK_DELETED,
+    BLOCK_UPDATED,
+    BLOCKS_CREATED,
+    MAX_CHILDREN_PER_REQUEST,
+    Block,
+    MutationListener,
+    NotionClient,
+)
+from src.utils import setup_logger
+
+logger = setup_logger("WriteBehind")
+
+UPDATE = "update"
+CREATE = "create"
+DELETE = "delete"
+
+# Ids handed out for blocks that are queued but not created yet
+PLACEHOLDER_PREFIX = "pending-"
+
+
+@dataclass(eq=False)
+class _Write:
+    kind: str
+    block_id: Optional[str] = None
+    text: str = ""
+    block_type: str = "paragraph"
+    parent_id: Optional[str] = None
+    after: Optional[str] = None
+    # CREATE: the queued blocks, as {"id": placeholder, "type": ..., "content": ...}
+    blocks: List[Dict[str, Any]] = field(default_factory=list)
+
+
+class WriteBehindQueue:
+    """
+    Buffers the writes of a NotionClient and sends them after `delay`
+    seconds, on `flush()`, or before any read. It has the client's write
+    methods, so it can be passed wherever the client is; other attributes
+    are the client's own.
+
+    While queued, writes are coalesced: successive updates of a block are
+    merged into the last one, consecutive appends (or inserts continuing a
+    run of queued inserts) under the same parent become one children
+    request, and a queued block that is deleted again is never created.
+    Queued blocks get placeholder ids, which later writes may target; they
+    are replaced by the real ids when the blocks are created.
+
+    Writes are sent in the order they were made, through a single queue, so
+    the order on every page is kept; coalescing never moves a write past one
+    that depends on it. Subscribers see each write as soon as it is queued,
+    and a queued block's placeholder is deleted just before its real block is
+    announced. Write methods report success when the write is queued; writes
+    that fail at flush time are logged and counted, and the page model's
+    reconcile then adopts the server version.
+    """
+
+    def __init__(self, notion: NotionClient, delay: Optional[float] = None) -> None:
+        self.notion = notion
+        self.delay = config.write_behind_delay if delay is None else delay
+        self.stats: Dict[str, int] = {
+            "queued": 0,
+            "coalesced": 0,
+            "cancelled": 0,
+            "requests": 0,
+            "failed": 0,
+        }
+        self._writes: List[_Write] = []
+        self._queued_blocks: Dict[str, _Write] = {}
+        self._resolved: Dict[str, str] = {}
+        self._ids = itertools.count(1)
+        self._listeners: List[MutationListener] = []
+        self._lock = threading.RLock()
+        self._flush_lock = threading.Lock()
+        self._timer: Optional[threading.Timer] = None
+        self._creating: Optional[Iterator[Dict[str, Any]]] = None
+        notion.subscribe(self._relay)
+
+    def __getattr__(self, name: str) -> Any:
+        if name == "notion":
+            raise AttributeError(name)
+        return getattr(self.notion, name)
+
+    @property
+    def pending(self) -> int:
+        """Writes waiting to be sent"""
+        with self._lock:
+            return len(self._writes)
+
+    def summary(self) -> str:
+        return (
+            f"{self.stats['queued']} writes queued, {self.stats['coalesced']} coalesced, "
+            f"{self.stats['cancelled']} cancelled, {self.stats['requests']} sent, "
+            f"{self.stats['failed']} failed"
+        )
+
+    def subscribe(self, listener: MutationListener) -> None:
+        """Like NotionClient.subscribe; queued writes are announced right away"""
+        self._listeners.append(listener)
+
+    # Reads see every write made before them
+
+    def get_page_blocks(self, *args: Any, **kwargs: Any) -> List[Dict[str, Any]]:
+        self.flush()
+        return self.notion.get_page_blocks(*args, **kwargs)
+
+    def iter_page_blocks(self, *args: Any, **kwargs: Any) -> Iterator[Block]:
+        self.flush()
+        return self.notion.iter_page_blocks(*args, **kwargs)
+
+    def get_block(self, block_id: str) -> Optional[Dict[str, Any]]:
+        self.flush()
+        block_id = self._resolve(block_id)
+        if block_id.startswith(PLACEHOLDER_PREFIX):
+            return None
+        return self.notion.get_block(block_id)
+
+    # Writes
+
+    def update_block(self, block_id: str, new_text: str, block_type: str = "paragraph") -> bool:
+        with self._lock:
+            block_id = self._resolve(block_id)
+            queued = self._queued_blocks.get(block_id)
+            if queued is not None:
+                block = next(b for b in queued.blocks if b["id"] == block_id)
+                block.update(type=block_type, content=new_text)
+                self._count("coalesced")
+            else:
+                earlier = self._find(UPDATE, block_id)
+                if earlier is not None:
+                    earlier.text, earlier.block_type = new_text, block_type
+                    self._count("coalesced")
+                else:
+                    self._writes.append(_Write(UPDATE, block_id, new_text, block_type))
+            self._count("queued")
+        block = {"id": block_id, "type": block_type, "content": new_text}
+        self._emit(BLOCK_UPDATED, {"block": block})
+        self._schedule()
+        return True
+
+    def append_block(self, parent_id: str, text: str, block_type: str = "paragraph") -> bool:
+        return self.append_blocks(parent_id, [(text, block_type)])[0]
+
+    def append_blocks(self, parent_id: str, items: List[Tuple[str, str]]) -> List[bool]:
+        return self._create(parent_id, None, items)
+
+    def insert_block_after(
+        self,
+        block_id: str,
+        text: str,
+        block_type: str = "paragraph",
+        parent_id: Optional[str] = None,
+    ) -> bool:
+        return self.insert_blocks_after(block_id, [(text, block_type)], parent_id=parent_id)[0]
+
+    def insert_blocks_after(
+        self,
+        block_id: str,
+        items: List[Tuple[str, str]],
+        parent_id: Optional[str] = None,
+    ) -> List[bool]:
+        return self._create(parent_id or config.page_id, block_id, items)
+
+    def delete_block(self, block_id: str) -> bool:
+        with self._lock:
+            block_id = self._resolve(block_id)
+            dropped = [w for w in self._writes if w.kind == UPDATE and w.block_id == block_id]
+            self._writes = [w for w in self._writes if w not in dropped]
+            for _ in dropped:
+                self._count("coalesced")
+
+            queued = self._queued_blocks.get(block_id)
+            if queued is not None and not self._referenced(block_id):
+                # Never created, so nothing to delete either
+                del self._queued_blocks[block_id]
+                queued.blocks = [b for b in queued.blocks if b["id"] != block_id]
+                if not queued.blocks:
+                    self._writes.remove(queued)
+                self._count("cancelled")
+            else:
+                self._writes.append(_Write(DELETE, block_id))
+            self._count("queued")
+        self._emit(BLOCK_DELETED, {"block_id": block_id})
+        self._schedule()
+        return True
+
+    def delete_blocks(self, block_ids: List[str]) -> List[bool]:
+        return [self.delete_block(block_id) for block_id in block_ids]
+
+    # Sending
+
+    def flush(self) -> int:
+        """Send all queued writes, in order; returns the number of requests made"""
+        with self._flush_lock:
+            with self._lock:
+                writes, self._writes = self._writes, []
+                if self._timer is not None:
+                    self._timer.cancel()
+                    self._timer = None
+                # Blocks on their way to Notion can no longer be changed in the queue
+                for write in writes:
+                    for block in write.blocks:
+                        self._queued_blocks.pop(block["id"], None)
+            if not writes:
+                return 0
+
+            requests = 0
+            with metrics.span("notion.write_behind_flush"):
+                for group in _runs(writes):
+                    requests += self._send(group)
+            metrics.incr("write_behind_flushes")
+            return requests
+
+    def _send(self, writes: List[_Write]) -> int:
+        first = writes[0]
+        if first.kind == DELETE:
+            ids = [self._resolve(w.block_id or "") for w in writes]
+            ids = [i for i in ids if not i.startswith(PLACEHOLDER_PREFIX)]
+            self._failed(len(writes) - len(ids), "delete of a block that was never created")
+            if len(ids) == 1:
+                results = [self.notion.delete_block(ids[0])]
+            else:
+                results = self.notion.delete_blocks(ids)
+        elif first.kind == UPDATE:
+            block_id = self._resolve(first.block_id or "")
+            if block_id.startswith(PLACEHOLDER_PREFIX):
+                self._failed(1, "update of a block that was never created")
+                return 0
+            results = [self.notion.update_block(block_id, first.text, block_type=first.block_type)]
+        else:
+            results = self._send_create(first)
+
+        self._failed(results.count(False), f"{first.kind} rejected by Notion")
+        requests = len(results)
+        if first.kind == CREATE:
+            requests = -(-requests // MAX_CHILDREN_PER_REQUEST)
+        self._count("requests", requests)
+        return requests
+
+    def _send_create(self, write: _Write) -> List[bool]:
+        parent_id = self._resolve(write.parent_id or "")
+        after = self._resolve(write.after) if write.after is not None else None
+        if parent_id.startswith(PLACEHOLDER_PREFIX) or (
+            after is not None and after.startswith(PLACEHOLDER_PREFIX)
+        ):
+            self._failed(len(write.blocks), "insert next to a block that was never created")
+            return []
+
+        items = [(b["content"], b["type"]) for b in write.blocks]
+        with self._lock:
+            self._creating = iter(write.blocks)
+        try:
+            if after is None:
+                return self.notion.append_blocks(parent_id, items)
+            return self.notion.insert_blocks_after(after, items, parent_id=parent_id)
+        finally:
+            with self._lock:
+                self._creating = None
+
+    def _relay(self, event: str, payload: Dict[str, Any]) -> None:
+        """Client mutation listener: swap placeholders for the blocks Notion created"""
+        if event == BLOCKS_CREATED:
+            with self._lock:
+                replaced: List[str] = []
+                if self._creating is not None:
+                    # The created blocks come first so no placeholder is consumed in vain
+                    for created, placeholder in zip(
+                        payload["blocks"], self._creating, strict=False
+                    ):
+                        self._resolved[placeholder["id"]] = created["id"]
+                        replaced.append(placeholder["id"])
+            for placeholder_id in replaced:
+                self._emit(BLOCK_DELETED, {"block_id": placeholder_id})
+        self._emit(event, payload)
+
+    def _create(
+        self, parent_id: str, after: Optional[str], items: List[Tuple[str, str]]
+    ) -> List[bool]:
+        if not items:
+            return []
+        with self._lock:
+            parent_id = self._resolve(parent_id)
+            after = self._resolve(after) if after is not None else None
+            blocks = [
+                {
+                    "id": f"{PLACEHOLDER_PREFIX}{next(self._ids)}",
+                    "type": block_type,
+                    "content": text,
+                }
+                for text, block_type in items
+            ]
+            last = self._writes[-1] if self._writes else None
+            if (
+                last is not None
+                and last.kind == CREATE
+                and last.parent_id == parent_id
+                and after == (last.after if after is None else last.blocks[-1]["id"])
+            ):
+                # Continues the previous append or run of inserts
+                last.blocks.extend(blocks)
+                write = last
+                self._count("coalesced")
+            else:
+                write = _Write(CREATE, parent_id=parent_id, after=after, blocks=blocks)
+                self._writes.append(write)
+            for block in blocks:
+                self._queued_blocks[block["id"]] = write
+            self._count("queued", len(items))
+
+        created = [dict(block) for block in blocks]
+        self._emit(BLOCKS_CREATED, {"parent_id": parent_id, "after": after, "blocks": created})
+        self._schedule()
+        return [True] * len(items)
+
+    def _resolve(self, block_id: str) -> str:
+        return self._resolved.get(block_id, block_id)
+
+    def _find(self, kind: str, block_id: str) -> Optional[_Write]:
+        return next((w for w in self._writes if w.kind == kind and w.block_id == block_id), None)
+
+    def _referenced(self, block_id: str) -> bool:
+        """Whether a queued write needs the block to exist"""
+        return any(
+            block_id in (w.parent_id, w.after) or (w.kind != UPDATE and w.block_id == block_id)
+            for w in self._writes
+        )
+
+    def _schedule(self) -> None:
+        with self._lock:
+            if self.delay <= 0 or self._timer is not None or not self._writes:
+                return
+            self._timer = threading.Timer(self.delay, self._flush_in_background)
+            self._timer.daemon = True
+            self._timer.start()
+
+    def _flush_in_background(self) -> None:
+        try:
+            self.flush()
+        except Exception as e:
+            logger.error(f"Write-behind flush failed: {e}")
+
+    def _emit(self, event: str, payload: Dict[str, Any]) -> None:
+        for listener in list(self._listeners):
+            try:
+                listener(event, payload)
+            except Exception as e:
+                logger.warning(f"Mutation listener failed on {event}: {e}")
+
+    def _count(self, stat: str, amount: int = 1) -> None:
+        with self._lock:
+            self.stats[stat] += amount
+        metrics.incr(f"write_behind_{stat}", amount)
+
+    def _failed(self, count: int, reason: str) -> None:
+        if count:
+            logger.warning(f"{count} queued write(s) failed: {reason}")
+            self._count("failed", count)
+
+
+def _runs(writes: List[_Write]) -> Iterator[List[_Write]]:
+    """Writes in order, with consecutive deletes grouped into one concurrent batch"""
+    for kind, group in itertools.groupby(writes, key=lambda w: w.kind):
+        if kind == DELETE:
+            yield list(group)
+        else:
+            yield from ([w] for w in group)
@@ -0,0 +1,14 @@
+import pytest
+
+from src import rate_limiter, retry_policy
+
+
+@pytest.fixture(autouse=True)
+def no_rate_limit(monkeypatch):
+    """Tests talk to mocks: no client-side throttling and a fresh circuit breaker per test"""
+    monkeypatch.setenv("NOTION_RATE_LIMIT", "0")
+    rate_limiter._limiters.clear()
+    retry_policy._breakers.clear()
+    yield
+    rate_limiter._limiters.clear()
+    retry_policy._breakers.clear()
@@ -0,0 +1,97 @@
+import asyncio
+from unittest.mock import AsyncMock, patch
+
+import pytest
+
+pytest.importorskip("aiohttp")
+
+from src.async_notion_client import AsyncNotionClient  # noqa: E402
+
+
+class FakeResponse:
+    def __init__(self, status=200, data=None, headers=None):
+        self.status = status
+        self.headers = headers or {}
+        self.content_length = None
+        self._data = data or {}
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc_info):
+        return False
+
+    def raise_for_status(self):
+        pass
+
+    async def json(self, content_type=None):
+        return self._data
+
+
+class FakeSession:
+    closed = False
+
+    def __init__(self, responses):
+        self.responses = list(responses)
+        self.calls = []
+
+    def request(self, method, url, params=None, json=None, timeout=None):
+        self.calls.append((method, url, params, json))
+        return self.responses.pop(0)
+
+    async def close(self):
+        self.closed = True
+
+
+@pytest.fixture
+def client():
+    with patch.dict("os.environ", {"NOTION_TOKEN": "fake_token", "PAGE_ID": "page-id"}):
+        yield AsyncNotionClient()
+
+
+def test_get_page_blocks(client):
+    session = FakeSession(
+        [
+            FakeResponse(data={"last_edited_time": "2024-01-01T10:00:00.000Z"}),
+            FakeResponse(
+                data={
+                    "results": [
+                        {
+                            "id": "block-1",
+                            "type": "paragraph",
+                            "paragraph": {"rich_text": [{"plain_text": "Hello"}]},
+                        }
+                    ],
+                    "has_more": False,
+                }
+            ),
+        ]
+    )
+    client._session = session
+
+    blocks = asyncio.run(client.get_page_blocks("page-id"))
+
+    assert [b["content"] for b in blocks] == ["Hello"]
+    assert session.calls[1][1] == f"{client.BASE_URL}/blocks/page-id/children"
+
+
+def test_insert_block_after(client):
+    session = FakeSession([FakeResponse()])
+    client._session = session
+
+    assert asyncio.run(client.insert_block_after("block-1", "Inserted")) is True
+    method, url, _, payload = session.calls[0]
+    assert method == "PATCH"
+    assert url == f"{client.BASE_URL}/blocks/page-id/children"
+    assert payload["after"] == "block-1"
+
+
+def test_rate_limit_retry_does_not_block(client):
+    session = FakeSession([FakeResponse(429, headers={"Retry-After": "0"}), FakeResponse()])
+    client._session = session
+
+    with patch("src.async_notion_client.asyncio.sleep", new=AsyncMock()) as mock_sleep:
+        assert asyncio.run(client.delete_block("block-1")) is True
+
+    mock_sleep.assert_awaited_once_with(1)
+    assert len(session.calls) == 2
@@ -0,0 +1,160 @@
+import io
+import json
+import threading
+import time
+from unittest.mock import Mock, patch
+
+import pytest
+
+from src.agent import main
+from src.batch import read_commands, run_batch
+from src.notion_client import BLOCK_UPDATED
+
+
+def _blocks(page_id, **kwargs):
+    if page_id == "p1":
+        # Slow first read, so the reader thread has seen the next command
+        time.sleep(0.05)
+    return [{"id": f"{page_id}-b1", "type": "paragraph", "content": f"Intro of {page_id}"}]
+
+
+@pytest.fixture
+def notion():
+    client = Mock()
+    client.get_page_blocks.side_effect = _blocks
+    listeners = []
+    client.subscribe.side_effect = listeners.append
+
+    def _update(block_id, text, block_type=None):
+        for listener in listeners:
+            listener(
+                BLOCK_UPDATED, {"block": {"id": block_id, "type": "paragraph", "content": text}}
+            )
+        return True
+
+    client.update_block.side_effect = _update
+    return client
+
+
+@pytest.fixture
+def agent():
+    agent = Mock()
+    agent.analyze_and_act.return_value = [
+        {"action": "UPDATE", "target_block_index": 0, "text": "Rewritten"}
+    ]
+    return agent
+
+
+def test_read_commands_parses_plain_and_json_lines():
+    lines = [
+        "# comment",
+        "Fix the intro",
+        "",
+        '{"id": 7, "command": "Add a summary", "page_id": "p2"}',
+        "{not json",
+        '{"page_id": "p3"}',
+    ]
+
+    entries = list(read_commands(lines, "p1"))
+
+    assert entries[0] == {"line": 2, "page_id": "p1", "command": "Fix the intro"}
+    assert entries[1] == {"line": 4, "page_id": "p2", "command": "Add a summary", "id": 7}
+    assert entries[2]["error"].startswith("invalid JSON")
+    assert entries[3]["error"] == "missing 'command'"
+
+
+def test_read_commands_requires_a_page():
+    entries = list(read_commands(["Fix the intro"], ""))
+
+    assert entries[0]["error"] == "no 'page_id' given and PAGE_ID is not set"
+
+
+def test_same_page_commands_reuse_the_page_model(notion, agent):
+    out = io.StringIO()
+
+    summary = run_batch(notion, agent, ["First edit", "Second edit"], out, "p1")
+
+    assert summary["commands"] == 2 and summary["failed"] == 0
+    # The second command sees the first one's write without another read
+    notion.get_page_blocks.assert_called_once_with("p1")
+    second_blocks = agent.analyze_and_act.call_args_list[1].args[1]
+    assert second_blocks[0]["content"] == "Rewritten"
+
+
+def test_each_command_schedules_a_reconcile(notion, agent):
+    with patch("src.batch.PageModel.reconcile_in_background") as reconcile:
+        run_batch(notion, agent, ["First edit", "Second edit"], io.StringIO(), "p1")
+
+    assert reconcile.call_count == 2
+
+
+def test_next_page_is_prefetched_while_reasoning(notion, agent):
+    p2_fetched = threading.Event()
+    fetched_while_reasoning = []
+
+    def _fetch(page_id, **kwargs):
+        if page_id == "p2":
+            p2_fetched.set()
+        return _blocks(page_id)
+
+    def _plan(query, blocks):
+        if blocks[0]["id"] == "p1-b1":
+            fetched_while_reasoning.append(p2_fetched.wait(timeout=2))
+        return []
+
+    notion.get_page_blocks.side_effect = _fetch
+    agent.analyze_and_act.side_effect = _plan
+    lines = ["Edit p1", '{"command": "Edit p2", "page_id": "p2"}']
+
+    run_batch(notion, agent, lines, io.StringIO(), "p1")
+
+    assert fetched_while_reasoning == [True]
+    assert notion.get_page_blocks.call_count == 2
+
+
+def test_results_are_written_as_json_lines(notion, agent):
+    agent.analyze_and_act.side_effect = [RuntimeError("model unavailable"), []]
+    out = io.StringIO()
+
+    summary = run_batch(
+        notion, agent, ['{"id": "a", "command": "Edit"}', "{bad", "Chat"], out, "p1"
+    )
+
+    results = [json.loads(line) for line in out.getvalue().splitlines()]
+    assert [r["ok"] for r in results] == [False, False, True]
+    assert results[0]["id"] == "a" and results[0]["error"] == "model unavailable"
+    assert results[1]["line"] == 2
+    assert set(results[2]["timings"]) == {"fetch_wait", "reason", "execute"}
+    assert summary["failed"] == 2
+
+
+def test_main_batch_mode(tmp_path, capsys):
+    commands = tmp_path / "commands.txt"
+    commands.write_text("Fix the text\n", encoding="utf-8")
+    output = tmp_path / "results.jsonl"
+
+    with (
+        patch("src.agent.NotionClient") as mock_notion_cls,
+        patch("src.agent.GeminiAgent") as mock_gemini_cls,
+        patch("sys.argv", ["notion_sidecar", "--batch", str(commands), "--output", str(output)]),
+        patch.dict(
+            "os.environ", {"NOTION_TOKEN": "fake", "PAGE_ID": "p1", "GEMINI_API_KEY": "fake"}
+        ),
+    ):
+        mock_notion_cls.return_value.get_page_blocks.return_value = [
+            {"id": "b1", "type": "paragraph", "content": "Original text"}
+        ]
+        mock_notion_cls.return_value.update_block.return_value = True
+        mock_gemini_cls.return_value.analyze_and_act.return_value = {
+            "action": "UPDATE",
+            "target_block_index": 0,
+            "text": "Updated text",
+        }
+        main()
+
+    result = json.loads(output.read_text(encoding="utf-8"))
+    assert result["ok"] and result["page_id"] == "p1"
+    mock_notion_cls.return_value.update_block.assert_called_once_with(
+        "b1", "Updated text", block_type="paragraph"
+    )
+    assert "1 commands, 0 failed" in capsys.readouterr().err
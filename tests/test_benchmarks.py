@@ -0,0 +1,77 @@
+import pytest
+
+from benchmarks.fake_notion import FakeNotion
+from benchmarks.stub_model import StubModel
+from benchmarks.suite import METRICS, compare
+from src.notion_client import NotionClient
+
+
+@pytest.fixture
+def server(monkeypatch):
+    with FakeNotion(page_size=10) as fake:
+        monkeypatch.setenv("NOTION_BASE_URL", fake.base_url)
+        monkeypatch.setenv("NOTION_TOKEN", "bench-token")
+        monkeypatch.setenv("PAGE_ID", "page-1")
+        monkeypatch.setenv("NOTION_BACKOFF_BASE", "0")
+        yield fake
+
+
+def test_client_reads_paginated_nested_page_over_http(server):
+    server.add_page("page-1", blocks=25, nested_every=5, nested_children=2)
+
+    blocks = NotionClient().get_page_blocks("page-1", deep=True)
+
+    assert len(blocks) == 25 + 5 * 2
+    assert blocks[5]["depth"] == 1 and blocks[5]["parent_id"] == blocks[4]["id"]
+    # 1 page read, 3 pages of top-level children, 1 listing per toggle
+    assert server.stats["requests"] == 1 + 3 + 5
+
+
+def test_iter_page_blocks_matches_deep_read(server):
+    server.add_page("page-1", blocks=25, nested_every=5, nested_children=2)
+    notion = NotionClient()
+
+    streamed = [block.to_dict() for block in notion.iter_page_blocks("page-1", deep=True)]
+
+    assert streamed == NotionClient().get_page_blocks("page-1", deep=True)
+
+
+def test_client_retries_injected_server_errors(server):
+    server.add_page("page-1", blocks=25)
+    server.error_rate = 0.5
+
+    notion = NotionClient()
+    blocks = notion.get_page_blocks("page-1")
+
+    assert len(blocks) == 25
+    assert notion.request_stats["retries"] == server.stats["errors"] > 0
+
+
+def test_writes_round_trip_through_fake_server(server):
+    server.add_page("page-1", blocks=2)
+    notion = NotionClient()
+    first, second = notion.get_page_blocks("page-1")
+
+    assert notion.update_block(first["id"], "Changed")
+    assert notion.insert_blocks_after(first["id"], [("New", "paragraph")], parent_id="page-1")
+    assert notion.delete_block(second["id"])
+
+    contents = [b["content"] for b in notion.get_page_blocks("page-1", force_refresh=True)]
+    assert contents == ["Changed", "New"]
+
+
+def test_stub_model_targets_blocks_from_prompt():
+    plan = StubModel().plan("[BLOCK_0] (ID: a) ...\n[BLOCK_1] (ID: b) ...")
+
+    assert plan["actions"][0]["action"] == "UPDATE"
+    assert plan["actions"][0]["target_block_index"] in (0, 1)
+    assert plan["actions"][-1]["action"] == "APPEND"
+
+
+def test_compare_flags_regressions_in_either_direction(capsys):
+    results = {"fetch.blocks_per_second": 400.0, "command.p50_ms": 10.0}
+    baseline = {"fetch.blocks_per_second": 1000.0, "command.p50_ms": 10.0}
+
+    assert compare(results, baseline, tolerance=None) == ["fetch.blocks_per_second"]
+    assert METRICS["command.p50_ms"].regressed(16.0, 10.0)
+    assert "REGRESSED" in capsys.readouterr().out
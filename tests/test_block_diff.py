@@ -0,0 +1,133 @@
+from unittest.mock import Mock
+
+from src.agent import execute_actions
+from src.block_diff import DELETE, INSERT, KEEP, UPDATE, diff_blocks
+from src.metrics import metrics
+
+
+def _blocks(*texts):
+    return [{"id": f"b{i}", "type": "paragraph", "content": t} for i, t in enumerate(texts)]
+
+
+def _ops(edits):
+    return [(e.op, e.old_index) for e in edits]
+
+
+def test_diff_keeps_unchanged_blocks_and_updates_in_place():
+    old = _blocks("Intro", "Old middle", "Outro")
+    new = [("Intro", "paragraph"), ("New middle", "paragraph"), ("Outro ", "paragraph")]
+
+    assert _ops(diff_blocks(old, new)) == [(KEEP, 0), (UPDATE, 1), (KEEP, 2)]
+
+
+def test_diff_inserts_after_last_kept_block_and_deletes_surplus():
+    old = _blocks("A", "B", "C", "D")
+    new = [("A", "paragraph"), ("New", "paragraph"), ("B", "paragraph"), ("D", "paragraph")]
+
+    assert _ops(diff_blocks(old, new)) == [
+        (KEEP, 0),
+        (INSERT, 0),
+        (KEEP, 1),
+        (DELETE, 2),
+        (KEEP, 3),
+    ]
+
+
+def test_diff_type_change_is_an_insert_and_delete():
+    edits = diff_blocks(_blocks("Title", "Body"), [("Title", "heading_2"), ("Body", "paragraph")])
+
+    assert _ops(edits) == [(INSERT, 0), (DELETE, 0), (KEEP, 1)]
+    assert edits[0].block_type == "heading_2" and edits[0].text == "Title"
+
+
+def test_diff_without_anchor_folds_leading_insert_into_updates():
+    old = _blocks("B", "C")
+    new = [("A", "paragraph"), ("B", "paragraph"), ("C", "paragraph")]
+
+    assert _ops(diff_blocks(old, new)) == [(INSERT, None), (KEEP, 0), (KEEP, 1)]
+    assert _ops(diff_blocks(old, new, anchored=False)) == [
+        (UPDATE, 0),
+        (UPDATE, 1),
+        (INSERT, 1),
+    ]
+
+
+def test_rewrite_of_long_section_only_writes_changed_blocks():
+    blocks = _blocks(*[f"Paragraph {i}" for i in range(32)])
+    section = [(b["content"], "paragraph") for b in blocks[1:31]]
+    section[4] = ("Paragraph 5, tightened", "paragraph")
+    section[20:20] = [("Added one", "paragraph"), ("Added two", "paragraph")]
+    del section[-1]
+    notion = Mock()
+    notion.update_block.return_value = True
+    notion.insert_blocks_after.return_value = [True, True]
+    notion.delete_block.return_value = True
+
+    plan = {
+        "action": "REWRITE",
+        "target_block_index": 1,
+        "end_block_index": 30,
+        "blocks": [{"text": t, "block_type": b} for t, b in section],
+    }
+    outcomes = execute_actions(notion, plan, blocks, "page-1")
+
+    assert outcomes[0]["success"], outcomes
+    assert "1 updated, 2 inserted, 1 deleted, 28 unchanged" in outcomes[0]["message"]
+    notion.update_block.assert_called_once_with(
+        "b5", "Paragraph 5, tightened", block_type="paragraph"
+    )
+    notion.insert_blocks_after.assert_called_once_with(
+        "b20", [("Added one", "paragraph"), ("Added two", "paragraph")], parent_id="page-1"
+    )
+    notion.delete_block.assert_called_once_with("b30")
+
+
+def test_rewrite_rejects_ranges_spanning_nesting_levels():
+    blocks = _blocks("Toggle", "Child", "After")
+    blocks[1].update(depth=1, parent_id="b0")
+    notion = Mock()
+
+    plan = {"action": "REWRITE", "target_block_index": 0, "end_block_index": 2, "text": "X"}
+    outcomes = execute_actions(notion, plan, blocks, "page-1")
+
+    assert not outcomes[0]["success"]
+    assert "nested" in outcomes[0]["message"]
+    notion.update_block.assert_not_called()
+
+
+def test_rewrite_without_blocks_or_text_is_rejected():
+    blocks = _blocks("Intro", "Body", "Outro")
+    notion = Mock()
+
+    for plan in (
+        {"action": "REWRITE", "target_block_index": 0, "end_block_index": 2},
+        {"action": "REWRITE", "target_block_index": 0, "end_block_index": 2, "blocks": []},
+        {"action": "REWRITE", "target_block_index": 1, "text": "  "},
+    ):
+        outcomes = execute_actions(notion, plan, blocks, "page-1")
+        assert not outcomes[0]["success"]
+        assert "DELETE" in outcomes[0]["message"]
+    notion.delete_block.assert_not_called()
+    notion.delete_blocks.assert_not_called()
+
+
+def test_rewrite_counts_unchanged_blocks_from_the_diff():
+    blocks = _blocks("Intro", "Body", "Outro")
+    notion = Mock()
+    notion.update_block.return_value = True
+    metrics.reset()
+
+    plan = {"action": "REWRITE", "target_block_index": 1, "text": "Body, tightened"}
+    outcomes = execute_actions(notion, plan, blocks, "page-1")
+    assert "1 updated, 0 inserted, 0 deleted, 0 unchanged" in outcomes[0]["message"]
+    assert metrics.counters().get("rewrite_unchanged_blocks", 0) == 0
+
+    plan = {
+        "action": "REWRITE",
+        "target_block_index": 0,
+        "end_block_index": 2,
+        "text": "Intro\n\nBody, tightened\n\nOutro",
+    }
+    execute_actions(notion, plan, blocks, "page-1")
+    assert metrics.counters()["rewrite_unchanged_blocks"] == 2
+    assert metrics.counters()["rewrite_writes"] == 2
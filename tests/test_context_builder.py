@@ -0,0 +1,75 @@
+from unittest.mock import Mock, patch
+
+from src.context_builder import ContextBuilder
+
+
+def _blocks(count, words=40):
+    return [
+        {"id": f"b{i}", "type": "paragraph", "content": f"Paragraph {i} " + "lorem " * words}
+        for i in range(count)
+    ]
+
+
+def test_full_context_within_budget():
+    builder = ContextBuilder(token_budget=10_000, window=1)
+    context = builder.build(_blocks(3, words=2))
+
+    assert "[BLOCK_0] (ID: b0, Type: paragraph)\nContent: Paragraph 0" in context
+    assert "outline" not in context
+
+
+def test_build_accepts_a_stream_of_blocks():
+    blocks = _blocks(4, words=2)
+    blocks[2] = dict(blocks[2], depth=1, parent_id="b1")
+
+    streamed = ContextBuilder(token_budget=10_000).build(iter(blocks))
+
+    assert streamed == ContextBuilder(token_budget=10_000).build(blocks)
+    assert "Depth: 1, Parent: BLOCK_1" in streamed
+
+
+def test_render_cache_reuses_unchanged_blocks():
+    builder = ContextBuilder(token_budget=0, window=1)
+    blocks = _blocks(3, words=2)
+    builder.build(blocks)
+
+    blocks[1] = dict(blocks[1], content="Edited")
+    with patch("src.context_builder.estimate_tokens", wraps=len) as mock_estimate:
+        builder.build(blocks)
+
+    # Only the edited block's body is re-rendered (plus one estimate per header)
+    assert mock_estimate.call_count == len(blocks) + 1
+
+
+def test_outline_mode_keeps_referenced_region_verbatim():
+    builder = ContextBuilder(token_budget=2000, window=1)
+    blocks = _blocks(50)
+
+    context = builder.build(blocks, query="Rewrite block 20")
+
+    assert context.startswith("NOTE:")
+    assert "[BLOCK_20] (ID: b20, Type: paragraph)" in context
+    assert "[BLOCK_19] (ID: b19, Type: paragraph)" in context
+    assert "[BLOCK_21] (ID: b21, Type: paragraph)" in context
+    assert "[BLOCK_40] (outline, Type: paragraph)" in context
+
+
+def test_outline_mode_matches_keywords():
+    builder = ContextBuilder(token_budget=2000, window=0)
+    blocks = _blocks(50)
+    blocks[33]["content"] = "Our pricing strategy changed this year " + "lorem " * 40
+
+    context = builder.build(blocks, query="Tighten the pricing discussion")
+
+    assert "[BLOCK_33] (ID: b33, Type: paragraph)" in context
+
+
+def test_retrieval_ranks_after_referenced_blocks_and_hints():
+    retriever = Mock()
+    retriever.search.return_value = [7, 30]
+    builder = ContextBuilder(token_budget=1450, window=0, retriever=retriever)
+
+    context = builder.build(_blocks(50), query="Rewrite block 20 and tighten the conclusion")
+
+    full = [line.split("]")[0] for line in context.splitlines() if "(ID:" in line]
+    assert full == ["[BLOCK_7", "[BLOCK_20", "[BLOCK_49"]
@@ -0,0 +1,80 @@
+from unittest.mock import patch
+
+from src.decision_cache import DecisionCache
+
+EDIT_PLAN = [{"action": "UPDATE", "target_block_index": 0, "text": "Fixed"}]
+CHAT_PLAN = [{"action": "CHAT", "text": "It is about gardening."}]
+
+
+def _cache(**kwargs):
+    options = {"max_entries": 2, "path": "", "chat_ttl": 60, "edit_ttl": 60}
+    options.update(kwargs)
+    return DecisionCache(**options)
+
+
+def test_key_normalizes_query():
+    assert DecisionCache.make_key("m", "Fix typos.", "ctx") == DecisionCache.make_key(
+        "m", "  fix   TYPOS", "ctx"
+    )
+    assert DecisionCache.make_key("m", "fix typos", "ctx") != DecisionCache.make_key(
+        "m", "fix typos", "other ctx"
+    )
+
+
+def test_hit_and_miss_counts():
+    cache = _cache()
+    assert cache.get("k") is None
+    cache.put("k", EDIT_PLAN)
+
+    assert cache.get("k") == EDIT_PLAN
+    assert cache.stats["hits"] == 1
+    assert cache.stats["edit_hits"] == 1
+    assert cache.stats["misses"] == 1
+
+
+def test_lru_eviction():
+    cache = _cache()
+    cache.put("a", EDIT_PLAN)
+    cache.put("b", EDIT_PLAN)
+    cache.get("a")
+    cache.put("c", EDIT_PLAN)
+
+    assert cache.get("b") is None
+    assert cache.get("a") is not None
+
+
+def test_kinds_are_cached_separately():
+    cache = _cache(edit_ttl=0)
+    cache.put("edit", EDIT_PLAN)
+    cache.put("chat", CHAT_PLAN)
+
+    assert cache.get("edit") is None
+    assert cache.get("chat") == CHAT_PLAN
+
+
+def test_ttl_expiry():
+    cache = _cache()
+    with patch("src.decision_cache.time.time", return_value=1000.0):
+        cache.put("k", CHAT_PLAN)
+    with patch("src.decision_cache.time.time", return_value=1061.0):
+        assert cache.get("k") is None
+
+
+def test_persistent_store(tmp_path):
+    path = str(tmp_path / "decisions.sqlite")
+    _cache(path=path).put("k", EDIT_PLAN)
+
+    reopened = _cache(path=path)
+    assert reopened.get("k") == EDIT_PLAN
+    assert reopened.stats["disk_hits"] == 1
+
+
+def test_persistent_store_size_eviction(tmp_path):
+    path = str(tmp_path / "decisions.sqlite")
+    cache = _cache(path=path, max_disk_entries=2)
+    for key in ("a", "b", "c"):
+        cache.put(key, EDIT_PLAN)
+
+    reopened = _cache(path=path)
+    assert reopened.get("a") is None
+    assert reopened.get("c") == EDIT_PLAN
@@ -0,0 +1,59 @@
+from unittest.mock import Mock, patch
+
+import pytest
+
+from benchmarks.fake_notion import FakeNotion
+from benchmarks.stub_model import StubModel
+from src.diagnostics import Diagnostics, ModelBenchmark
+
+
+@pytest.fixture
+def env(monkeypatch):
+    monkeypatch.setenv("GEMINI_API_KEY", "fake")
+    monkeypatch.delenv("PAGE_ID", raising=False)
+
+
+def _model(name, **kwargs):
+    if name == "broken":
+        model = Mock()
+        model.generate_content.side_effect = RuntimeError("quota")
+        return model
+    return StubModel(think_time=0.001 if name == "fast" else 0.02)
+
+
+def test_benchmark_ranks_models_by_errors_then_latency(env, capsys):
+    with patch("src.gemini_agent.genai") as genai:
+        genai.GenerativeModel.side_effect = _model
+        results = Diagnostics().run_benchmark(4, 2, ["slow", "broken", "fast"])
+
+    # Benchmarked with the same JSON mode and schema as the agent's requests
+    generation_config = genai.GenerativeModel.call_args.kwargs["generation_config"]
+    assert generation_config["response_mime_type"] == "application/json"
+    assert "response_schema" in generation_config
+    assert [r.model for r in results] == ["fast", "slow", "broken"]
+    assert results[0].requests == 4 and results[0].tokens_per_second > 0
+    assert results[2].error_rate == 1.0
+    assert "GEMINI_MODEL=fast" in capsys.readouterr().out
+
+
+def test_benchmark_times_notion_read_and_write_round_trip(env, monkeypatch, capsys):
+    with FakeNotion(page_size=5) as server:
+        server.add_page("page-1", blocks=12)
+        monkeypatch.setenv("NOTION_BASE_URL", server.base_url)
+        monkeypatch.setenv("NOTION_TOKEN", "fake")
+        monkeypatch.setenv("PAGE_ID", "page-1")
+        monkeypatch.setenv("NOTION_BACKOFF_BASE", "0")
+
+        blocks = Diagnostics()._bench_notion()
+
+        assert len(blocks) == 12
+        assert len(server.page_blocks("page-1")) == 12  # probe block removed again
+    out = capsys.readouterr().out
+    assert "(3 listing requests)" in out and "Write round trip" in out
+
+
+def test_model_benchmark_percentiles():
+    result = ModelBenchmark("m", latencies=[0.1, 0.2, 0.3, 0.4], output_tokens=10)
+
+    assert result.p(0.5) == 0.3 and result.p(0.95) == 0.4
+    assert result.tokens_per_second == pytest.approx(10)
@@ -112,4 +112,157 @@ def test_e2e_insert_flow(mock_clients):
         except SystemExit:
             pass
 
-    mock_notion.insert_block_after.assert_called_with("b1", "New block", block_type="heading_1")
+    mock_notion.insert_block_after.assert_called_with(
+        "b1", "New block", block_type="heading_1", parent_id="fake"
+    )
+
+
+def test_e2e_refresh_forces_reload(mock_clients):
+    mock_notion, mock_gemini = mock_clients
+
+    mock_notion.get_page_blocks.return_value = []
+
+    with (
+        patch("builtins.input", side_effect=["refresh", "exit"]),
+        patch("sys.argv", ["notion_sidecar"]),
+        patch.dict(
+            "os.environ", {"NOTION_TOKEN": "fake", "PAGE_ID": "fake", "GEMINI_API_KEY": "fake"}
+        ),
+    ):
+        try:
+            main()
+        except SystemExit:
+            pass
+
+    mock_notion.get_page_blocks.assert_called_once_with("fake", force_refresh=True)
+    mock_gemini.analyze_and_act.assert_not_called()
+
+
+def test_e2e_multi_action_plan_batches_writes(mock_clients):
+    mock_notion, mock_gemini = mock_clients
+
+    mock_notion.get_page_blocks.return_value = [
+        {"id": f"b{i}", "type": "paragraph", "content": f"Para {i}"} for i in range(4)
+    ]
+
+    mock_gemini.analyze_and_act.return_value = [
+        {
+            "action": "UPDATE",
+            "target_block_index": 1,
+            "text": "Bullet",
+            "block_type": "bulleted_list_item",
+        },
+        {"action": "DELETE", "target_block_index": 2},
+        {"action": "DELETE", "target_block_index": 3},
+        {"action": "APPEND", "text": "Conclusion", "block_type": "heading_2"},
+        {"action": "APPEND", "text": "Final words"},
+    ]
+
+    mock_notion.update_block.return_value = True
+    mock_notion.delete_blocks.return_value = [True, True]
+    mock_notion.append_blocks.return_value = [True, False]
+
+    with (
+        patch("builtins.input", side_effect=["Bullet it and conclude", "exit"]),
+        patch("sys.argv", ["notion_sidecar"]),
+        patch.dict(
+            "os.environ", {"NOTION_TOKEN": "fake", "PAGE_ID": "fake", "GEMINI_API_KEY": "fake"}
+        ),
+    ):
+        try:
+            main()
+        except SystemExit:
+            pass
+
+    mock_gemini.analyze_and_act.assert_called_once()
+    mock_notion.update_block.assert_called_with("b1", "Bullet", block_type="bulleted_list_item")
+    mock_notion.delete_blocks.assert_called_once_with(["b2", "b3"])
+    mock_notion.append_blocks.assert_called_once_with(
+        "fake", [("Conclusion", "heading_2"), ("Final words", "paragraph")]
+    )
+
+
+def test_e2e_streaming_skips_target_changed_on_server(mock_clients):
+    mock_notion, mock_gemini = mock_clients
+
+    mock_notion.get_page_blocks.return_value = [
+        {"id": "b1", "type": "paragraph", "content": "Original text"}
+    ]
+    mock_notion.get_block.return_value = {
+        "id": "b1",
+        "type": "paragraph",
+        "content": "Edited by someone else",
+        "archived": False,
+    }
+
+    def _plan(query, blocks, on_action=None):
+        on_action({"position": 0, "action": "UPDATE", "target_block_index": 0})
+        return [{"action": "UPDATE", "target_block_index": 0, "text": "Updated text"}]
+
+    mock_gemini.analyze_and_act.side_effect = _plan
+
+    with (
+        patch("builtins.input", side_effect=["Fix the text", "exit"]),
+        patch("sys.argv", ["notion_sidecar"]),
+        patch.dict(
+            "os.environ",
+            {
+                "NOTION_TOKEN": "fake",
+                "PAGE_ID": "fake",
+                "GEMINI_API_KEY": "fake",
+                "GEMINI_STREAM": "true",
+            },
+        ),
+    ):
+        try:
+            main()
+        except SystemExit:
+            pass
+
+    mock_notion.get_block.assert_called_once_with("b1")
+    mock_notion.update_block.assert_not_called()
+
+
+def test_e2e_second_command_uses_page_model(mock_clients):
+    mock_notion, mock_gemini = mock_clients
+
+    listeners = []
+    mock_notion.subscribe.side_effect = listeners.append
+    mock_notion.get_page_blocks.return_value = [
+        {"id": "b1", "type": "paragraph", "content": "Original text"}
+    ]
+
+    def _update(block_id, text, block_type="paragraph"):
+        for listener in listeners:
+            listener("updated", {"block": {"id": block_id, "type": block_type, "content": text}})
+        return True
+
+    mock_notion.update_block.side_effect = _update
+    plans = [
+        [{"action": "UPDATE", "target_block_index": 0, "text": "Updated text"}],
+        [{"action": "CHAT", "text": "Done"}],
+    ]
+    mock_gemini.analyze_and_act.side_effect = lambda query, blocks: plans.pop(0)
+
+    with (
+        patch("builtins.input", side_effect=["Fix the text", "What changed?", "exit"]),
+        patch("sys.argv", ["notion_sidecar"]),
+        patch.dict(
+            "os.environ",
+            {
+                "NOTION_TOKEN": "fake",
+                "PAGE_ID": "fake",
+                "GEMINI_API_KEY": "fake",
+                "PAGE_RECONCILE_DELAY": "60",
+            },
+        ),
+    ):
+        try:
+            main()
+        except SystemExit:
+            pass
+
+    # Our own write is reflected without reading the page again
+    mock_notion.get_page_blocks.assert_called_once_with("fake")
+    second_blocks = mock_gemini.analyze_and_act.call_args_list[1].args[1]
+    assert second_blocks[0]["content"] == "Updated text"
@@ -0,0 +1,99 @@
+from unittest.mock import Mock, patch
+
+import pytest
+
+from src.agent import main
+from src.fanout import FanOut, PageResult, report_fanout, resolve_pages
+
+
+def _blocks(page_id):
+    return [{"id": f"{page_id}-b1", "type": "paragraph", "content": f"Intro of {page_id}"}]
+
+
+@pytest.fixture
+def notion():
+    client = Mock()
+    client.get_page_blocks.side_effect = _blocks
+    client.update_block.return_value = True
+    return client
+
+
+def test_resolve_pages_merges_database_results(notion):
+    notion.query_database.return_value = ["p2", "p3"]
+    status_filter = {"property": "Status", "status": {"equals": "Published"}}
+
+    page_ids = resolve_pages(notion, ["p1", "p2"], "db-1", status_filter, limit=10)
+
+    assert page_ids == ["p1", "p2", "p3"]
+    notion.query_database.assert_called_once_with("db-1", filter=status_filter, limit=10)
+
+
+def test_fanout_runs_pipeline_per_page(notion):
+    agents = []
+
+    def _factory():
+        agent = Mock()
+        agent.analyze_and_act.return_value = [
+            {"action": "UPDATE", "target_block_index": 0, "text": "Rewritten"}
+        ]
+        agents.append(agent)
+        return agent
+
+    seen = []
+    results = FanOut(notion, _factory, workers=2).run(
+        "Rewrite the intro", ["p1", "p2", "p3"], on_result=seen.append
+    )
+
+    assert [r.page_id for r in results] == ["p1", "p2", "p3"]
+    assert all(r.ok and r.applied == 1 for r in results)
+    assert len(seen) == 3
+    # One agent per worker thread, never one per page
+    assert 1 <= len(agents) <= 2
+    updated = sorted(call.args[0] for call in notion.update_block.call_args_list)
+    assert updated == ["p1-b1", "p2-b1", "p3-b1"]
+
+
+def test_fanout_isolates_failures(notion):
+    def _plan(query, blocks):
+        if blocks[0]["id"].startswith("p2"):
+            raise RuntimeError("model unavailable")
+        return [{"action": "DELETE", "target_block_index": 0}]
+
+    notion.delete_block.return_value = False
+    agent = Mock()
+    agent.analyze_and_act.side_effect = _plan
+
+    results = FanOut(notion, lambda: agent, workers=3).run("Delete intro", ["p1", "p2"])
+
+    assert results[0].error is None and not results[0].ok
+    assert results[1].error == "model unavailable"
+
+
+def test_report_lists_failed_pages(capsys):
+    ok = PageResult("p1", seconds=1.0, outcomes=[{"action": "UPDATE", "success": True}])
+    bad = PageResult("p2", seconds=3.0, error="boom")
+
+    report_fanout([ok, bad], elapsed=2.0)
+
+    out = capsys.readouterr().out
+    assert "2 pages in 2.0s (60.0 pages/min), 1/1 actions applied" in out
+    assert "p2: boom" in out
+
+
+def test_main_fanout_mode():
+    with (
+        patch("src.agent.NotionClient") as mock_notion_cls,
+        patch("src.agent.GeminiAgent") as mock_gemini_cls,
+        patch("sys.argv", ["notion_sidecar", "--pages", "p1", "p2", "--instruction", "Fix"]),
+        patch.dict("os.environ", {"NOTION_TOKEN": "fake", "GEMINI_API_KEY": "fake"}),
+    ):
+        mock_notion = mock_notion_cls.return_value
+        mock_notion.get_page_blocks.side_effect = _blocks
+        mock_notion.update_block.return_value = True
+        mock_gemini_cls.return_value.analyze_and_act.return_value = [
+            {"action": "UPDATE", "target_block_index": 0, "text": "Fixed"}
+        ]
+
+        main()
+
+    assert mock_notion.update_block.call_count == 2
@@ -27,7 +27,7 @@ def test_analyze_and_act_update(agent, mock_genai_model):
     mock_genai_model.generate_content.return_value = mock_response
 
     blocks = [{"id": "b1", "type": "paragraph", "content": "Old content"}]
-    decision = agent.analyze_and_act("Update the first block", blocks)
+    decision = agent.analyze_and_act("Update the first block", blocks)[0]
 
     assert decision["action"] == "UPDATE"
     assert decision["target_block_index"] == 0
@@ -40,7 +40,7 @@ def test_analyze_and_act_json_cleanup(agent, mock_genai_model):
     mock_response.text = '```json\n{"action": "CHAT", "text": "Hello"}\n```'
     mock_genai_model.generate_content.return_value = mock_response
 
-    decision = agent.analyze_and_act("Hi", [])
+    decision = agent.analyze_and_act("Hi", [])[0]
 
     assert decision["action"] == "CHAT"
     assert decision["text"] == "Hello"
@@ -50,12 +50,27 @@ def test_analyze_and_act_error_handling(agent, mock_genai_model):
     # Mock Error
     mock_genai_model.generate_content.side_effect = Exception("API Error")
 
-    decision = agent.analyze_and_act("Hi", [])
+    decision = agent.analyze_and_act("Hi", [])[0]
 
     assert decision["action"] == "CHAT"
     assert "error" in decision["text"].lower()
 
 
+def test_analyze_and_act_multi_action_plan(agent, mock_genai_model):
+    mock_response = Mock()
+    mock_response.text = (
+        '{"actions": ['
+        '{"action": "UPDATE", "target_block_index": 0, "text": "A"},'
+        '{"action": "APPEND", "text": "Conclusion"}'
+        "]}"
+    )
+    mock_genai_model.generate_content.return_value = mock_response
+
+    plan = agent.analyze_and_act("Bullet it and conclude", [])
+
+    assert [a["action"] for a in plan] == ["UPDATE", "APPEND"]
+
+
 def test_build_context(agent):
     blocks = [
         {"id": "b1", "type": "paragraph", "content": "First para"},
@@ -68,3 +83,83 @@ def test_build_context(agent):
     assert "[BLOCK_1]" in context
     assert "Title" in context
     assert "heading_1" in context
+
+
+def test_build_context_nested_blocks(agent):
+    blocks = [
+        {"id": "t1", "type": "toggle", "content": "Toggle", "depth": 0, "parent_id": "page"},
+        {"id": "c1", "type": "paragraph", "content": "Inside", "depth": 1, "parent_id": "t1"},
+    ]
+    context = agent._build_context(blocks)
+
+    assert "[BLOCK_1] (ID: c1, Type: paragraph, Depth: 1, Parent: BLOCK_0)" in context
+    assert "  Content: Inside" in context
+
+
+def test_analyze_and_act_memoizes_repeated_commands(agent, mock_genai_model):
+    mock_response = Mock()
+    mock_response.text = '{"action": "CHAT", "text": "A post about tomatoes."}'
+    mock_genai_model.generate_content.return_value = mock_response
+    blocks = [{"id": "b1", "type": "paragraph", "content": "Tomatoes"}]
+
+    first = agent.analyze_and_act("Summarize", blocks)
+    second = agent.analyze_and_act("summarize ", blocks)
+
+    assert first == second
+    mock_genai_model.generate_content.assert_called_once()
+    assert agent.decision_cache.stats["chat_hits"] == 1
+
+
+def test_analyze_and_act_streaming_reports_actions_early(agent, mock_genai_model):
+    pieces = ['{"actions": [{"action": "UPDATE", "target_block_index": 0,', ' "text": "New"}]}']
+    mock_genai_model.generate_content.return_value = [Mock(text=piece) for piece in pieces]
+    seen = []
+
+    with patch.dict("os.environ", {"GEMINI_STREAM": "true"}):
+        blocks = [{"id": "b1", "type": "paragraph", "content": "Old"}]
+        plan = agent.analyze_and_act("Rewrite", blocks, on_action=seen.append)
+
+    assert seen == [{"position": 0, "action": "UPDATE", "target_block_index": 0}]
+    assert plan[0]["text"] == "New"
+    assert mock_genai_model.generate_content.call_args.kwargs == {"stream": True}
+
+
+def test_near_miss_json_is_repaired_without_another_request(agent, mock_genai_model):
+    mock_response = Mock()
+    mock_response.text = '{"actions": [{"action": "CHAT", "text": "Done",},]}\nLet me know!'
+    mock_genai_model.generate_content.return_value = mock_response
+
+    plan = agent.analyze_and_act("Hi", [])
+
+    assert plan == [{"action": "CHAT", "text": "Done"}]
+    assert mock_genai_model.generate_content.call_count == 1
+
+
+def test_unparseable_response_gets_one_cheap_retry(agent, mock_genai_model):
+    broken, fixed = Mock(), Mock()
+    broken.text = "I would update block 0 to say hello"
+    fixed.text = '{"actions": [{"action": "UPDATE", "target_block_index": 0, "text": "hello"}]}'
+    mock_genai_model.generate_content.side_effect = [broken, fixed, broken, broken]
+    blocks = [{"id": "b1", "type": "paragraph", "content": "Old content"}]
+
+    with patch("src.gemini_agent.metrics") as mock_metrics:
+        plan = agent.analyze_and_act("Say hello", blocks)
+        retry_prompt = mock_genai_model.generate_content.call_args.args[0]
+        fallback = agent.analyze_and_act("Say hi", blocks)
+
+    assert plan[0]["text"] == "hello"
+    assert "Old content" not in retry_prompt and broken.text in retry_prompt
+    assert fallback[0].get("fallback") is True
+    mock_metrics.incr.assert_any_call("gemini_parse_failures")
+
+
+def test_models_are_asked_for_schema_constrained_json():
+    with (
+        patch.dict("os.environ", {"GEMINI_API_KEY": "fake_key"}),
+        patch("src.gemini_agent.genai") as mock_genai,
+    ):
+        GeminiAgent()
+
+    generation_config = mock_genai.GenerativeModel.call_args.kwargs["generation_config"]
+    assert generation_config["response_mime_type"] == "application/json"
+    assert "actions" in generation_config["response_schema"]["properties"]
@@ -0,0 +1,130 @@
+import json
+import threading
+from unittest.mock import patch
+
+import pytest
+
+from benchmarks.stub_model import StubModel, StubResponse
+from src.hedging import HedgedGenerator, hedge_models
+from src.metrics import metrics
+
+VALID = json.dumps({"actions": [{"action": "CHAT", "text": "hi"}]})
+
+
+class _Model:
+    def __init__(self, text=VALID, delay=0.0, error=None):
+        self.text = text
+        self.delay = delay
+        self.error = error
+        self.calls = 0
+        self._release = threading.Event()
+
+    def generate_content(self, prompt):
+        self.calls += 1
+        self._release.wait(self.delay)
+        if self.error:
+            raise self.error
+        return StubResponse(self.text)
+
+
+def _is_valid(text):
+    try:
+        return "actions" in json.loads(text)
+    except ValueError:
+        return False
+
+
+def test_fast_primary_is_not_hedged():
+    primary, backup = _Model(), _Model()
+    hedger = HedgedGenerator(_is_valid, initial_delay=1.0)
+
+    _, winner = hedger.generate("p", [("primary", primary), ("backup", backup)])
+
+    assert winner == "primary"
+    assert backup.calls == 0 and hedger.hedge_rate() == 0.0
+
+
+def test_slow_primary_is_hedged_and_backup_wins():
+    primary, backup = _Model(delay=5.0), _Model()
+    hedger = HedgedGenerator(_is_valid, initial_delay=0.01)
+
+    response, winner = hedger.generate("p", [("primary", primary), ("backup", backup)])
+    primary._release.set()
+
+    assert winner == "backup" and response.text == VALID
+    assert hedger.stats == {"requests": 1, "hedged": 1, "backup_wins": 1}
+
+
+def test_invalid_or_failed_primary_falls_over_immediately():
+    hedger = HedgedGenerator(_is_valid, initial_delay=5.0)
+
+    _, winner = hedger.generate("p", [("primary", _Model(text="oops")), ("backup", _Model())])
+    assert winner == "backup"
+
+    failing = _Model(error=RuntimeError("503"))
+    _, winner = hedger.generate("p", [("primary", failing), ("backup", _Model())])
+    assert winner == "backup"
+
+    with pytest.raises(RuntimeError):
+        hedger.generate("p", [("primary", failing), ("backup", failing)])
+
+
+def test_deadline_follows_primary_latency_percentile():
+    hedger = HedgedGenerator(_is_valid, percentile=0.5, initial_delay=3.0)
+    assert hedger.deadline() == 3.0
+
+    for _ in range(6):
+        hedger.generate("p", [("primary", _Model()), ("backup", _Model())])
+
+    assert hedger.deadline() < 1.0
+
+
+def test_hedge_models_parses_list_and_discovers_one_flash_model():
+    assert hedge_models("gemini-a", "gemini-b, gemini-a,models/gemini-c") == [
+        "gemini-b",
+        "gemini-c",
+    ]
+    with patch(
+        "src.diagnostics.generate_content_models",
+        return_value=["models/gemini-a", "models/gemini-pro", "models/x-flash", "models/y-flash"],
+    ):
+        assert hedge_models("gemini-a", "auto") == ["x-flash"]
+
+
+def _hedged_agent(monkeypatch):
+    monkeypatch.setenv("GEMINI_API_KEY", "fake")
+    monkeypatch.setenv("GEMINI_HEDGE_MODELS", "backup-model")
+    monkeypatch.setenv("GEMINI_HEDGE_DELAY", "0.01")
+    monkeypatch.setenv("DECISION_CACHE_PATH", "")
+    with patch("src.gemini_agent.genai"):
+        from src.gemini_agent import GeminiAgent
+
+        return GeminiAgent()
+
+
+def test_agent_uses_backup_model_answer(monkeypatch):
+    agent = _hedged_agent(monkeypatch)
+    slow = _Model(delay=5.0)
+    agent.model = slow
+    agent.backup_models = [("backup-model", StubModel())]
+
+    plan = agent.analyze_and_act(
+        "Tighten this", [{"id": "b0", "type": "paragraph", "content": "x"}]
+    )
+    slow._release.set()
+
+    assert plan[-1]["action"] == "APPEND"
+    assert agent.hedger.stats["backup_wins"] == 1
+
+
+def test_repaired_hedged_plan_is_counted_once(monkeypatch):
+    agent = _hedged_agent(monkeypatch)
+    agent.model = _Model(text='{"actions": [{"action": "CHAT", "text": "hi",}]}')
+    agent.backup_models = [("backup-model", _Model())]
+    agent.hedger.initial_delay = 5.0
+    metrics.reset()
+
+    plan = agent.analyze_and_act("Say hi", [{"id": "b0", "type": "paragraph", "content": "x"}])
+
+    assert plan == [{"action": "CHAT", "text": "hi"}]
+    assert metrics.counters()["gemini_json_repaired"] == 1
@@ -0,0 +1,56 @@
+import pytest
+
+from src.json_repair import repair_json
+
+
+def test_ignores_prose_and_fences_around_the_value():
+    text = 'Sure! Here is the plan:\n```json\n{"actions": [{"action": "CHAT"}]}\n```\nThanks {'
+
+    assert repair_json(text) == {"actions": [{"action": "CHAT"}]}
+
+
+def test_drops_trailing_commas():
+    assert repair_json('{"actions": [{"action": "DELETE", "target_block_index": 2,},]}') == {
+        "actions": [{"action": "DELETE", "target_block_index": 2}]
+    }
+
+
+def test_truncated_output_keeps_only_complete_actions():
+    text = '{"actions": [{"action": "CHAT", "text": "ok"}, {"action": "UPDATE", "text": "Half a sen'
+
+    assert repair_json(text) == {"actions": [{"action": "CHAT", "text": "ok"}]}
+
+
+def test_truncated_rewrite_is_dropped_not_shortened():
+    text = (
+        '{"actions": [{"action": "APPEND", "text": "x"}, {"action": "REWRITE", '
+        '"blocks": [{"text": "a"}, {"text": "b"}, {"te'
+    )
+
+    assert repair_json(text) == {"actions": [{"action": "APPEND", "text": "x"}]}
+
+
+def test_truncated_first_rewrite_is_not_recovered():
+    text = (
+        '{"actions": [{"action": "REWRITE", "target_block_index": 1, '
+        '"blocks": [{"text": "a"}, {"text": "b'
+    )
+
+    with pytest.raises(ValueError):
+        repair_json(text)
+
+
+def test_truncated_bare_action_list_is_cut_at_the_list():
+    assert repair_json('[{"action": "CHAT", "text": "ok"}, {"action": "UPD') == [
+        {"action": "CHAT", "text": "ok"}
+    ]
+
+
+def test_braces_and_quotes_inside_strings_are_text():
+    assert repair_json('{"text": "a \\"quoted\\" } ]"} and more') == {"text": 'a "quoted" } ]'}
+
+
+@pytest.mark.parametrize("text", ["no json here", '{"actions": [{"action": "UPDATE", "te'])
+def test_unrecoverable_input_raises(text):
+    with pytest.raises(ValueError):
+        repair_json(text)
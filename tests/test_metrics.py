@@ -0,0 +1,110 @@
+import json
+from unittest.mock import Mock, patch
+
+from src.agent import main
+from src.metrics import Metrics, MetricsExporter, metrics
+from src.notion_client import NotionClient
+
+
+def test_spans_keep_rolling_percentiles():
+    registry = Metrics(window=10)
+    for ms in range(1, 21):
+        registry.observe("notion.request", ms / 1000)
+
+    stats = registry.phases()["notion.request"]
+
+    assert stats["count"] == 20
+    assert stats["sum"] == sum(range(1, 21)) / 1000
+    # Only the last 10 observations (11..20 ms) count for the percentiles
+    assert stats["p50"] == 0.016
+    assert stats["p95"] == 0.020
+
+
+def test_timed_decorator_and_counters():
+    registry = Metrics()
+
+    @registry.timed("phase")
+    def work(x):
+        return x * 2
+
+    assert work(2) == 4
+    registry.incr("notion_bytes_received", 512)
+    registry.incr("notion_bytes_received", 512)
+
+    assert registry.phases()["phase"]["count"] == 1
+    assert registry.counters() == {"notion_bytes_received": 1024}
+
+
+def test_prometheus_text_format():
+    registry = Metrics()
+    registry.observe("gemini.generate", 1.5)
+    registry.incr("notion_retries", 3)
+
+    text = registry.to_prometheus()
+
+    assert 'notion_sidecar_phase_seconds{phase="gemini.generate",quantile="0.95"} 1.5' in text
+    assert 'notion_sidecar_phase_seconds_count{phase="gemini.generate"} 1' in text
+    assert "# TYPE notion_sidecar_notion_retries_total counter" in text
+    assert "notion_sidecar_notion_retries_total 3" in text
+
+
+def test_exporter_writes_json_lines_and_prometheus(tmp_path):
+    registry = Metrics()
+    registry.incr("notion_requests")
+    jsonl = tmp_path / "metrics.jsonl"
+    prom = tmp_path / "metrics.prom"
+
+    json_exporter = MetricsExporter(registry, str(jsonl), "json", interval=0)
+    assert json_exporter.start()
+    json_exporter.export_once()
+    json_exporter.stop()
+    MetricsExporter(registry, str(prom), "prometheus", interval=0).export_once()
+
+    lines = [json.loads(line) for line in jsonl.read_text().splitlines()]
+    assert len(lines) == 2 and lines[0]["counters"] == {"notion_requests": 1}
+    assert "notion_sidecar_notion_requests_total 1" in prom.read_text()
+    assert not MetricsExporter(registry, "", "json").start()
+
+
+def test_client_counts_requests_retries_and_bytes(monkeypatch):
+    monkeypatch.setenv("NOTION_TOKEN", "fake")
+    monkeypatch.setenv("NOTION_BACKOFF_BASE", "0")
+    metrics.reset()
+    client = NotionClient()
+    error = Mock(status_code=503, headers={"Content-Length": "20"})
+    ok = Mock(status_code=200, headers={"Content-Length": "100"})
+    client.session.request = Mock(side_effect=[error, ok])
+
+    assert client._make_request("GET", f"{client.BASE_URL}/pages/p") is ok
+
+    counters = metrics.counters()
+    assert counters["notion_requests"] == 1
+    assert counters["notion_retries"] == 1
+    assert counters["notion_server_errors"] == 1
+    assert counters["notion_bytes_received"] == 120
+    assert metrics.phases()["notion.request"]["count"] == 1
+
+
+def test_stats_command_shows_phase_percentiles(capsys):
+    metrics.reset()
+    with (
+        patch("src.agent.NotionClient") as mock_notion_cls,
+        patch("src.agent.GeminiAgent") as mock_gemini_cls,
+        patch("builtins.input", side_effect=["Fix the text", "stats", "exit"]),
+        patch("sys.argv", ["notion_sidecar"]),
+        patch.dict(
+            "os.environ", {"NOTION_TOKEN": "fake", "PAGE_ID": "fake", "GEMINI_API_KEY": "fake"}
+        ),
+    ):
+        mock_notion_cls.return_value.get_page_blocks.return_value = [
+            {"id": "b1", "type": "paragraph", "content": "Text"}
+        ]
+        mock_gemini_cls.return_value.analyze_and_act.return_value = [
+            {"action": "CHAT", "text": "Looks fine"}
+        ]
+        main()
+
+    out = capsys.readouterr().out
+    for phase in ("command.fetch", "command.reason", "command.execute", "command.total"):
+        assert phase in out
+    assert "p95" in out
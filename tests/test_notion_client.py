@@ -1,8 +1,10 @@
+import sys
+import threading
 from unittest.mock import Mock, patch
 
 import pytest
 
-from src.notion_client import NotionClient
+from src.notion_client import Block, IncompleteListingError, NotionClient
 
 
 @pytest.fixture
@@ -40,7 +42,15 @@ def test_get_page_blocks_success(client, mock_response):
         assert len(blocks) == 1
         assert blocks[0]["content"] == "Hello World"
         assert blocks[0]["type"] == "paragraph"
-        mock_req.assert_called_once()
+        # One page metadata read plus one children page
+        assert mock_req.call_count == 2
+        mock_req.assert_called_with(
+            "GET",
+            f"{client.BASE_URL}/blocks/page-id/children",
+            params={"page_size": 100},
+            json=None,
+            timeout=(5.0, 30.0),
+        )
 
 
 def test_get_page_blocks_empty(client, mock_response):
@@ -51,6 +61,120 @@ def test_get_page_blocks_empty(client, mock_response):
         assert len(blocks) == 0
 
 
+def _page_response(last_edited_time):
+    resp = Mock()
+    resp.status_code = 200
+    resp.json.return_value = {"object": "page", "last_edited_time": last_edited_time}
+    return resp
+
+
+def _children_response(*texts):
+    resp = Mock()
+    resp.status_code = 200
+    resp.json.return_value = {
+        "results": [
+            {
+                "id": f"block-{i}",
+                "type": "paragraph",
+                "last_edited_time": "2024-01-01T10:00:00.000Z",
+                "paragraph": {"rich_text": [{"plain_text": text}]},
+            }
+            for i, text in enumerate(texts)
+        ],
+        "has_more": False,
+    }
+    return resp
+
+
+def test_get_page_blocks_uses_cache_when_unchanged(client):
+    page = _page_response("2024-01-01T10:00:00.000Z")
+    responses = [page, _children_response("Hello"), page]
+
+    with patch.object(client.session, "request", side_effect=responses) as mock_req:
+        first = client.get_page_blocks("page-id")
+        second = client.get_page_blocks("page-id")
+
+    assert first == second
+    assert mock_req.call_count == 3  # second call only re-reads page metadata
+
+
+def test_get_page_blocks_refetches_when_page_changed(client):
+    responses = [
+        _page_response("2024-01-01T10:00:00.000Z"),
+        _children_response("Hello"),
+        _page_response("2024-01-01T10:05:00.000Z"),
+        _children_response("Hello", "World"),
+    ]
+
+    with patch.object(client.session, "request", side_effect=responses):
+        client.get_page_blocks("page-id")
+        blocks = client.get_page_blocks("page-id")
+
+    assert [b["content"] for b in blocks] == ["Hello", "World"]
+
+
+def test_get_page_blocks_force_refresh(client):
+    page = _page_response("2024-01-01T10:00:00.000Z")
+    responses = [page, _children_response("Hello"), page, _children_response("Hello")]
+
+    with patch.object(client.session, "request", side_effect=responses) as mock_req:
+        client.get_page_blocks("page-id")
+        client.get_page_blocks("page-id", force_refresh=True)
+
+    assert mock_req.call_count == 4
+
+
+def test_block_edited_in_the_minute_of_the_read_is_parsed_again(client):
+    edited = _page_response("2024-01-01T10:00:00.000Z")
+    read_at = 1704103230.0  # 10:00:30, before the edit's minute is over
+    responses = [edited, _children_response("Draft"), edited, _children_response("Final")]
+
+    with patch.object(client.session, "request", side_effect=responses):
+        with patch("src.notion_client.time.time", return_value=read_at):
+            client.get_page_blocks("page-id")
+        blocks = client.get_page_blocks("page-id")
+
+    # Same block last_edited_time, but the cached copy may predate the edit
+    assert [b["content"] for b in blocks] == ["Final"]
+
+
+def test_snapshot_cache_drops_least_recently_read_pages(client):
+    client.max_snapshots = 2
+    for page_id in ("a", "b", "c"):
+        client._build_snapshot(page_id, {page_id: []}, "2024-01-01T10:00:00.000Z", 0.0, False, True)
+        if page_id == "b":
+            client.snapshot("a")
+
+    assert client.snapshot("a") is not None and client.snapshot("c") is not None
+    assert client.snapshot("b") is None
+
+
+def test_mutations_while_snapshots_are_stored_from_other_threads(client):
+    client.max_snapshots = 10000
+    for i in range(5000):
+        client._build_snapshot(f"p{i}", {}, "2024-01-01T10:00:00.000Z", 0.0, False, True)
+    done = threading.Event()
+
+    def _store():
+        for i in range(5000, 10000):
+            client._build_snapshot(f"p{i}", {}, "2024-01-01T10:00:00.000Z", 0.0, False, True)
+        done.set()
+
+    worker = threading.Thread(target=_store)
+    interval = sys.getswitchinterval()
+    # Switch threads often so the workers interleave with the iteration
+    sys.setswitchinterval(1e-6)
+    try:
+        worker.start()
+        while not done.is_set():
+            client._record_mutation(True)
+    finally:
+        worker.join()
+        sys.setswitchinterval(interval)
+
+    assert client.snapshot("p9999") is not None
+
+
 def test_update_block_success(client, mock_response):
     with patch.object(client.session, "request", return_value=mock_response):
         success = client.update_block("block-1", "New text")
@@ -68,7 +192,11 @@ def test_delete_block_success(client, mock_response):
         success = client.delete_block("block-1")
         assert success is True
         mock_req.assert_called_with(
-            "DELETE", f"{client.BASE_URL}/blocks/block-1", params=None, json=None
+            "DELETE",
+            f"{client.BASE_URL}/blocks/block-1",
+            params=None,
+            json=None,
+            timeout=(5.0, 30.0),
         )
 
 
@@ -96,3 +224,173 @@ def test_api_rate_limit_retry(client):
             client._make_request("GET", "url")
 
             assert mock_req.call_count == 2
+
+
+def test_get_page_blocks_deep_fetch(client):
+    def _block(block_id, text, has_children=False, b_type="paragraph"):
+        return {
+            "id": block_id,
+            "type": b_type,
+            "has_children": has_children,
+            b_type: {"rich_text": [{"plain_text": text}]},
+        }
+
+    tree = {
+        "page-id": [_block("t1", "Toggle", True, "toggle"), _block("p2", "After")],
+        "t1": [_block("c1", "Child", True, "bulleted_list_item")],
+        "c1": [_block("g1", "Grandchild")],
+    }
+
+    def _route(method, url, params=None, json=None, timeout=None):
+        resp = Mock()
+        resp.status_code = 200
+        if "/pages/" in url:
+            resp.json.return_value = {"last_edited_time": "2024-01-01T10:00:00.000Z"}
+        else:
+            block_id = url.split("/blocks/")[1].split("/")[0]
+            resp.json.return_value = {"results": tree[block_id], "has_more": False}
+        return resp
+
+    with patch.object(client.session, "request", side_effect=_route):
+        blocks = client.get_page_blocks("page-id", deep=True)
+
+    assert [(b["id"], b["depth"], b["parent_id"]) for b in blocks] == [
+        ("t1", 0, "page-id"),
+        ("c1", 1, "t1"),
+        ("g1", 2, "c1"),
+        ("p2", 0, "page-id"),
+    ]
+
+
+def test_append_blocks_packs_children(client):
+    items = [(f"Paragraph {i}", "paragraph") for i in range(150)]
+
+    with patch.object(client.session, "request") as mock_req:
+        mock_req.return_value.status_code = 200
+        results = client.append_blocks("page-id", items)
+
+    assert results == [True] * 150
+    assert mock_req.call_count == 2
+    sizes = [len(call.kwargs["json"]["children"]) for call in mock_req.call_args_list]
+    assert sizes == [100, 50]
+
+
+def test_long_text_is_split_into_segments(client, mock_response):
+    with patch.object(client.session, "request", return_value=mock_response) as mock_req:
+        client.append_blocks("page-id", [("x" * 4500, "paragraph")])
+
+    rich_text = mock_req.call_args.kwargs["json"]["children"][0]["paragraph"]["rich_text"]
+    assert [len(t["text"]["content"]) for t in rich_text] == [2000, 2000, 500]
+
+
+def test_insert_blocks_after_chains_anchor(client):
+    first = Mock(status_code=200)
+    first.json.return_value = {"results": [{"id": f"new-{i}"} for i in range(100)]}
+    second = Mock(status_code=200)
+    second.json.return_value = {"results": [{"id": "new-100"}]}
+    items = [(f"Item {i}", "bulleted_list_item") for i in range(101)]
+
+    with patch.dict("os.environ", {"PAGE_ID": "test-page-id"}):
+        with patch.object(client.session, "request", side_effect=[first, second]) as mock_req:
+            results = client.insert_blocks_after("block-1", items)
+
+    assert results == [True] * 101
+    anchors = [call.kwargs["json"]["after"] for call in mock_req.call_args_list]
+    assert anchors == ["block-1", "new-99"]
+
+
+def test_delete_blocks_reports_partial_failure(client):
+    with patch.object(client, "delete_block", side_effect=lambda block_id: block_id != "b2"):
+        results = client.delete_blocks(["b1", "b2", "b3"])
+
+    assert results == [True, False, True]
+
+
+def test_query_database_paginates(client):
+    first = Mock(status_code=200)
+    first.json.return_value = {
+        "results": [
+            {"object": "page", "id": "p1"},
+            {"object": "page", "id": "p0", "archived": True},
+        ],
+        "has_more": True,
+        "next_cursor": "cursor-2",
+    }
+    second = Mock(status_code=200)
+    second.json.return_value = {"results": [{"object": "page", "id": "p2"}], "has_more": False}
+    status_filter = {"property": "Status", "status": {"equals": "Draft"}}
+
+    with patch.object(client.session, "request", side_effect=[first, second]) as mock_req:
+        assert client.query_database("db-1", filter=status_filter) == ["p1", "p2"]
+
+    assert mock_req.call_args_list[0].kwargs["json"] == {"page_size": 100, "filter": status_filter}
+    assert mock_req.call_args_list[1].kwargs["json"]["start_cursor"] == "cursor-2"
+
+
+def test_iter_page_blocks_parses_each_page_as_it_arrives(client):
+    first = _children_response("One", "Two")
+    first.json.return_value["has_more"] = True
+    first.json.return_value["next_cursor"] = "cursor-2"
+    second = _children_response("Three")
+
+    with patch.object(client.session, "request", side_effect=[first, second]) as mock_req:
+        blocks = client.iter_page_blocks("page-id", deep=False)
+        head = next(blocks)
+        assert mock_req.call_count == 1  # the second page is not read yet
+        rest = list(blocks)
+
+    assert isinstance(head, Block)
+    assert [b["content"] for b in [head, *rest]] == ["One", "Two", "Three"]
+    assert mock_req.call_args.kwargs["params"] == {"page_size": 100, "start_cursor": "cursor-2"}
+
+
+def test_iter_page_blocks_raises_when_a_listing_fails(client):
+    first = _children_response("One")
+    first.json.return_value["has_more"] = True
+    first.json.return_value["next_cursor"] = "cursor-2"
+    failed = Mock(status_code=400, headers={})
+
+    with patch.object(client.session, "request", side_effect=[first, failed]):
+        blocks = client.iter_page_blocks("page-id", deep=False)
+        assert next(blocks)["content"] == "One"
+        with pytest.raises(IncompleteListingError):
+            next(blocks)
+
+
+def test_iter_page_blocks_serves_current_snapshot(client):
+    page = _page_response("2024-01-01T10:00:00.000Z")
+    with patch.object(client.session, "request", side_effect=[page, _children_response("Hi")]):
+        expected = client.get_page_blocks("page-id", deep=False)
+
+    with patch.object(client.session, "request", return_value=page) as mock_req:
+        streamed = list(client.iter_page_blocks("page-id", deep=False))
+
+    assert streamed == expected
+    assert mock_req.call_count == 1  # page metadata only
+
+
+def test_block_reads_like_a_block_dict():
+    nested = Block("b2", "paragraph", "Child", depth=1, parent_id="b1")
+    top = Block("b1", "toggle", "Parent")
+
+    assert nested == {
+        "id": "b2",
+        "type": "paragraph",
+        "content": "Child",
+        "depth": 1,
+        "parent_id": "b1",
+    }
+    assert "parent_id" not in top and top.get("depth", 0) == 0
+    assert (
+        {**top} == top.to_dict() == {"id": "b1", "type": "toggle", "content": "Parent", "depth": 0}
+    )
+    assert not hasattr(top, "__dict__")
+
+
+def test_decode_prefers_orjson_for_raw_bodies(client):
+    pytest.importorskip("orjson")
+    response = Mock()
+    response.content = b'{"has_more": false}'
+
+    assert client._decode(response) == {"has_more": False}
+    response.json.assert_not_called()
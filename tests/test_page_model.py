@@ -0,0 +1,180 @@
+from unittest.mock import Mock, patch
+
+import pytest
+
+from src.notion_client import BLOCK_DELETED, BLOCK_UPDATED, BLOCKS_CREATED, NotionClient
+from src.page_model import PageModel
+
+
+def _block(block_id, content, depth=0, parent_id="page-id", b_type="paragraph"):
+    return {
+        "id": block_id,
+        "type": b_type,
+        "content": content,
+        "depth": depth,
+        "parent_id": parent_id,
+    }
+
+
+def _raw(block_id, text, b_type="paragraph"):
+    return {"id": block_id, "type": b_type, b_type: {"rich_text": [{"plain_text": text}]}}
+
+
+@pytest.fixture
+def notion():
+    client = Mock()
+    client.listeners = []
+    client.subscribe.side_effect = client.listeners.append
+    client.get_page_blocks.return_value = [
+        _block("b1", "Intro"),
+        _block("b2", "Toggle", b_type="toggle"),
+        _block("b2a", "Hidden", depth=1, parent_id="b2"),
+        _block("b3", "Outro"),
+    ]
+    return client
+
+
+@pytest.fixture
+def page(notion):
+    model = PageModel(notion, "page-id", reconcile_delay=0)
+    model.blocks()
+    yield model
+    model.close()
+
+
+def _emit(notion, event, **payload):
+    for listener in notion.listeners:
+        listener(event, payload)
+
+
+def test_mutations_are_applied_without_refetch(notion, page):
+    _emit(notion, BLOCK_UPDATED, block={"id": "b1", "type": "heading_1", "content": "Title"})
+    _emit(
+        notion,
+        BLOCKS_CREATED,
+        parent_id="page-id",
+        after="b2",
+        blocks=[{"id": "new", "type": "paragraph", "content": "After toggle"}],
+    )
+    _emit(notion, BLOCK_DELETED, block_id="b3")
+
+    blocks = page.blocks()
+
+    assert [(b["id"], b["content"]) for b in blocks] == [
+        ("b1", "Title"),
+        ("b2", "Toggle"),
+        ("b2a", "Hidden"),
+        ("new", "After toggle"),
+    ]
+    assert blocks[0]["type"] == "heading_1"
+    assert page.dirty
+    assert notion.get_page_blocks.call_count == 1
+
+
+def test_nested_append_goes_to_end_of_parent(notion, page):
+    _emit(
+        notion,
+        BLOCKS_CREATED,
+        parent_id="b2",
+        after=None,
+        blocks=[{"id": "b2b", "type": "paragraph", "content": "More"}],
+    )
+
+    blocks = page.blocks()
+
+    assert [b["id"] for b in blocks] == ["b1", "b2", "b2a", "b2b", "b3"]
+    assert blocks[3]["depth"] == 1
+    assert blocks[3]["parent_id"] == "b2"
+
+
+def test_deleting_parent_removes_children(notion, page):
+    _emit(notion, BLOCK_DELETED, block_id="b2")
+
+    assert [b["id"] for b in page.blocks()] == ["b1", "b3"]
+
+
+def test_reconcile_confirms_own_writes(notion, page):
+    _emit(notion, BLOCK_UPDATED, block={"id": "b1", "type": "paragraph", "content": "Hello"})
+    notion.get_page_blocks.return_value = [
+        _block("b1", "Hello"),
+        _block("b2", "Toggle", b_type="toggle"),
+        _block("b2a", "Hidden", depth=1, parent_id="b2"),
+        _block("b3", "Outro"),
+    ]
+
+    assert page.reconcile() is True
+
+    assert not page.dirty
+    assert page.take_conflicts() == []
+    notion.get_page_blocks.assert_called_with("page-id", force_refresh=True)
+
+
+def test_reconcile_detects_foreign_edits(notion, page):
+    snapshot = page.blocks()
+    _emit(notion, BLOCK_UPDATED, block={"id": "b1", "type": "paragraph", "content": "Hello"})
+    version = page.version
+    notion.get_page_blocks.return_value = [
+        _block("b1", "Hello"),
+        _block("b3", "Rewritten by a colleague"),
+        _block("b4", "Added by a colleague"),
+    ]
+
+    page.reconcile()
+
+    [conflict] = page.take_conflicts()
+    assert conflict.changed == ["b3"]
+    assert conflict.added == ["b4"]
+    assert conflict.removed == ["b2", "b2a"]
+    assert page.version == version + 1
+    assert [b["id"] for b in page.blocks()] == ["b1", "b3", "b4"]
+    # Plans made from the old snapshot must not touch the blocks that changed
+    assert page.stale_indexes(snapshot) == {0, 1, 2, 3}
+
+
+def test_reconcile_retries_after_concurrent_write(notion, page):
+    def _read(*args, **kwargs):
+        _emit(notion, BLOCK_DELETED, block_id="b3")
+        return [_block("b1", "Intro")]
+
+    notion.get_page_blocks.side_effect = _read
+
+    assert page.reconcile() is False
+
+
+def test_client_publishes_parsed_blocks():
+    env = {"NOTION_TOKEN": "fake_token", "PAGE_ID": "page-id"}
+    with patch.dict("os.environ", env):
+        client = NotionClient()
+    events = []
+    client.subscribe(lambda event, payload: events.append((event, payload)))
+
+    update = Mock(status_code=200)
+    update.json.return_value = _raw("b1", "Updated")
+    insert = Mock(status_code=200)
+    insert.json.return_value = {"results": [_raw("n1", "One"), _raw("n2", "Two")]}
+    delete = Mock(status_code=200)
+    delete.json.return_value = {"id": "b3", "archived": True}
+
+    with (
+        patch.dict("os.environ", env),
+        patch.object(client.session, "request", side_effect=[update, insert, delete]),
+    ):
+        assert client.update_block("b1", "Updated")
+        assert client.insert_blocks_after("b1", [("One", "paragraph"), ("Two", "paragraph")])
+        assert client.delete_block("b3")
+
+    assert events == [
+        (BLOCK_UPDATED, {"block": {"id": "b1", "type": "paragraph", "content": "Updated"}}),
+        (
+            BLOCKS_CREATED,
+            {
+                "parent_id": "page-id",
+                "after": "b1",
+                "blocks": [
+                    {"id": "n1", "type": "paragraph", "content": "One"},
+                    {"id": "n2", "type": "paragraph", "content": "Two"},
+                ],
+            },
+        ),
+        (BLOCK_DELETED, {"block_id": "b3"}),
+    ]
@@ -0,0 +1,109 @@
+from unittest.mock import Mock, patch
+
+import pytest
+
+from src.notion_client import NotionClient
+from src.page_watcher import PageWatcher
+
+EDITED = "2024-01-01T10:00:00.000Z"
+
+
+def _page(last_edited_time=EDITED):
+    resp = Mock(status_code=200)
+    resp.json.return_value = {"last_edited_time": last_edited_time}
+    return resp
+
+
+def _children(*texts):
+    resp = Mock(status_code=200)
+    resp.json.return_value = {
+        "results": [
+            {
+                "id": f"b{i}",
+                "type": "paragraph",
+                "last_edited_time": EDITED,
+                "paragraph": {"rich_text": [{"plain_text": text}]},
+            }
+            for i, text in enumerate(texts)
+        ],
+        "has_more": False,
+    }
+    return resp
+
+
+@pytest.fixture
+def client():
+    with patch.dict("os.environ", {"NOTION_TOKEN": "fake_token"}):
+        return NotionClient()
+
+
+def test_poll_keeps_snapshot_warm(client):
+    watcher = PageWatcher(client, "page-id", interval=5, max_interval=60)
+    client.snapshot_ttl = 5
+
+    responses = [_page(), _children("Hello"), _page()]
+    with patch.object(client.session, "request", side_effect=responses) as mock_req:
+        assert watcher.poll_once() is True
+        # Unchanged page: one metadata request, no listing
+        assert watcher.poll_once() is False
+        assert mock_req.call_count == 3
+
+        # The foreground read is served from the verified snapshot
+        blocks = client.get_page_blocks("page-id")
+        assert mock_req.call_count == 3
+
+    assert [b["content"] for b in blocks] == ["Hello"]
+    assert watcher.stats == {"polls": 2, "changes": 1, "deferred": 0}
+
+
+def test_poll_defers_without_spare_capacity(client, monkeypatch):
+    monkeypatch.setenv("NOTION_WATCH_RESERVE", "1")
+    client.rate_limiter = Mock()
+    client.rate_limiter.try_acquire.return_value = False
+    watcher = PageWatcher(client, "page-id", interval=5)
+
+    with patch.object(client.session, "request") as mock_req:
+        assert watcher.poll_once() is None
+
+    mock_req.assert_not_called()
+    client.rate_limiter.try_acquire.assert_called_with(reserve=1.0)
+    assert client.snapshot("page-id") is None
+    assert watcher.stats["deferred"] == 1
+
+
+def test_incomplete_background_listing_keeps_old_snapshot(client):
+    with patch.object(client.session, "request", side_effect=[_page(), _children("Hello")]):
+        client.get_page_blocks("page-id")
+    snapshot = client.snapshot("page-id")
+
+    client.rate_limiter = Mock()
+    # Metadata request allowed, listing deferred
+    client.rate_limiter.try_acquire.side_effect = [True, False]
+    with patch.object(client.session, "request", return_value=_page("2024-01-02T09:00:00.000Z")):
+        assert client.get_page_blocks("page-id", background=True) == []
+
+    assert client.snapshot("page-id") is snapshot
+
+
+def test_idle_backoff_and_reset():
+    watcher = PageWatcher(Mock(), "page-id", interval=5, max_interval=30)
+
+    for expected in (10, 20, 30, 30):
+        watcher._reschedule(False)
+        assert watcher.current_interval == expected
+
+    watcher._reschedule(None)
+    assert watcher.current_interval == 30
+    watcher.touch()
+    assert watcher.current_interval == 5
+    watcher._reschedule(False)
+    watcher._reschedule(True)
+    assert watcher.current_interval == 5
+
+
+def test_disabled_by_default():
+    notion = Mock()
+    watcher = PageWatcher(notion, "page-id", interval=0)
+
+    assert watcher.start() is False
+    assert not watcher.running
@@ -0,0 +1,130 @@
+import asyncio
+from unittest.mock import AsyncMock, Mock, patch
+
+import pytest
+
+from src.notion_client import NotionClient
+from src.rate_limiter import TokenBucket, get_rate_limiter
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 100.0
+
+    def monotonic(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.now += seconds
+
+
+@pytest.fixture
+def clock():
+    fake = FakeClock()
+    with (
+        patch("src.rate_limiter.time.monotonic", fake.monotonic),
+        patch("src.rate_limiter.time.sleep", fake.sleep),
+    ):
+        yield fake
+
+
+def test_burst_then_steady_rate(clock):
+    bucket = TokenBucket(rate=2.0, burst=3)
+
+    waits = [bucket.acquire() for _ in range(5)]
+
+    # Three requests go out immediately, then one every 1/rate seconds
+    assert waits[:3] == [0.0, 0.0, 0.0]
+    assert waits[3] == pytest.approx(0.5)
+    assert waits[4] == pytest.approx(0.5)
+
+
+def test_waiting_callers_queue_up(clock):
+    bucket = TokenBucket(rate=2.0, burst=1)
+    bucket.acquire()
+
+    # Reservations without sleeping in between: each waits behind the previous one
+    assert bucket._reserve(1) == pytest.approx(0.5)
+    assert bucket._reserve(1) == pytest.approx(1.0)
+
+
+def test_throttle_halves_rate_and_pauses(clock):
+    bucket = TokenBucket(rate=4.0, burst=4)
+
+    bucket.on_throttled(retry_after=2)
+
+    assert bucket.rate == 2.0
+    assert bucket.throttle_count == 1
+    # Pause, then one token at the reduced rate
+    assert bucket.acquire() == pytest.approx(2.5)
+
+
+def test_rate_recovers_on_success(clock):
+    bucket = TokenBucket(rate=4.0, burst=4)
+    bucket.on_throttled()
+
+    for _ in range(100):
+        bucket.on_success()
+
+    assert bucket.rate == 4.0
+
+
+def test_rate_never_drops_below_minimum(clock):
+    bucket = TokenBucket(rate=4.0, burst=4, min_rate=1.0)
+
+    for _ in range(10):
+        bucket.on_throttled()
+
+    assert bucket.rate == 1.0
+
+
+def test_try_acquire_keeps_reserve(clock):
+    bucket = TokenBucket(rate=1.0, burst=3)
+
+    assert bucket.try_acquire(reserve=1)
+    assert bucket.try_acquire(reserve=1)
+    # Only one token left, and it is reserved for foreground requests
+    assert not bucket.try_acquire(reserve=1)
+    assert bucket.try_acquire()
+
+
+def test_disabled_bucket_never_waits(clock):
+    bucket = TokenBucket(rate=0, burst=1)
+
+    assert [bucket.acquire() for _ in range(10)] == [0.0] * 10
+    assert bucket.try_acquire(reserve=100)
+
+
+def test_acquire_async(clock):
+    bucket = TokenBucket(rate=2.0, burst=1)
+    bucket.acquire()
+
+    with patch("asyncio.sleep", new=AsyncMock()) as mock_sleep:
+        waited = asyncio.run(bucket.acquire_async())
+
+    assert waited == pytest.approx(0.5)
+    mock_sleep.assert_awaited_once_with(pytest.approx(0.5))
+
+
+def test_limiter_shared_per_token(monkeypatch):
+    monkeypatch.setenv("NOTION_RATE_LIMIT", "3")
+
+    assert get_rate_limiter("secret_a") is get_rate_limiter("secret_a")
+    assert get_rate_limiter("secret_a") is not get_rate_limiter("secret_b")
+
+
+def test_clients_share_limiter_and_back_off(monkeypatch, clock):
+    monkeypatch.setenv("NOTION_RATE_LIMIT", "3")
+    monkeypatch.setenv("NOTION_TOKEN", "fake_token")
+    first, second = NotionClient(), NotionClient()
+    assert first.rate_limiter is second.rate_limiter
+
+    resp_429 = Mock(status_code=429, headers={"Retry-After": "0"})
+    resp_200 = Mock(status_code=200)
+    resp_200.json.return_value = {"results": []}
+
+    with patch.object(first.session, "request", side_effect=[resp_429, resp_200]):
+        first._make_request("GET", "https://api.notion.com/v1/blocks/x/children")
+
+    assert first.rate_limiter.throttle_count == 1
+    assert second.rate_limiter.rate < 3.0
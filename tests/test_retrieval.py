@@ -0,0 +1,61 @@
+from unittest.mock import patch
+
+import pytest
+
+pytest.importorskip("numpy")
+
+from src.context_builder import ContextBuilder  # noqa: E402
+from src.retrieval import BlockRetriever, HashingEmbedder  # noqa: E402
+
+
+def _blocks():
+    topics = ["gardening tomatoes", "database indexing", "mountain hiking", "pricing strategy"]
+    return [
+        {
+            "id": f"b{i}",
+            "type": "paragraph",
+            "content": f"Notes about {topics[i % 4]} part {i}. " + "lorem ipsum " * 20,
+        }
+        for i in range(40)
+    ]
+
+
+def test_hashing_embedder_is_deterministic():
+    embedder = HashingEmbedder(dim=64)
+    assert embedder.embed_query("hello world") == embedder.embed_query("hello world")
+
+
+def test_search_returns_relevant_blocks():
+    retriever = BlockRetriever(HashingEmbedder(), top_k=3)
+    blocks = _blocks()
+
+    hits = retriever.search(blocks, "pricing strategy")
+
+    assert len(hits) == 3
+    assert all("pricing" in blocks[idx]["content"] for idx in hits)
+
+
+def test_vectors_are_cached_by_content():
+    embedder = HashingEmbedder()
+    retriever = BlockRetriever(embedder, top_k=2)
+    blocks = _blocks()
+    retriever.search(blocks, "hiking")
+
+    blocks[5] = dict(blocks[5], content="Completely new text")
+
+    with patch.object(embedder, "embed_documents", wraps=embedder.embed_documents) as mock_embed:
+        retriever.search(blocks, "hiking")
+
+    mock_embed.assert_called_once_with(["paragraph: Completely new text"])
+
+
+def test_context_builder_shows_only_retrieved_blocks_in_full():
+    retriever = BlockRetriever(HashingEmbedder(), top_k=2)
+    builder = ContextBuilder(token_budget=1300, window=0, retriever=retriever)
+    blocks = _blocks()
+
+    context = builder.build(blocks, query="database indexing")
+
+    full = [line for line in context.splitlines() if "(ID:" in line]
+    assert len(full) == 2
+    assert all("database" in context.split(line)[1].splitlines()[1] for line in full)
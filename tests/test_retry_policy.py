@@ -0,0 +1,168 @@
+from unittest.mock import Mock, patch
+
+import pytest
+import requests
+
+from src.notion_client import NotionClient
+from src.retry_policy import CLOSED, HALF_OPEN, OPEN, CircuitBreaker, RetryPolicy
+
+
+@pytest.fixture
+def client():
+    with patch.dict("os.environ", {"NOTION_TOKEN": "fake_token", "NOTION_BREAKER_THRESHOLD": "2"}):
+        return NotionClient()
+
+
+def _response(status):
+    resp = Mock()
+    resp.status_code = status
+    resp.headers = {}
+    resp.json.return_value = {}
+    return resp
+
+
+def test_backoff_is_jittered_and_capped():
+    policy = RetryPolicy(base_delay=1.0, max_delay=4.0)
+
+    with patch("src.retry_policy.random.uniform", side_effect=lambda low, high: high) as uniform:
+        assert [policy.backoff(n) for n in range(4)] == [1.0, 2.0, 4.0, 4.0]
+    assert uniform.call_args_list[0].args == (0, 1.0)
+
+
+def test_timeouts_shrink_to_deadline():
+    policy = RetryPolicy(deadline=10, connect_timeout=5, read_timeout=30)
+
+    with patch("src.retry_policy.time.monotonic", return_value=100.0):
+        deadline_at = policy.deadline_at()
+    with patch("src.retry_policy.time.monotonic", return_value=108.0):
+        assert policy.timeout(deadline_at) == (2.0, 2.0)
+        assert not policy.fits(3.0, deadline_at)
+    with patch("src.retry_policy.time.monotonic", return_value=111.0):
+        assert policy.timeout(deadline_at) is None
+
+
+def test_no_deadline():
+    policy = RetryPolicy(deadline=0, connect_timeout=5, read_timeout=30)
+
+    assert policy.deadline_at() is None
+    assert policy.timeout(None) == (5, 30)
+    assert policy.fits(1000, None)
+
+
+def test_breaker_opens_probes_and_closes():
+    breaker = CircuitBreaker(failure_threshold=2, reset_timeout=30)
+
+    with patch("src.retry_policy.time.monotonic", return_value=0.0):
+        breaker.record_failure()
+        assert breaker.state == CLOSED
+        breaker.record_failure()
+        assert breaker.state == OPEN
+        assert not breaker.allow()
+
+    with patch("src.retry_policy.time.monotonic", return_value=31.0):
+        # One probe only while half-open
+        assert breaker.allow()
+        assert breaker.state == HALF_OPEN
+        assert not breaker.allow()
+        breaker.record_success()
+
+    assert breaker.state == CLOSED
+    assert breaker.allow()
+    assert breaker.snapshot() == {
+        "state": CLOSED,
+        "consecutive_failures": 0,
+        "times_opened": 1,
+        "rejected": 2,
+    }
+
+
+def test_failed_probe_reopens():
+    breaker = CircuitBreaker(failure_threshold=1, reset_timeout=30)
+
+    with patch("src.retry_policy.time.monotonic", return_value=0.0):
+        breaker.record_failure()
+    with patch("src.retry_policy.time.monotonic", return_value=31.0):
+        assert breaker.allow()
+        breaker.record_failure()
+        assert breaker.state == OPEN
+        assert not breaker.allow()
+
+    assert breaker.times_opened == 2
+
+
+def test_abandoned_probe_is_replaced_after_reset_timeout():
+    breaker = CircuitBreaker(failure_threshold=1, reset_timeout=30)
+
+    with patch("src.retry_policy.time.monotonic", return_value=0.0):
+        breaker.record_failure()
+    with patch("src.retry_policy.time.monotonic", return_value=31.0):
+        # This probe never calls record_success or record_failure
+        assert breaker.allow()
+        assert not breaker.allow()
+    with patch("src.retry_policy.time.monotonic", return_value=50.0):
+        assert not breaker.allow()
+    with patch("src.retry_policy.time.monotonic", return_value=61.0):
+        assert breaker.allow()
+        breaker.record_success()
+
+    assert breaker.state == CLOSED
+
+
+def test_server_errors_retry_then_open_circuit(client):
+    with patch.object(client.session, "request", return_value=_response(503)) as mock_req:
+        with patch("time.sleep") as mock_sleep:
+            assert client._make_request("GET", "https://example.test") is None
+            # The breaker opened after two failures, so the third attempt was never sent
+            assert mock_req.call_count == 2
+            assert mock_sleep.call_count == 1
+
+            assert client.delete_block("block-1") is False
+            assert mock_req.call_count == 2
+
+    health = client.health()
+    assert health["server_errors"] == 2
+    assert health["retries"] == 1
+    assert health["short_circuited"] == 2
+    assert health["circuit"]["state"] == OPEN
+
+
+def test_client_errors_are_not_retried(client):
+    with patch.object(client.session, "request", return_value=_response(400)) as mock_req:
+        assert client._make_request("GET", "https://example.test") is None
+
+    assert mock_req.call_count == 1
+    assert client.health()["client_errors"] == 1
+    assert client.health()["circuit"]["state"] == CLOSED
+
+
+def test_timeouts_are_retried_with_backoff(client):
+    side_effect = [requests.exceptions.ReadTimeout("slow"), _response(200)]
+    with patch.object(client.session, "request", side_effect=side_effect) as mock_req:
+        with patch("time.sleep") as mock_sleep:
+            assert client._make_request("GET", "https://example.test") is not None
+
+    assert mock_req.call_count == 2
+    assert mock_req.call_args.kwargs["timeout"] == (5.0, 30.0)
+    mock_sleep.assert_called_once()
+    assert client.health()["timeouts"] == 1
+    assert client.health()["circuit"]["consecutive_failures"] == 0
+
+
+def test_deferred_background_request_does_not_take_the_probe(client):
+    with patch.object(client.session, "request", return_value=_response(503)):
+        with patch("time.sleep"):
+            client._make_request("GET", "https://example.test")
+    assert client.circuit_breaker.state == OPEN
+
+    client.circuit_breaker.reset_timeout = 0
+    client.rate_limiter = Mock()
+    client.rate_limiter.try_acquire.return_value = False
+    with patch.object(client.session, "request", return_value=_response(200)) as mock_req:
+        assert client._make_request("GET", "https://example.test", background=True) is None
+        mock_req.assert_not_called()
+
+        # The probe is still free for the next request
+        assert client._make_request("GET", "https://example.test") is not None
+
+    assert client.health()["deferred"] == 1
+    assert client.circuit_breaker.state == CLOSED
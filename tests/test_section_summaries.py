@@ -0,0 +1,63 @@
+from src.context_builder import ContextBuilder, estimate_tokens
+from src.section_summaries import SectionSummarizer, split_sections
+
+
+def _page(sections=6, paragraphs=8):
+    blocks = []
+    for s in range(sections):
+        blocks.append({"id": f"h{s}", "type": "heading_2", "content": f"Section {s}"})
+        for p in range(paragraphs):
+            text = f"Paragraph {p} of section {s} " + "lorem ipsum " * 20
+            blocks.append({"id": f"s{s}p{p}", "type": "paragraph", "content": text})
+    return blocks
+
+
+def _summarizer(calls):
+    def summarize(text):
+        calls.append(text)
+        return f"Summary of {text.splitlines()[0]}"
+
+    return SectionSummarizer(summarize, min_blocks=3)
+
+
+def test_split_sections_on_top_level_headings():
+    blocks = [
+        {"type": "paragraph"},
+        {"type": "heading_1"},
+        {"type": "heading_2", "depth": 1},
+        {"type": "paragraph"},
+        {"type": "heading_3"},
+    ]
+
+    assert split_sections(blocks) == [(0, 1), (1, 4), (4, 5)]
+
+
+def test_only_changed_sections_are_summarized_again():
+    calls = []
+    summarizer = _summarizer(calls)
+    blocks = _page(sections=3)
+
+    assert summarizer.schedule(blocks) == 3
+    summarizer.wait()
+    blocks[1] = dict(blocks[1], content="Edited paragraph")
+    assert summarizer.schedule(blocks) == 1
+    summarizer.wait()
+
+    assert len(calls) == 4 and calls[-1].startswith("Section 0")
+
+
+def test_far_sections_are_shown_as_summaries():
+    calls = []
+    blocks = _page()
+    builder = ContextBuilder(token_budget=1200, window=1, summarizer=_summarizer(calls))
+
+    first = builder.build(blocks, "Fix block 20")
+    builder.summarizer.wait()
+    second = builder.build(blocks, "Fix block 20")
+
+    assert "(section summary, " not in first
+    assert '[BLOCK_0-BLOCK_8] (section summary, "Section 0") Summary of Section 0' in second
+    # The referenced section stays verbatim, and the prompt got smaller
+    assert "[BLOCK_20] (ID: s2p1, Type: paragraph)\nContent: Paragraph 1 of section 2" in second
+    assert estimate_tokens(second) < estimate_tokens(first)
+    assert len(calls) == 6
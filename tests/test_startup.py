@@ -0,0 +1,71 @@
+import logging
+import subprocess
+import sys
+from concurrent.futures import Future
+from unittest.mock import Mock, patch
+
+from src.agent import start_agent
+from src.batch import run_batch
+from src.utils import LazyModule, set_log_level, setup_logger
+
+
+def test_cli_import_defers_heavy_dependencies():
+    code = (
+        "import sys, src.agent; "
+        "deferred = ('google.generativeai', 'requests', 'asyncio', 'dotenv', 'sqlite3', "
+        "'difflib'); "
+        "print(sorted(m for m in deferred if m in sys.modules))"
+    )
+    result = subprocess.run(
+        [sys.executable, "-c", code], capture_output=True, text=True, check=True
+    )
+
+    assert result.stdout.strip() == "[]"
+
+
+def test_module_loggers_follow_log_level_set_later():
+    logger = setup_logger("StartupTest")
+    try:
+        set_log_level("ERROR")
+        assert logger.level == logging.ERROR
+        assert setup_logger("StartupTestLater").level == logging.ERROR
+    finally:
+        set_log_level("INFO")
+    assert logger.level == logging.INFO
+
+
+def test_lazy_module_imports_on_first_use():
+    module = LazyModule("json")
+
+    assert "not loaded" in repr(module)
+    assert module.dumps([1]) == "[1]"
+    assert "(loaded)" in repr(module)
+
+
+def test_agent_is_built_off_the_main_thread():
+    with patch("src.agent.GeminiAgent") as mock_gemini_cls:
+        future = start_agent()
+        agent = future.result(timeout=2)
+
+    assert agent is mock_gemini_cls.return_value
+
+
+def test_batch_awaits_agent_after_first_fetch_started():
+    notion = Mock()
+    notion.get_page_blocks.return_value = []
+    agent = Mock()
+    agent.analyze_and_act.return_value = []
+    future: Future = Future()
+
+    def _fetch(page_id, **kwargs):
+        # The page is read before the agent exists
+        assert not future.done()
+        future.set_result(agent)
+        return []
+
+    notion.get_page_blocks.side_effect = _fetch
+
+    summary = run_batch(notion, future, ["Summarize"], Mock(), "p1")
+
+    assert summary["failed"] == 0
+    agent.analyze_and_act.assert_called_once_with("Summarize", [])
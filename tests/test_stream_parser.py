@@ -0,0 +1,48 @@
+from src.stream_parser import IncrementalPlanParser, validate_action_event
+
+
+def _feed_in_chunks(text, size=4):
+    parser = IncrementalPlanParser()
+    events = []
+    for start in range(0, len(text), size):
+        for event in parser.feed(text[start : start + size]):
+            events.append((start, event))
+    return events
+
+
+def test_reports_action_before_text_completes():
+    parser = IncrementalPlanParser()
+    events = parser.feed('{"actions": [{"action": "UPDATE", "target_block_index": 7, "text": "Long')
+
+    assert events == [{"position": 0, "action": "UPDATE", "target_block_index": 7}]
+    assert parser.feed(' rewrite..."}]}') == []
+
+
+def test_multiple_actions_across_chunks():
+    text = (
+        '```json\n{"actions": ['
+        '{"action": "DELETE", "target_block_index": 12},'
+        '{"action": "APPEND", "block_type": "heading_2", "text": "Escaped \\"quote\\" }"},'
+        '{"action": "INSERT", "target_block_index": 3, "text": "x"}'
+        "]}\n```"
+    )
+    events = [event for _, event in _feed_in_chunks(text)]
+
+    assert [(e["action"], e.get("target_block_index")) for e in events] == [
+        ("DELETE", 12),
+        ("APPEND", None),
+        ("INSERT", 3),
+    ]
+
+
+def test_single_action_object():
+    events = IncrementalPlanParser().feed('{"action": "chat", "text": "Hi"}')
+    assert events == [{"position": 0, "action": "CHAT"}]
+
+
+def test_validate_action_event():
+    assert validate_action_event({"action": "UPDATE", "target_block_index": 1}, 2) is None
+    assert "invalid block index" in validate_action_event(
+        {"action": "DELETE", "target_block_index": 5}, 2
+    )
+    assert "unknown action" in validate_action_event({"action": "MOVE"}, 2)
@@ -0,0 +1,156 @@
+import time
+from unittest.mock import Mock, call
+
+import pytest
+
+from src.notion_client import BLOCKS_CREATED
+from src.page_model import PageModel
+from src.write_behind import PLACEHOLDER_PREFIX, WriteBehindQueue
+
+
+def _block(block_id, content):
+    return {"id": block_id, "type": "paragraph", "content": content, "depth": 0}
+
+
+@pytest.fixture
+def notion():
+    client = Mock()
+    client.listeners = []
+    client.subscribe.side_effect = client.listeners.append
+    client.get_page_blocks.return_value = [_block("b1", "Intro"), _block("b2", "Outro")]
+    client.created = 0
+
+    def _create(parent_id, items, after=None):
+        blocks = []
+        for text, block_type in items:
+            client.created += 1
+            blocks.append({"id": f"new{client.created}", "type": block_type, "content": text})
+        for listener in client.listeners:
+            listener(BLOCKS_CREATED, {"parent_id": parent_id, "after": after, "blocks": blocks})
+        return [True] * len(items)
+
+    client.append_blocks.side_effect = _create
+    client.insert_blocks_after.side_effect = lambda after, items, parent_id: _create(
+        parent_id, items, after
+    )
+    client.update_block.return_value = True
+    client.delete_block.return_value = True
+    client.delete_blocks.side_effect = lambda ids: [True] * len(ids)
+    return client
+
+
+def test_successive_updates_to_a_block_send_only_the_last(notion):
+    writes = WriteBehindQueue(notion, delay=0)
+
+    for text in ("one", "two", "three"):
+        assert writes.update_block("b1", text, block_type="paragraph")
+    writes.update_block("b2", "other")
+    writes.update_block("b1", "final", block_type="heading_2")
+
+    assert writes.flush() == 2
+    assert notion.update_block.call_args_list == [
+        call("b1", "final", block_type="heading_2"),
+        call("b2", "other", block_type="paragraph"),
+    ]
+    assert writes.stats["coalesced"] == 3
+
+
+def test_inserts_continuing_a_queued_run_share_one_request(notion):
+    writes = WriteBehindQueue(notion, delay=0)
+    model = PageModel(writes, "page-id", reconcile_delay=0)
+    model.blocks()
+
+    writes.append_blocks("page-id", [("A", "paragraph"), ("B", "paragraph")])
+    writes.append_block("page-id", "C")
+    writes.insert_block_after("b1", "X", parent_id="page-id")
+    first = model.blocks()[1]["id"]
+    assert first.startswith(PLACEHOLDER_PREFIX)
+    writes.insert_block_after(first, "Y", parent_id="page-id")
+
+    assert [b["content"] for b in model.blocks()] == ["Intro", "X", "Y", "Outro", "A", "B", "C"]
+    assert writes.flush() == 2
+    notion.append_blocks.assert_called_once_with(
+        "page-id", [("A", "paragraph"), ("B", "paragraph"), ("C", "paragraph")]
+    )
+    notion.insert_blocks_after.assert_called_once_with(
+        "b1", [("X", "paragraph"), ("Y", "paragraph")], parent_id="page-id"
+    )
+    # Placeholders were swapped for the created blocks, in place
+    assert [b["id"] for b in model.blocks()] == ["b1", "new4", "new5", "b2", "new1", "new2", "new3"]
+    model.close()
+
+
+def test_insert_then_delete_is_cancelled(notion):
+    writes = WriteBehindQueue(notion, delay=0)
+    model = PageModel(writes, "page-id", reconcile_delay=0)
+    model.blocks()
+
+    writes.append_block("page-id", "Draft")
+    draft = model.blocks()[-1]["id"]
+    writes.update_block(draft, "Draft, edited")
+    writes.update_block("b2", "Outro, edited")
+    writes.delete_blocks([draft, "b2"])
+
+    assert [b["id"] for b in model.blocks()] == ["b1"]
+    assert writes.flush() == 1
+    notion.append_blocks.assert_not_called()
+    notion.update_block.assert_not_called()
+    notion.delete_block.assert_called_once_with("b2")
+    assert writes.stats["cancelled"] == 1
+    model.close()
+
+
+def test_writes_keep_their_order_and_resolve_placeholders(notion):
+    writes = WriteBehindQueue(notion, delay=0)
+    model = PageModel(writes, "page-id", reconcile_delay=0)
+    model.blocks()
+
+    writes.append_block("page-id", "New")
+    new = model.blocks()[-1]["id"]
+    writes.update_block("b1", "Intro, edited")
+    writes.insert_block_after(new, "After new", parent_id="page-id")
+    # Referenced by the insert above, so it has to be created and deleted
+    writes.delete_block(new)
+    writes.delete_block("b2")
+
+    writes.flush()
+
+    assert [c[0] for c in notion.method_calls if c[0] != "subscribe"] == [
+        "get_page_blocks",
+        "append_blocks",
+        "update_block",
+        "insert_blocks_after",
+        "delete_blocks",
+    ]
+    notion.insert_blocks_after.assert_called_once_with(
+        "new1", [("After new", "paragraph")], parent_id="page-id"
+    )
+    notion.delete_blocks.assert_called_once_with(["new1", "b2"])
+    model.close()
+
+
+def test_timer_and_reads_flush_the_queue(notion):
+    writes = WriteBehindQueue(notion, delay=0.01)
+    writes.update_block("b1", "Soon")
+    deadline = time.time() + 2
+    while not notion.update_block.called and time.time() < deadline:
+        time.sleep(0.01)
+    notion.update_block.assert_called_once()
+    assert writes.pending == 0
+
+    writes.delay = 0
+    writes.update_block("b2", "Before read")
+    writes.get_page_blocks("page-id", force_refresh=True)
+    assert notion.update_block.call_count == 2
+    # Everything else is the client's own
+    assert writes.request_stats is notion.request_stats
+
+
+def test_failed_flush_is_counted(notion):
+    notion.update_block.return_value = False
+    writes = WriteBehindQueue(notion, delay=0)
+
+    assert writes.update_block("b1", "x")
+    writes.flush()
+
+    assert writes.stats["failed"] == 1